@@ -0,0 +1,127 @@
+"""
+Benchmark: the row-by-row disagreement summaries (iterrows / apply with a
+max(set(...)) majority vote) vs the NumPy versions in pipeline/disagreement.py,
+checking the tables match, then the NumPy versions alone up to millions of rows.
+
+    python -m benchmarks.bench_disagreement --rows 1000 10000 1000000 --models 3
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from pipeline.disagreement import (
+    flag_high_disagreement_testimonials,
+    model_disagreement_percentages,
+    summarize_disagreements,
+)
+
+
+def synthetic_disagreements(n: int, n_labels: int, n_models: int, seed: int = 0) -> pd.DataFrame:
+    """Rows shaped like compute_model_disagreements output: 0/1 votes that are not unanimous."""
+    rng = np.random.default_rng(seed)
+    votes = rng.integers(0, 2, size=(n, n_models))
+    unanimous = votes.min(axis=1) == votes.max(axis=1)
+    votes[unanimous, 0] = 1 - votes[unanimous, 0]
+    data = {
+        "testimonial": np.array([f"testimonial {i}" for i in range(max(1, n // 3))], dtype=object)[rng.integers(0, max(1, n // 3), n)],
+        "label": np.array([f"label {j}" for j in range(n_labels)], dtype=object)[rng.integers(0, n_labels, n)],
+    }
+    data.update({f"model{m}": votes[:, m] for m in range(n_models)})
+    return pd.DataFrame(data)
+
+
+# --- Row-by-row versions these replaced, kept here as the baseline --------
+
+def legacy_summarize(disagreement_df):
+    model_cols = [col for col in disagreement_df.columns if col not in ["testimonial", "label"]]
+    summary_rows = []
+    for label in disagreement_df['label'].unique():
+        label_df = disagreement_df[disagreement_df['label'] == label]
+        for model in model_cols:
+            disagreement_count = sum(
+                row[model] != max(set(list(row[model_cols])), key=list(row[model_cols]).count)
+                for _, row in label_df.iterrows()
+            )
+            summary_rows.append({"label": label, "model": model, "disagreements": disagreement_count,
+                                 "total": len(label_df), "disagreement_pct": round(disagreement_count / len(label_df), 2)})
+    return pd.DataFrame(summary_rows)
+
+
+def legacy_flag(disagreement_df, model_names, threshold=2):
+    flagged_rows = []
+    for (text, label), group in disagreement_df.groupby(['testimonial', 'label']):
+        disagreement_counts = []
+        for _, row in group.iterrows():
+            values = [row[model] for model in model_names if model in row]
+            if len(set(values)) > 1:
+                disagreement_counts.append(1)
+        if sum(disagreement_counts) >= threshold:
+            flagged_rows.append({"testimonial": text, "label": label, "disagreement_instances": sum(disagreement_counts)})
+    return pd.DataFrame(flagged_rows)
+
+
+def legacy_percentages(disagreement_df):
+    model_cols = [col for col in disagreement_df.columns if col not in ["testimonial", "label"]]
+    total_counts = disagreement_df.groupby("label").size().to_dict()
+    results = []
+    for label in disagreement_df["label"].unique():
+        label_df = disagreement_df[disagreement_df["label"] == label]
+        for model in model_cols:
+            disagreements = label_df.apply(
+                lambda row: row[model] != max(set([row[m] for m in model_cols]), key=[row[m] for m in model_cols].count),
+                axis=1
+            ).sum()
+            pct = disagreements / total_counts[label]
+            results.append({"label": label, "model": model, "disagreement_count": disagreements,
+                            "total_disagreements": total_counts[label],
+                            "percent_of_label_disagreements": round(pct * 100, 2)})
+    return pd.DataFrame(results)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 1000000])
+    parser.add_argument("--labels", type=int, default=20)
+    parser.add_argument("--models", type=int, default=3)
+    parser.add_argument("--skip-legacy-above", type=int, default=20000,
+                        help="only time the NumPy versions beyond this many rows")
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'legacy s':>9} {'numpy s':>8} {'speedup':>8}  identical")
+    for n in args.rows:
+        df = synthetic_disagreements(n, args.labels, args.models)
+        model_names = [f"model{m}" for m in range(args.models)]
+
+        fast_time = 0.0
+        fast = []
+        for fn, fn_args in ((summarize_disagreements, (df,)),
+                            (flag_high_disagreement_testimonials, (df, model_names)),
+                            (model_disagreement_percentages, (df,))):
+            result, elapsed = timed(fn, *fn_args)
+            fast.append(result)
+            fast_time += elapsed
+
+        if n > args.skip_legacy_above:
+            print(f"{n:>9} {'-':>9} {fast_time:>8.2f} {'':>8}")
+            continue
+
+        legacy_time = 0.0
+        identical = True
+        for fn, fn_args, result in zip((legacy_summarize, legacy_flag, legacy_percentages),
+                                       ((df,), (df, model_names), (df,)), fast):
+            reference, elapsed = timed(fn, *fn_args)
+            legacy_time += elapsed
+            identical &= reference.equals(result)
+        print(f"{n:>9} {legacy_time:>9.2f} {fast_time:>8.2f} {legacy_time / fast_time:>7.0f}x  {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: the two-stage validate_docx.py -> preprocessing.py flow (python-docx load, validate,
+write .validated.docx, python-docx load again, extract) vs the single-pass streaming parser,
+and check both produce the same entries and warnings.
+
+    python -m benchmarks.bench_docx_parse --entries 200 2000 10000
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from docx import Document
+
+from pipeline.preprocessing import extract_testimonials, parse_transcript
+from validate_docx import load_paragraphs, save_cleaned_doc, validate_structure
+
+WORDS = "the training helped our community build trust and share knowledge with confidence".split()
+
+
+def synthetic_transcript(path: str, n_entries: int, seed: int = 0):
+    """A raw transcript with the irregularities validation has to handle: missing headers, split runs, tabs, breaks."""
+    rnd = random.Random(seed)
+    doc = Document()
+    for e in range(n_entries):
+        roll = rnd.random()
+        if roll > 0.02:
+            doc.add_paragraph(f"Topic Title:  Topic {e}\t{rnd.choice(WORDS)} ")
+        if roll > 0.1:
+            doc.add_paragraph(f"Speaker: Speaker {rnd.randrange(50)}")
+        if roll > 0.15 or roll < 0.05:
+            doc.add_paragraph(f"DATE: 2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}")
+        if 0.05 < roll < 0.07:
+            doc.add_paragraph("---")
+            continue
+        for _ in range(rnd.randint(1, 8)):
+            paragraph = doc.add_paragraph(" ".join(rnd.choices(WORDS, k=rnd.randint(2, 25))))
+            if rnd.random() < 0.3:
+                run = paragraph.add_run(" " + " ".join(rnd.choices(WORDS, k=3)))
+                run.bold = True
+            if rnd.random() < 0.1:
+                paragraph.add_run().add_break()
+                paragraph.add_run("\tafter a break")
+            if rnd.random() < 0.1:
+                doc.add_paragraph("   ")
+        doc.add_paragraph("---")
+    doc.save(path)
+
+
+def two_stage(path: str, scratch: str):
+    entries, warnings = validate_structure(load_paragraphs(path))
+    validated = os.path.join(scratch, "validated.docx")
+    save_cleaned_doc(entries, validated)
+    return extract_testimonials(validated), warnings
+
+
+def strip_separator(entry):
+    """The two-stage flow reads the trailing `---` of the cleaned doc as content; the single pass does not."""
+    content = list(entry["content"])
+    if content[-1] == "---":
+        content.pop()
+    elif content[-1].endswith(" ---"):
+        content[-1] = content[-1][:-4]
+    return dict(entry, content=content)
+
+
+def measure(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, nargs="+", default=[200, 1000, 5000])
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp()
+    try:
+        print(f"{'entries':>8} {'size MB':>8} {'two-stage s':>12} {'peak MB':>8} {'stream s':>9} {'peak MB':>8} {'speedup':>8}  match")
+        for n in args.entries:
+            path = os.path.join(scratch, f"raw_{n}.docx")
+            synthetic_transcript(path, n, seed=n)
+            (legacy, legacy_warnings), legacy_s, legacy_peak = measure(two_stage, path, scratch)
+            (entries, warnings), stream_s, stream_peak = measure(parse_transcript, path)
+
+            match = [strip_separator(e) for e in legacy] == [dict(e) for e in entries] and legacy_warnings == warnings
+            print(f"{n:>8} {os.path.getsize(path) / 1e6:>8.2f} {legacy_s:>12.2f} {legacy_peak:>8.1f} "
+                  f"{stream_s:>9.2f} {stream_peak:>8.1f} {legacy_s / stream_s:>7.1f}x  {'yes' if match else 'NO'}")
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == "__main__":
+    main()
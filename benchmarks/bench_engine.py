@@ -0,0 +1,82 @@
+"""
+Compare the serial classify loop with ClassificationEngine against a local mock
+Ollama endpoint that sleeps for a fixed latency per request.
+
+    python -m benchmarks.bench_engine --testimonials 50 --models 3 --latency 0.2
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from models.ollama_model import OllamaModel
+from pipeline.engine import ClassificationEngine
+from pipeline.ingest import records_from_texts
+
+LABELS = ["training", "trust", "community impact", "confidence", "knowledge sharing"]
+NORMALIZED_LABELS = {label: label for label in LABELS}
+
+
+def make_handler(latency: float):
+    class MockOllamaHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            time.sleep(latency)
+            reply = json.dumps({
+                "labels": {label: 0.5 for label in LABELS},
+                "explanation": "mock response"
+            })
+            body = json.dumps({"response": reply, "done": True}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return MockOllamaHandler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--testimonials", type=int, default=30)
+    parser.add_argument("--models", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+
+    models = {f"mock{i}": OllamaModel(model_name=f"mock{i}", api_url=api_url) for i in range(args.models)}
+    testimonials = [f"Testimonial number {i} about training and trust." for i in range(args.testimonials)]
+
+    start = time.perf_counter()
+    serial = [
+        {name: model.classify(text, LABELS, NORMALIZED_LABELS) for name, model in models.items()}
+        for text in testimonials
+    ]
+    serial_time = time.perf_counter() - start
+
+    engine = ClassificationEngine(models, max_workers=args.concurrency, per_provider={"ollama": args.concurrency})
+    start = time.perf_counter()
+    concurrent = [results for _, _, results in engine.run(records_from_texts(testimonials), LABELS, NORMALIZED_LABELS)]
+    concurrent_time = time.perf_counter() - start
+
+    server.shutdown()
+
+    assert [list(r) for r in serial] == [list(r) for r in concurrent], "model order differs"
+    calls = args.testimonials * args.models
+    print(f"\n📊 {calls} calls @ {args.latency:.3f}s latency")
+    print(f"  serial:     {serial_time:.2f}s ({calls / serial_time:.1f} calls/s)")
+    print(f"  concurrent: {concurrent_time:.2f}s ({calls / concurrent_time:.1f} calls/s)")
+    print(f"  speedup:    {serial_time / concurrent_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
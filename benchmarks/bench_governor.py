@@ -0,0 +1,72 @@
+"""
+Throttling demo: GPT and Claude adapters against the local fake server with
+server-side 429 injection, with and without the RequestGovernor.
+
+    python -m benchmarks.bench_governor --testimonials 60 --server-rpm 300 --window 2
+"""
+import argparse
+import time
+
+from models.claude_model import ClaudeModel
+from models.gpt_model import GPTModel
+from mock_llm.batch_server import start_fake_batch_server
+from pipeline.engine import ClassificationEngine
+from pipeline.ingest import records_from_texts
+from utils.rate_limiter import RequestGovernor, attach_governor
+
+LABELS = ["training", "trust", "community impact", "confidence", "knowledge sharing"]
+NORMALIZED_LABELS = {label: label for label in LABELS}
+
+
+def run(args, governed: bool):
+    server = start_fake_batch_server(throttle_rpm=args.server_rpm, throttle_window=args.window)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    available = {
+        "gpt": lambda: GPTModel(api_key="sk-fake", temperature=0.0, base_url=f"{base}/v1"),
+        "claude": lambda: ClaudeModel(api_key="sk-ant-fake", temperature=0.0, base_url=base),
+    }
+    models = {name: available[name]() for name in args.models}
+    for model in models.values():
+        # Without a governor, also turn off SDK retries: that is the failure mode being measured
+        governor = RequestGovernor(model.provider, requests_per_minute=args.client_rpm,
+                                   max_concurrency=args.concurrency, base_delay=0.2,
+                                   max_delay=5.0) if governed else None
+        attach_governor(model, governor)
+        if not governed:
+            model.client = model.client.with_options(max_retries=0)
+
+    texts = [f"Testimonial {i}: the training built trust and confidence in my community." for i in range(args.testimonials)]
+    engine = ClassificationEngine(models, max_workers=2 * args.concurrency,
+                                  per_provider={"openai": args.concurrency, "anthropic": args.concurrency})
+    start = time.perf_counter()
+    rows = list(engine.run(records_from_texts(texts), LABELS, NORMALIZED_LABELS))
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    failed = sum(1 for _, _, results in rows for result in results.values() if result is None)
+    throttled = server.RequestHandlerClass.state.throttled
+    return elapsed, failed, throttled, {name: getattr(model.governor, "stats", None) for name, model in models.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--testimonials", type=int, default=60)
+    parser.add_argument("--models", nargs="+", default=["gpt", "claude"], choices=["gpt", "claude"])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--server-rpm", type=int, default=300, help="requests/min the fake server allows per provider")
+    parser.add_argument("--client-rpm", type=float, default=None, help="governor request bucket (default: unset)")
+    parser.add_argument("--window", type=float, default=2.0, help="server throttle window in seconds")
+    args = parser.parse_args()
+
+    calls = args.testimonials * len(args.models)
+    for governed in (False, True):
+        elapsed, failed, throttled, stats = run(args, governed)
+        print(f"\n📊 {'governed' if governed else 'ungoverned'}: {calls} calls in {elapsed:.2f}s, "
+              f"{failed} failed calls, {throttled} 429s served")
+        for name, model_stats in stats.items():
+            if model_stats:
+                print(f"  {name}: {model_stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark: the per-label IRR reference loop (pingouin / statsmodels / sklearn /
+krippendorff) vs the vectorized compute_irr_array, and check they agree.
+
+    python -m benchmarks.bench_irr --testimonials 200 1000 5000 --labels 20 --models 3
+"""
+import argparse
+import random
+import time
+import warnings
+
+from pipeline.irr import compute_irr_array, compute_irr_scores_reference, ratings_array
+
+
+def synthetic_ratings(n: int, n_labels: int, n_models: int, seed: int = 0):
+    """Scores on the 0.1 grid models actually return, loosely correlated across models."""
+    rnd = random.Random(seed)
+    labels = [f"label {j}" for j in range(n_labels)]
+    models = [f"model{m}" for m in range(n_models)]
+    ratings = []
+    for i in range(n):
+        scores = {}
+        for label in labels:
+            truth = rnd.random()
+            scores[label] = {model: round(min(1.0, max(0.0, truth + rnd.gauss(0, 0.2))), 1) for model in models}
+        ratings.append({"text": f"testimonial {i}", "labels": scores})
+    return ratings
+
+
+def max_difference(a, b) -> float:
+    if isinstance(a, dict):
+        return max((max_difference(a[key], b[key]) for key in a), default=0.0)
+    if isinstance(a, str) or isinstance(b, str):
+        return 0.0 if a == b else float("inf")
+    return abs(a - b)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--testimonials", type=int, nargs="+", default=[200, 1000, 5000])
+    parser.add_argument("--labels", type=int, default=20)
+    parser.add_argument("--models", type=int, default=3)
+    parser.add_argument("--skip-reference-above", type=int, default=20000,
+                        help="only time the vectorized engine beyond this many testimonials")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    # Warm-up, so the reference's library imports are not timed
+    compute_irr_scores_reference(synthetic_ratings(10, 2, args.models))
+
+    print(f"{'testimonials':>12} {'reference s':>12} {'to array s':>11} {'vectorized s':>13} {'speedup':>8} {'max diff':>9}")
+    for n in args.testimonials:
+        ratings = synthetic_ratings(n, args.labels, args.models)
+
+        start = time.perf_counter()
+        scores, labels, model_names = ratings_array(ratings)
+        convert_time = time.perf_counter() - start
+        start = time.perf_counter()
+        fast = compute_irr_array(scores, labels, model_names)
+        fast_time = time.perf_counter() - start
+
+        if n > args.skip_reference_above:
+            print(f"{n:>12} {'-':>12} {convert_time:>11.3f} {fast_time:>13.3f} {'':>8} {'':>9}")
+            continue
+
+        start = time.perf_counter()
+        reference = compute_irr_scores_reference(ratings)
+        reference_time = time.perf_counter() - start
+
+        diff = max_difference(reference, fast)
+        print(f"{n:>12} {reference_time:>12.3f} {convert_time:>11.3f} {fast_time:>13.3f} "
+              f"{reference_time / fast_time:>7.0f}x {diff:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
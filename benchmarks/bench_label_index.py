@@ -0,0 +1,57 @@
+"""
+Micro-benchmark: per-response label matching with the old nested loop
+(normalize every defined label for every returned key) vs the shared LabelIndex.
+
+    python -m benchmarks.bench_label_index --labels 5 50 200 500
+"""
+import argparse
+import re
+import timeit
+
+from utils.label_index import LabelIndex
+
+
+def legacy_normalize(label: str) -> str:
+    label = re.sub(r'([a-z])([A-Z])', r'\1 \2', label)
+    label = label.replace("_", " ").replace("-", " ")
+    return label.strip().lower()
+
+
+def legacy_parse(score_block, labels, normalized_labels):
+    normalized_block = {}
+    for k, v in score_block.items():
+        norm_key = legacy_normalize(k)
+        for defined_label in labels:
+            if legacy_normalize(defined_label) == norm_key:
+                normalized_block[defined_label] = v
+                break
+    return {
+        canonical_label: float(normalized_block.get(norm_label, 0.0))
+        for norm_label, canonical_label in normalized_labels.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--labels", type=int, nargs="+", default=[5, 50, 200, 500])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'labels':>7} {'legacy µs':>12} {'index µs':>10} {'speedup':>8}")
+    for n in args.labels:
+        labels = [f"concept {i} area" for i in range(n)]
+        normalized_labels = {label: label for label in labels}
+        # A typical response: every label, returned in a different casing/separator style
+        score_block = {label.title().replace(" ", "_"): 0.5 for label in labels}
+
+        index = LabelIndex.for_run(labels, normalized_labels)
+        assert index.parse_scores(score_block) == legacy_parse(score_block, labels, normalized_labels)
+
+        legacy = timeit.timeit(lambda: legacy_parse(score_block, labels, normalized_labels), number=args.repeat)
+        fast = timeit.timeit(lambda: LabelIndex.for_run(labels, normalized_labels).parse_scores(score_block),
+                             number=args.repeat)
+        print(f"{n:>7} {legacy / args.repeat * 1e6:>12.1f} {fast / args.repeat * 1e6:>10.1f} {legacy / fast:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: write a disagreement table plus a streamed Explanations table with every
+output sink (utils/output_sinks.py) and report time, peak traced memory and size.
+
+    python -m benchmarks.bench_output_sinks --rows 20000 100000
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.bench_disagreement import synthetic_disagreements
+from utils.output_sinks import SINKS, open_sink
+
+
+def synthetic_explanations(n: int, seed: int = 0):
+    """Rows shaped like main.py's explanations log, with paragraph-sized text."""
+    rng = np.random.default_rng(seed)
+    words = np.array("the training helped our community build trust and share knowledge with confidence".split())
+    for i in range(n):
+        yield {
+            "id": i // 3,
+            "testimonial": " ".join(rng.choice(words, 60)),
+            "model": f"model{i % 3}",
+            "label_scores": json.dumps({f"label {j}": round(float(rng.random()), 2) for j in range(5)}, indent=2),
+            "explanation": " ".join(rng.choice(words, 40)),
+        }
+
+
+def size_of(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[20000, 100000])
+    parser.add_argument("--formats", nargs="+", default=list(SINKS))
+    args = parser.parse_args()
+    columns = ["id", "testimonial", "model", "label_scores", "explanation"]
+
+    print(f"{'rows':>8} {'format':>12} {'seconds':>8} {'peak MB':>8} {'size MB':>8}")
+    for n in args.rows:
+        disagreements = synthetic_disagreements(n, 20, 3)
+        explanations = [[entry[c] for c in columns] for entry in synthetic_explanations(n)]
+
+        def write(directory, output_format):
+            with open_sink(os.path.join(directory, "model_disagreements.xlsx"), output_format) as sink:
+                sink.write_table("Disagreements", disagreements)
+                sink.write_rows("Explanations", columns, iter(explanations))
+            return sink.location
+
+        for output_format in args.formats:
+            directory = tempfile.mkdtemp()
+            try:
+                start = time.perf_counter()
+                location = write(directory, output_format)
+                elapsed = time.perf_counter() - start
+                size = size_of(location) / 1e6
+                # Second pass under tracemalloc (which slows Python down) for the writer's own peak memory
+                tracemalloc.start()
+                write(directory, output_format)
+                peak = tracemalloc.get_traced_memory()[1] / 1e6
+            except ImportError as e:
+                print(f"{n:>8} {output_format:>12}  skipped: {e}")
+                continue
+            finally:
+                tracemalloc.stop()
+                shutil.rmtree(directory)
+            print(f"{n:>8} {output_format:>12} {elapsed:>8.2f} {peak:>8.1f} {size:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
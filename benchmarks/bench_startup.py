@@ -0,0 +1,98 @@
+"""
+Startup-time benchmark: `python -X importtime` breakdown of a module by top-level
+package, plus the wall time of building the configured model clients.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --output startup_baseline.json
+    python -m benchmarks.bench_startup --compare startup_baseline.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict
+
+
+def import_times(module: str, runs: int = 3) -> Dict[str, float]:
+    """Import time (ms) per top-level package, best of `runs` fresh interpreters."""
+    best: Dict[str, float] = {}
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, check=True
+        )
+        totals = defaultdict(float)
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            self_us, _, name = line[len("import time:"):].split("|")
+            # Self times add up without double counting nested imports
+            totals[name.strip().split(".")[0]] += int(self_us) / 1000
+        for package, ms in totals.items():
+            best[package] = min(best.get(package, ms), ms)
+    return best
+
+
+def model_init_time(config_path: str) -> float:
+    """Seconds to import the loader and build every configured client in a fresh interpreter."""
+    code = (
+        "import time; t = time.perf_counter();"
+        "from models.model_loader import load_models_from_config;"
+        f"load_models_from_config({config_path!r});"
+        "print(time.perf_counter() - t)"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if proc.returncode != 0:
+        print(f"⚠️ Model initialization failed: {proc.stderr.strip().splitlines()[-1:]}")
+        return float("nan")
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="models.model_loader")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", help="save results as JSON (e.g. a release baseline)")
+    parser.add_argument("--compare", help="baseline JSON from a previous --output run")
+    args = parser.parse_args()
+
+    times = import_times(args.module, args.runs)
+    init = model_init_time(args.config) if os.path.exists(args.config) else float("nan")
+    total = sum(times.values())
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    base_times = baseline.get("imports_ms", {})
+
+    print(f"⏱️ import {args.module}: {total:.0f} ms total, model init: {init:.2f} s")
+    print(f"{'package':<28} {'ms':>9} {'baseline':>9} {'change':>8}")
+    for package, ms in sorted(times.items(), key=lambda item: -item[1])[:args.top]:
+        if package in base_times:
+            print(f"{package:<28} {ms:>9.1f} {base_times[package]:>9.1f} {ms - base_times[package]:>+8.1f}")
+        else:
+            print(f"{package:<28} {ms:>9.1f} {'-':>9} {'':>8}")
+    if baseline:
+        print(f"{'TOTAL':<28} {total:>9.1f} {baseline.get('total_ms', 0):>9.1f} {total - baseline.get('total_ms', 0):>+8.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "module": args.module,
+                "python": sys.version.split()[0],
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "total_ms": round(total, 1),
+                "model_init_s": round(init, 3),
+                "imports_ms": {package: round(ms, 1) for package, ms in times.items()},
+            }, f, indent=2)
+        print(f"💾 Saved startup timings to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Tail-latency demo against a mock Ollama endpoint where a share of requests stall:
+latency histograms with and without hedging, then a provider outage with the
+circuit breaker on.
+
+    python -m benchmarks.bench_tail_latency --calls 200 --slow-rate 0.05 --slow 1.5
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from models.ollama_model import OllamaModel
+from pipeline.engine import ClassificationEngine
+from pipeline.ingest import records_from_texts
+from utils.latency import CircuitBreaker, LatencyGuard
+
+LABELS = ["training", "trust", "community impact", "confidence", "knowledge sharing"]
+NORMALIZED_LABELS = {label: label for label in LABELS}
+
+
+def make_handler(latency: float, slow: float, slow_rate: float, state: dict):
+    rnd = random.Random(7)
+    lock = threading.Lock()
+
+    class StallingOllamaHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if state.get("down"):
+                self.send_response(500)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            with lock:
+                delay = slow if rnd.random() < slow_rate else latency * rnd.uniform(0.8, 1.2)
+            time.sleep(delay)
+            reply = json.dumps({"labels": {label: 0.5 for label in LABELS}, "explanation": "mock response"})
+            body = json.dumps({"response": reply, "done": True}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return StallingOllamaHandler
+
+
+def classify_all(model, n: int, concurrency: int):
+    engine = ClassificationEngine({"mock": model}, max_workers=concurrency, per_provider={"ollama": concurrency})
+    texts = [f"Testimonial {i} about training and trust." for i in range(n)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        results = [r["mock"] for _, _, r in engine.run(records_from_texts(texts), LABELS, NORMALIZED_LABELS)]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="typical response time (s)")
+    parser.add_argument("--slow", type=float, default=1.5, help="response time of a stalled request (s)")
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--hedge-percentile", type=float, default=90)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    state = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.latency, args.slow, args.slow_rate, state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+
+    for hedge in (None, args.hedge_percentile):
+        model = OllamaModel(model_name="mock", api_url=api_url, stream=False)
+        model.latency_guard = LatencyGuard(hedge_percentile=hedge, hedge_budget=0.1)
+        _, elapsed = classify_all(model, args.calls, args.concurrency)
+        # End-to-end latency as seen by the caller, including hedges
+        summary = model.latency_guard.histogram.summary()
+        print(f"\n📊 {'hedged at p%g' % hedge if hedge else 'no hedging'}: {args.calls} calls in {elapsed:.2f}s — "
+              f"p50 {summary['p50_ms']:.0f} ms, p95 {summary['p95_ms']:.0f} ms, p99 {summary['p99_ms']:.0f} ms, "
+              f"max {summary['max_ms']:.0f} ms; stats {model.latency_guard.stats}")
+        print(model.latency_guard.histogram.format())
+
+    # Outage: the breaker opens after 5 failures and the rest are marked missing without being sent
+    state["down"] = True
+    model = OllamaModel(model_name="mock", api_url=api_url, stream=False)
+    model.latency_guard = LatencyGuard(breaker=CircuitBreaker("ollama", failure_threshold=5, reset_after=60))
+    results, elapsed = classify_all(model, 50, 1)
+    missing = sum(1 for result in results if result is None)
+    print(f"\n🔌 outage: 50 calls in {elapsed:.2f}s, {missing} missing results, "
+          f"{model.latency_guard.stats['rejected']} never sent (breaker opened {model.latency_guard.breaker.times_opened}x)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+"""
+Benchmark suite for the parsing and analytics hot paths, on synthetic corpora of several sizes.
+Results are written as JSON and compared against a stored baseline; cases that got slower by
+more than the tolerance are reported as regressions (exit code 1).
+
+    python -m benchmarks.suite                               # default sweep, compare to benchmarks/baseline.json
+    python -m benchmarks.suite --quick                       # 1k / 10k testimonials only
+    python -m benchmarks.suite --cases irr disagreement --sizes 1000 10000
+    python -m benchmarks.suite --save-baseline               # record this machine's numbers as the baseline
+
+Sweeps: testimonials (at 20 labels, 3 models), labels 5-200 and models 2-8 (at 10k testimonials).
+Response parsing cases depend on the label count only, so they run once per label count.
+Each timing is stored with a calibration run taken just before it and compared after scaling for
+machine speed; on shared or throttled hosts, raise --tolerance (e.g. 0.5) to ignore their noise.
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from pipeline.aggregate import (
+    ConceptFrequencyAggregator,
+    ConsensusAggregator,
+    aggregate_concept_frequencies,
+    compute_consensus_labels,
+    export_consensus_to_excel,
+)
+from pipeline.disagreement import (
+    compute_model_disagreements,
+    export_disagreements_to_excel,
+    flag_high_disagreement_testimonials,
+    model_disagreement_percentages,
+    summarize_disagreements,
+)
+from pipeline.irr import compute_irr_scores
+from pipeline.ratings_store import RatingsStore
+from pipeline.visualize import export_irr_to_excel
+from utils.label_index import LabelIndex
+from utils.stemming import stemming
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), "results", "latest.json")
+
+SIZES = [1000, 10000, 100000]
+LABEL_COUNTS = [5, 50, 200]
+MODEL_COUNTS = [2, 3, 8]
+RESPONSES = 2000
+
+WORDS = "the training helped our community build trust and share knowledge with confidence".split()
+
+
+# --- synthetic data ------------------------------------------------------
+
+def synthetic_labels(n_labels: int) -> List[str]:
+    return [f"{WORDS[j % len(WORDS)]} {j}" if j >= len(WORDS) else WORDS[j] for j in range(n_labels)]
+
+
+def synthetic_store(n: int, n_labels: int, n_models: int, seed: int = 0, missing: float = 0.01) -> RatingsStore:
+    """Scores on the 0.1 grid models return, correlated across models, with a few missing ratings."""
+    rng = np.random.default_rng(seed)
+    labels = synthetic_labels(n_labels)
+    models = [f"model{m}" for m in range(n_models)]
+    truth = rng.random((n, n_labels, 1))
+    scores = np.round(np.clip(truth + rng.normal(0, 0.2, (n, n_labels, n_models)), 0, 1), 1)
+    scores[rng.random(scores.shape) < missing] = np.nan
+
+    store = RatingsStore(labels, models, capacity=n)
+    for i in range(n):
+        store.append(i, f"testimonial {i} " + " ".join(rng.choice(WORDS, 20)), {
+            label: {model: scores[i, j, m] for m, model in enumerate(models) if not np.isnan(scores[i, j, m])}
+            for j, label in enumerate(labels)
+        })
+    return store
+
+
+def synthetic_responses(n: int, labels: List[str], seed: int = 0) -> List[str]:
+    """Raw model outputs: fenced JSON with a comment, keys in other casings, an explanation naming some labels."""
+    rng = np.random.default_rng(seed)
+    responses = []
+    for _ in range(n):
+        scores = {label.title().replace(" ", "_"): round(float(rng.random()), 1) for label in labels}
+        mentioned = rng.choice(labels, min(3, len(labels)), replace=False)
+        body = json.dumps({"labels": scores, "explanation": "The speaker talks about " + ", ".join(mentioned) + "."}, indent=2)
+        responses.append(f"```json\n// scores for the testimonial\n{body}\n```")
+    return responses
+
+
+def _parser_model():
+    """A GPT adapter instance for its parsing methods only (no client, no API key needed)."""
+    from models.gpt_model import GPTModel
+    model = GPTModel.__new__(GPTModel)
+    model.model_name = "gpt-bench"
+    return model
+
+
+def _stemming_available() -> Optional[str]:
+    try:
+        stemming.stemmed_words("trust")
+    except LookupError:
+        return "nltk tokenizer data not installed (python -m nltk.downloader punkt_tab)"
+    return None
+
+
+# --- cases -----------------------------------------------------------------
+
+class Case:
+    """A timed function of a prepared scenario; `dims` are the scenario fields it depends on."""
+
+    def __init__(self, name: str, dims, setup: Callable, run: Callable, max_n: Optional[int] = None, per: Optional[str] = None):
+        self.name, self.dims, self.setup, self.run, self.max_n, self.per = name, dims, setup, run, max_n, per
+
+
+def _with_store(run):
+    return lambda s: run(s["store"])
+
+
+def _setup_store(scenario: Dict) -> Dict:
+    return {"store": synthetic_store(scenario["testimonials"], scenario["labels"], scenario["models"])}
+
+
+def _setup_parse(scenario: Dict) -> Dict:
+    labels = synthetic_labels(scenario["labels"])
+    normalized_labels = {label: label for label in labels}
+    LabelIndex.for_run(labels, normalized_labels)
+    return {"model": _parser_model(), "labels": labels, "normalized_labels": normalized_labels,
+            "responses": synthetic_responses(RESPONSES, labels)}
+
+
+def _run_extract(s):
+    for response in s["responses"]:
+        s["model"]._extract_json(response)
+
+
+def _run_parse(s):
+    defer, stemming.defer = stemming.defer, True  # low-score warnings are timed in their own case
+    try:
+        for response in s["responses"]:
+            s["model"]._parse_output(response, s["labels"], s["normalized_labels"])
+    finally:
+        stemming.defer = defer
+        stemming._pending.clear()
+
+
+def _setup_warnings(scenario: Dict) -> Dict:
+    s = _setup_parse(scenario)
+    parsed = []
+    for response in s["responses"]:
+        data = json.loads(s["model"]._extract_json(response))
+        scores = {label: 0.0 for label in s["labels"]}  # every label low, so every one is checked
+        parsed.append((scores, data["explanation"]))
+    s["parsed"] = parsed
+    return s
+
+
+def _run_warnings(s):
+    for scores, explanation in s["parsed"]:
+        s["model"]._warn_on_low_scores(scores, explanation, s["normalized_labels"])
+
+
+def _run_disagreement(store):
+    disagreement_df = compute_model_disagreements(store)
+    summarize_disagreements(disagreement_df)
+    flag_high_disagreement_testimonials(disagreement_df, store.model_names)
+    model_disagreement_percentages(disagreement_df)
+
+
+def _run_aggregate_batch(store):
+    aggregate_concept_frequencies(store, store.model_names)
+    compute_consensus_labels(store, store.model_names)
+
+
+def _setup_ratings(scenario: Dict) -> Dict:
+    store = synthetic_store(scenario["testimonials"], scenario["labels"], scenario["models"])
+    return {"store": store, "ratings": list(store)}
+
+
+def _run_aggregate_incremental(s):
+    concept, consensus = ConceptFrequencyAggregator(s["store"].model_names), ConsensusAggregator(s["store"].model_names)
+    for testimonial in s["ratings"]:
+        concept.add(testimonial)
+        consensus.add(testimonial)
+    concept.snapshot()
+    consensus.snapshot()
+
+
+def _setup_exports(scenario: Dict) -> Dict:
+    s = _setup_store(scenario)
+    store = s["store"]
+    disagreement_df = compute_model_disagreements(store)
+    s.update(
+        irr=compute_irr_scores(store),
+        disagreement=(disagreement_df, summarize_disagreements(disagreement_df),
+                      flag_high_disagreement_testimonials(disagreement_df, store.model_names),
+                      model_disagreement_percentages(disagreement_df)),
+        consensus=compute_consensus_labels(store, store.model_names),
+        directory=tempfile.mkdtemp(),
+    )
+    return s
+
+
+def _run_exports(s):
+    export_irr_to_excel(s["irr"], os.path.join(s["directory"], "irr_scores.xlsx"))
+    export_disagreements_to_excel(*s["disagreement"], out_path=os.path.join(s["directory"], "model_disagreements.xlsx"))
+    export_consensus_to_excel(s["consensus"], os.path.join(s["directory"], "consensus.xlsx"))
+
+
+CORPUS = ("testimonials", "labels", "models")
+CASES = {case.name: case for case in [
+    Case("extract_json", ("labels",), _setup_parse, _run_extract, per="response"),
+    Case("parse_output", ("labels",), _setup_parse, _run_parse, per="response"),
+    Case("low_score_warnings", ("labels",), _setup_warnings, _run_warnings, per="response"),
+    Case("irr", CORPUS, _setup_store, _with_store(compute_irr_scores)),
+    Case("disagreement", CORPUS, _setup_store, _with_store(_run_disagreement)),
+    Case("aggregate_batch", CORPUS, _setup_store, _with_store(_run_aggregate_batch)),
+    Case("aggregate_incremental", CORPUS, _setup_ratings, _run_aggregate_incremental, max_n=10000),
+    Case("excel_exports", CORPUS, _setup_exports, _run_exports, max_n=10000),
+]}
+
+
+# --- running ---------------------------------------------------------------
+
+def scenarios(sizes: List[int], label_counts: List[int], model_counts: List[int]) -> List[Dict]:
+    """The testimonial sweep at 20 labels / 3 models, then label and model sweeps at 10k testimonials."""
+    middle = 10000 if 10000 in sizes else sizes[len(sizes) // 2]
+    combos = [(n, 20, 3) for n in sizes] + [(middle, j, 3) for j in label_counts] + [(middle, 20, m) for m in model_counts]
+    unique = []
+    for n, j, m in combos:
+        if (n, j, m) not in unique:
+            unique.append((n, j, m))
+    return [{"testimonials": n, "labels": j, "models": m} for n, j, m in unique]
+
+
+def time_case(case: Case, state: Dict, repeat: int, min_total: float = 0.5) -> float:
+    """Best of at least `repeat` runs, repeating fast cases until `min_total` seconds have been spent."""
+    best, total, runs = float("inf"), 0.0, 0
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        while runs < repeat or (total < min_total and runs < 100):
+            start = time.perf_counter()
+            case.run(state)
+            elapsed = time.perf_counter() - start
+            best, total, runs = min(best, elapsed), total + elapsed, runs + 1
+            if elapsed > 2.0:
+                break
+    return best
+
+
+def calibrate() -> float:
+    """Seconds for a fixed mix of Python and NumPy work; baseline timings are scaled by how this changed."""
+    rng = np.random.default_rng(0)
+    values = rng.random(200000)
+    matrix = rng.random((300, 300))
+
+    def workload():
+        sorted(values.tolist())
+        json.loads(json.dumps({str(i): i for i in range(20000)}))
+        matrix @ matrix
+        np.sort(values)
+
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        workload()
+        best = min(best, time.perf_counter() - start)
+    return round(best, 6)
+
+
+def run_suite(case_names: List[str], sizes: List[int], label_counts: List[int], model_counts: List[int],
+              repeat: int = 3, full: bool = False) -> List[Dict]:
+    results = []
+    skip_stemming = _stemming_available()
+    for name in case_names:
+        case = CASES[name]
+        done = set()
+        for scenario in scenarios(sizes, label_counts, model_counts):
+            key = tuple(scenario[dim] for dim in case.dims)
+            if key in done:
+                continue
+            done.add(key)
+            point = {dim: scenario[dim] for dim in case.dims}
+            entry = {"case": name, **point}
+            if case.max_n and not full and scenario["testimonials"] > case.max_n:
+                continue
+            if name == "low_score_warnings" and skip_stemming:
+                entry["skipped"] = skip_stemming
+                results.append(entry)
+                print(f"{name:>22} {json.dumps(point):>48}  skipped: {skip_stemming}")
+                continue
+
+            state = case.setup(scenario)
+            try:
+                # Machine speed right before the timing, since shared hosts drift during a run
+                entry["calibration"] = calibrate()
+                seconds = time_case(case, state, repeat)
+            finally:
+                if "directory" in state:
+                    shutil.rmtree(state["directory"], ignore_errors=True)
+            entry["seconds"] = round(seconds, 6)
+            if case.per:
+                entry[f"us_per_{case.per}"] = round(seconds / RESPONSES * 1e6, 2)
+            results.append(entry)
+            per = f"  ({entry[f'us_per_{case.per}']:.1f} µs/{case.per})" if case.per else ""
+            print(f"{name:>22} {json.dumps(point):>48} {seconds:>10.4f} s{per}")
+    return results
+
+
+def _key(entry: Dict) -> str:
+    return json.dumps({k: v for k, v in entry.items() if k in ("case", "testimonials", "labels", "models")}, sort_keys=True)
+
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float, calibrated: bool = True,
+            min_delta: float = 0.005) -> List[Dict]:
+    """
+    Per case and scenario: baseline vs current seconds and their ratio. With `calibrated`, the
+    baseline timing is first scaled by how much slower or faster the calibration workload ran
+    (see `calibrate`). Beyond the tolerance a timing is flagged, unless it moved by less than
+    `min_delta` seconds, which is within run-to-run noise.
+    """
+    previous = {_key(entry): entry for entry in baseline if "seconds" in entry}
+    rows = []
+    for entry in results:
+        old = previous.get(_key(entry))
+        if old is None or "seconds" not in entry:
+            continue
+        speed = entry["calibration"] / old["calibration"] if calibrated and old.get("calibration") else 1.0
+        expected = old["seconds"] * speed
+        ratio = entry["seconds"] / max(expected, 1e-9)
+        status = "ok"
+        if abs(entry["seconds"] - expected) >= min_delta:
+            if ratio > 1 + tolerance:
+                status = "REGRESSION"
+            elif ratio < 1 - tolerance:
+                status = "faster"
+        rows.append({"case": entry["case"], "scenario": {k: v for k, v in json.loads(_key(entry)).items() if k != "case"},
+                     "baseline": old["seconds"], "current": entry["seconds"], "speed": round(speed, 3),
+                     "ratio": round(ratio, 3), "status": status})
+    return rows
+
+
+def environment() -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(__file__)).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--labels", type=int, nargs="+", default=LABEL_COUNTS)
+    parser.add_argument("--models", type=int, nargs="+", default=MODEL_COUNTS)
+    parser.add_argument("--quick", action="store_true", help="only 1k and 10k testimonials")
+    parser.add_argument("--full", action="store_true", help="also run the capped cases at every size")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a case is flagged")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="seconds; smaller changes are never flagged")
+    parser.add_argument("--no-calibration", action="store_true", help="compare raw timings, unscaled by machine speed")
+    parser.add_argument("--save-baseline", action="store_true", help="write these results to --baseline")
+    args = parser.parse_args()
+    sizes = args.sizes
+    if args.quick:
+        sizes = [n for n in sizes if n <= 10000] or sizes
+
+    results = run_suite(args.cases, sizes, args.labels, args.models, args.repeat, args.full)
+    report = {"environment": environment(), "results": results}
+
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📁 Results saved to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📌 Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"⚠️ No baseline at {args.baseline} — run with --save-baseline to record one.")
+        return
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline["results"], args.tolerance, not args.no_calibration, args.min_delta)
+    report["comparison"] = rows
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n📊 Compared with baseline from {baseline['environment'].get('date')} "
+          f"(commit {baseline['environment'].get('commit') or '?'}, {baseline['environment'].get('cpus')} CPUs)"
+          f"{'' if args.no_calibration else ', scaled by calibrated machine speed'}:")
+    for row in rows:
+        if row["status"] != "ok":
+            print(f" - {row['status']:>10} {row['case']} {json.dumps(row['scenario'])}: "
+                  f"{row['baseline']:.4f} s → {row['current']:.4f} s ({row['ratio']:.2f}x at speed {row['speed']:.2f})")
+    regressions = [row for row in rows if row["status"] == "REGRESSION"]
+    print(f"{'❌' if regressions else '✅'} {len(regressions)} regressions in {len(rows)} compared timings "
+          f"(tolerance {args.tolerance:.0%})")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,26 @@
 import csv
 import os
 import json
+import time
 from utils.config import load_config
 from models.model_loader import load_models_from_config
+from pipeline.engine import build_engine_from_config
+from pipeline.batch_jobs import run_batch_job_mode
+from pipeline.ingest import (
+    iter_testimonials,
+    records_from_texts,
+    TestimonialTexts,
+    skip_completed,
+    load_results_csv,
+    RunCheckpoint,
+)
+from utils.response_cache import shared_cache
+from utils.label_index import LabelIndex
+from utils.stemming import stemming
 from pipeline.irr import compute_irr_scores
+from pipeline.ratings_store import build_ratings_store
+from pipeline.near_duplicates import build_near_duplicate_stage
+from utils.output_sinks import open_sink
 from pipeline.visualize import visualize_irr_scores, print_irr_table
 from pipeline.visualize import export_irr_to_excel
 from pipeline.disagreement import (
@@ -14,8 +31,8 @@ from pipeline.disagreement import (
     model_disagreement_percentages,
 )
 from pipeline.aggregate import (
-    aggregate_concept_frequencies,
-    compute_consensus_labels,
+    ConceptFrequencyAggregator,
+    ConsensusAggregator,
     export_consensus_to_excel
 )
 import pandas as pd
@@ -29,49 +46,121 @@ output_path = config.get("output_csv", "conceptual_analysis_output.csv")
 # Load model instances from config
 models = load_models_from_config()
 
-# Testimonials to classify
-testimonials = [
+# Sample testimonials used when no preprocessed JSONL is available
+SAMPLE_TESTIMONIALS = [
     "After receiving training from WiRED, I was able to teach others in my village about malaria prevention. The community now trusts me and people ask me for advice all the time.",
     "I visit homes and share information about clean water. People now recognize me as a health worker.",
     "I had no previous experience, but after training I felt confident talking to people about disease prevention."
 ]
 
+input_path = config.get("input_jsonl", "data/processed/testimonials.jsonl")
+
+
+def testimonial_source():
+    """Lazily yield testimonial records from the preprocessed JSONL (or the built-in samples)."""
+    if os.path.exists(input_path):
+        return iter_testimonials(input_path)
+    print(f"⚠️ {input_path} not found — classifying the built-in sample testimonials.")
+    return records_from_texts(SAMPLE_TESTIMONIALS)
+
+
 # Determine label set
 if config.get("use_generated_labels"):
     from pipeline.topic_modeling import generate_labels_from_topic_model
-    labels = generate_labels_from_topic_model(testimonials, method=config.get("label_source", "bertopic"))
+    labels = generate_labels_from_topic_model(
+        TestimonialTexts(input_path) if os.path.exists(input_path) else SAMPLE_TESTIMONIALS,
+        method=config.get("label_source", "nmf"),
+        settings=config.get("topic_model")
+    )
 else:
     labels = config["labels"]
 
 # Create normalized label map for use during classification and warnings
 normalized_labels = {label.strip().lower().replace("-", " ").replace("_", " "): label for label in labels}
 
+# Build the shared label matcher once; every adapter's parser reuses it
+LabelIndex.set_aliases(config.get("label_aliases", {}))
+LabelIndex.for_run(labels, normalized_labels)
+
+# Low-score stem warnings run inline per response, or as one post-pass after classification
+stemming.defer = config.get("stem_warnings", "inline") == "deferred"
+
 # Prepare output directory
 os.makedirs("data/outputs", exist_ok=True)
 
-# Initialize ratings for IRR
-ratings = []
+# Initialize ratings for IRR: one float32 testimonials × labels × models array
+ratings = build_ratings_store(labels, list(models.keys()), config.get("ratings_store"))
 
 # Collect model explanations
 explanations_log = []
 
+# Resume from the last completed testimonial if a matching checkpoint exists
+checkpoint = RunCheckpoint(config.get("checkpoint_path", "data/outputs/checkpoint.json"))
+state = checkpoint.load() if config.get("resume", True) else None
+model_settings = config.get("model_settings", {}) or {}
+run_signature = {"input": input_path, "labels": labels, "models": list(models.keys()),
+                 "model_settings": {name: model_settings.get(name) or {} for name in models}}
+if state and (state.get("signature") != run_signature or not os.path.exists(output_path)):
+    print("⚠️ Checkpoint does not match this run's input, labels, models or model settings — starting over.")
+    state = None
+
+if state:
+    # Drop any rows written after the last checkpoint, then reload what was completed
+    with open(output_path, "r+", encoding="utf-8") as f:
+        f.truncate(state["csv_bytes"])
+    unrated = state.get("unrated", [])
+    completed_ratings, explanations_log = load_results_csv(output_path, labels, unrated)
+    for testimonial in completed_ratings:
+        ratings.append_rating(testimonial)
+    print(f"⏩ Resuming after testimonial id {state['last_id']} ({state['completed']} already classified)")
+    testimonials = skip_completed(testimonial_source(), state["completed"], state["last_id"])
+    completed = state["completed"]
+else:
+    checkpoint.clear()
+    testimonials = testimonial_source()
+    completed = 0
+    unrated = []
+
+# Testimonials that are near-duplicates of an already classified one reuse its classification
+near_duplicates = build_near_duplicate_stage(config.get("near_duplicates"), labels, list(models.keys()))
+if near_duplicates:
+    testimonials = near_duplicates.filter(testimonials)
+
+# Concept frequencies and consensus are updated per testimonial rather than recomputed over all ratings
+concept_aggregator = ConceptFrequencyAggregator(model_names=list(models.keys()))
+consensus_aggregator = ConsensusAggregator(model_names=list(models.keys()), method="vote")
+if state:
+    concept_aggregator.extend(completed_ratings)
+    consensus_aggregator.extend(completed_ratings)
+
 # Run analysis
-with open(output_path, mode="w", newline="", encoding="utf-8") as csvfile:
+run_started, run_start_completed = time.perf_counter(), completed
+with open(output_path, mode="a" if state else "w", newline="", encoding="utf-8") as csvfile:
     writer = csv.writer(csvfile)
-    writer.writerow(["Model", "Testimonial", *labels, "Explanation"])
-
-    for i, text in enumerate(testimonials):
-        print(f"\n📝 Testimonial {i + 1}:\n{text}")
+    if not state:
+        writer.writerow(["ID", "Topic", "Speaker", "Date", "Model", "Testimonial", *labels, "Explanation"])
+
+    # Classify every (testimonial, model) pair; results come back in input order either way
+    if config.get("run_mode", "interactive") == "batch_job":
+        classified = run_batch_job_mode(testimonials, models, labels, normalized_labels, config)
+    else:
+        classified = build_engine_from_config(models, config).run(testimonials, labels, normalized_labels)
+    if near_duplicates:
+        classified = near_duplicates.merge(classified)
+
+    for _, record, model_results in classified:
+        text = record["text"]
+        metadata = [record["id"], record["topic"], record["speaker"], record["date"]]
+        print(f"\n📝 Testimonial {completed + 1} (id {record['id']}):\n{text}")
         testimonial_ratings = {
+            "id": record["id"],
             "text": text,
             "labels": {}
         }
 
-        for model_name, model in models.items():
-            result = model.classify(text, labels, normalized_labels)
-
+        for model_name, result in model_results.items():
             if not result or "labels" not in result:
-                print(f"⚠️ Skipping model {model_name} due to invalid result.")
+                print(f"⚠️ No result from model {model_name} — recorded as missing.")
                 continue
 
             label_scores = result["labels"]
@@ -83,6 +172,7 @@ with open(output_path, mode="w", newline="", encoding="utf-8") as csvfile:
 
             # Save explanation log
             explanations_log.append({
+                "id": record["id"],
                 "testimonial": text,
                 "model": model_name,
                 "label_scores": json.dumps(label_scores, indent=2),
@@ -96,24 +186,100 @@ with open(output_path, mode="w", newline="", encoding="utf-8") as csvfile:
             print("🧠 Explanation:", explanation)
 
             # CSV row
-            row = [model_name, text] + [label_scores.get(label, 0.0) for label in labels] + [explanation]
+            row = metadata + [model_name, text] + [label_scores.get(label, 0.0) for label in labels] + [explanation]
             writer.writerow(row)
 
-        print(f"✅ Collected ratings for testimonial {i + 1}: {len(testimonial_ratings['labels'])} labels")
+        # No model answered: there are no CSV rows to rebuild it from on resume, so the checkpoint keeps it
+        if not testimonial_ratings["labels"]:
+            unrated.append({"position": completed, "id": record["id"], "text": text})
 
-        ratings.append(testimonial_ratings)
+        # Persist this testimonial's rows before recording it as completed
+        csvfile.flush()
+        completed += 1
+        checkpoint.save({
+            "signature": run_signature,
+            "last_id": record["id"],
+            "completed": completed,
+            "csv_bytes": os.fstat(csvfile.fileno()).st_size,
+            "unrated": unrated
+        })
 
-        # Concept Frequency Aggregation
-        concept_frequencies = aggregate_concept_frequencies(ratings, model_names=list(models.keys()))
+        print(f"✅ Collected ratings for testimonial {completed}: {len(testimonial_ratings['labels'])} labels")
 
-        # Consensus Labeling
-        consensus_labels = compute_consensus_labels(ratings, method="vote", model_names=list(models.keys()))
+        ratings.append_rating(testimonial_ratings)
 
+        # Concept Frequency Aggregation and Consensus Labeling
+        concept_aggregator.add(testimonial_ratings)
+        consensus_aggregator.add(testimonial_ratings)
 
-print(f"\n✅ Results saved to {output_path}")
 
-# Compute IRR scores
-irr_scores = compute_irr_scores(ratings)
+# The run is complete: a rerun starts over instead of resuming after the last testimonial
+checkpoint.clear()
+ratings.flush()
+print(f"\n✅ Results saved to {output_path}")
+run_elapsed = time.perf_counter() - run_started
+if completed > run_start_completed:
+    print(f"⚡ Classified {completed - run_start_completed} testimonials in {run_elapsed:.1f}s "
+          f"({(completed - run_start_completed) / run_elapsed:.2f} testimonials/s)")
+
+if near_duplicates:
+    near_duplicates.close()
+    if near_duplicates.links:
+        print(f"🔁 {len(near_duplicates.links)} near-duplicate testimonials reused a classification "
+              f"({len(near_duplicates.links) * len(models)} model calls saved)")
+
+if stemming.defer:
+    print("\n🔎 Checking explanations for low-scored label mentions...")
+    print(f"🔎 {stemming.run_deferred_checks()} low-score warnings")
+
+# Report how many API calls the response cache saved
+cache = shared_cache(models)
+if cache is not None:
+    stats = cache.stats()
+    print(f"💾 Response cache: {stats['hits']} hits / {stats['misses']} misses "
+          f"(hit rate {stats['hit_rate']:.0%}), {stats['entries']} entries stored")
+
+# Report how much of each model's prompt was served from the provider's prefix cache
+for model_name, model in models.items():
+    if hasattr(model, "usage_summary"):
+        usage = model.usage_summary()
+        if usage["calls"]:
+            print(f"🧮 {model_name}: {usage['cached_tokens']}/{usage['prompt_tokens']} prompt tokens cached "
+                  f"({usage['cached_pct']:.0%}) over {usage['calls']} calls")
+
+# Report per-model latency and any hedged or short-circuited calls
+for model_name, model in models.items():
+    guard = getattr(model, "latency_guard", None)
+    if guard is None or not guard.stats["calls"]:
+        continue
+    summary = guard.histogram.summary()
+    if summary["count"]:
+        print(f"⏱️ {model_name}: p50 {summary['p50_ms']:.0f} ms, p95 {summary['p95_ms']:.0f} ms, "
+              f"p99 {summary['p99_ms']:.0f} ms over {summary['count']} calls")
+        print(guard.histogram.format())
+    if guard.stats["hedged"] or guard.stats["hedges_skipped"] or guard.stats["rejected"]:
+        print(f"   hedged {guard.stats['hedged']} (won {guard.stats['hedge_wins']}, "
+              f"{guard.stats['hedges_skipped']} not sent: rate limits full), "
+              f"{guard.stats['rejected']} skipped by circuit breaker / run deadline")
+
+# Report throttling per provider (models of one provider share a governor)
+governors = {id(model.governor): model.governor for model in models.values() if getattr(model, "governor", None)}
+for governor in governors.values():
+    if governor.stats["retries"] or governor.stats["failures"]:
+        print(f"⏳ {governor.provider}: {governor.stats['throttled']} throttled, {governor.stats['retries']} retries, "
+              f"{governor.stats['failures']} failed calls, concurrency dipped to {governor.stats['min_limit']}")
+
+# Compute IRR scores, with bootstrap confidence intervals if configured
+irr_settings = config.get("irr", {}) or {}
+bootstrap_settings = irr_settings.get("bootstrap", {}) or {}
+irr_scores = compute_irr_scores(
+    ratings,
+    threshold=irr_settings.get("threshold", 0.5),
+    bootstrap=bootstrap_settings.get("replicates", 0),
+    confidence=bootstrap_settings.get("confidence", 0.95),
+    seed=bootstrap_settings.get("seed", 0),
+    workers=bootstrap_settings.get("workers"),
+)
 
 # Save to JSON
 irr_path = "data/outputs/irr_scores.json"
@@ -126,7 +292,9 @@ print(f"📊 IRR scores saved to {irr_path}")
 visualize_irr_scores(irr_scores)
 print_irr_table(irr_scores)
 
-export_irr_to_excel(irr_scores)
+# Output format for the analytics tables (utils/output_sinks.py)
+output_format = (config.get("outputs", {}) or {}).get("format", "xlsx")
+export_irr_to_excel(irr_scores, output_format=output_format)
 
 # Analyze model disagreements
 disagreement_records = compute_model_disagreements(ratings)
@@ -135,25 +303,33 @@ disagreement_summary = summarize_disagreements(disagreement_df)
 flagged_testimonials = flag_high_disagreement_testimonials(disagreement_df, list(models.keys()))
 model_disagreement_summary = model_disagreement_percentages(disagreement_df)
 
-# Convert explanations log to DataFrame
-explanations_df = pd.DataFrame(explanations_log)
+concept_frequencies = concept_aggregator.snapshot()
+consensus_labels = consensus_aggregator.snapshot()
 
-# Export Concept Frequency and Consensus to Excel
+# Export Concept Frequency and Consensus
 concept_output_path = "data/outputs/concept_frequency_consensus.xlsx"
-with pd.ExcelWriter(concept_output_path, engine="openpyxl") as writer:
-    pd.DataFrame(concept_frequencies).to_excel(writer, sheet_name="Concept Frequencies", index=False)
-    pd.DataFrame(consensus_labels).to_excel(writer, sheet_name="Consensus Labels", index=False)
+with open_sink(concept_output_path, output_format) as sink:
+    sink.write_table("Concept Frequencies", pd.DataFrame(concept_frequencies))
+    sink.write_table("Consensus Labels", pd.DataFrame(consensus_labels))
 
-print(f"📊 Concept frequency and consensus saved to {concept_output_path}")
+print(f"📊 Concept frequency and consensus saved to {sink.location}")
 
-# Save disagreement logs to Excel with summary and flags
+# Save disagreement logs with summary and flags; explanations are streamed from the log
 disagreement_output_path = "data/outputs/model_disagreements.xlsx"
-with pd.ExcelWriter(disagreement_output_path, engine="openpyxl") as writer:
-    disagreement_df.to_excel(writer, sheet_name="Disagreements", index=False)
-    disagreement_summary.to_excel(writer, sheet_name="Summary", index=False)
-    model_disagreement_summary.to_excel(writer, sheet_name="Model Summary", index=False)
+explanation_columns = ["id", "testimonial", "model", "label_scores", "explanation"]
+with open_sink(disagreement_output_path, output_format) as sink:
+    sink.write_table("Disagreements", disagreement_df)
+    sink.write_table("Summary", disagreement_summary)
+    sink.write_table("Model Summary", model_disagreement_summary)
     if not flagged_testimonials.empty:
-        flagged_testimonials.to_excel(writer, sheet_name="Flagged", index=False)
-    explanations_df.to_excel(writer, sheet_name="Explanations", index=False)
+        sink.write_table("Flagged", flagged_testimonials)
+    sink.write_rows("Explanations", explanation_columns,
+                    ([entry[column] for column in explanation_columns] for entry in explanations_log))
+
+print(f"📉 Disagreement log saved to {sink.location}")
 
-print(f"📉 Disagreement log saved to {disagreement_output_path}")
+# Record which testimonials reused a representative's classification
+if near_duplicates and near_duplicates.links:
+    with open_sink("data/outputs/near_duplicates.xlsx", output_format) as sink:
+        sink.write_table("Near Duplicates", pd.DataFrame(near_duplicates.links))
+    print(f"🔁 Near-duplicate links saved to {sink.location}")
@@ -0,0 +1,419 @@
+"""
+Local stand-in for the OpenAI Batch API and Anthropic Message Batches, so the
+submit / poll / collect cycle in pipeline/batch_jobs.py can run with no network.
+
+    python -m mock_llm.batch_server --port 8765          # serve until Ctrl+C
+    python -m mock_llm.batch_server --smoke              # run a full GPT + Claude cycle against it
+
+Point the adapters at it with model_settings.<gpt|claude>.base_url:
+    gpt:    http://127.0.0.1:8765/v1
+    claude: http://127.0.0.1:8765
+"""
+import re
+import json
+import time
+import uuid
+import zlib
+import argparse
+import threading
+from datetime import datetime, timezone
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from mock_llm.responses import fake_completion
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class FakeBatchState:
+    """
+    In-memory files and batches; a batch completes after `polls_to_complete` status checks.
+    The `fail_rate` share of items error, or with `expire` are left unprocessed and the batch
+    ends expired (OpenAI) / those items expired (Anthropic), as when the 24h window runs out.
+    With `throttle_rpm`, interactive endpoints answer 429 + Retry-After once a provider
+    has been sent more than that many requests per minute, enforced over a sliding
+    `throttle_window` (shorter windows make demos quick).
+    """
+
+    def __init__(self, polls_to_complete: int = 2, fail_rate: float = 0.0, throttle_rpm: int = 0,
+                 throttle_window: float = 60.0, expire: bool = False):
+        self.polls_to_complete = polls_to_complete
+        self.fail_rate = fail_rate
+        self.expire = expire
+        self.throttle_rpm = throttle_rpm
+        self.throttle_window = throttle_window
+        self.files = {}
+        self.batches = {}
+        self.recent = {}
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def retry_after(self, provider: str) -> float:
+        """0 if the request is within the per-minute limit, else seconds until a slot frees up."""
+        if not self.throttle_rpm:
+            return 0.0
+        now = time.time()
+        limit = max(1, int(self.throttle_rpm * self.throttle_window / 60))
+        with self.lock:
+            window = [t for t in self.recent.get(provider, []) if now - t < self.throttle_window]
+            if len(window) >= limit:
+                self.recent[provider] = window
+                self.throttled += 1
+                return max(0.05, self.throttle_window - (now - window[0]))
+            window.append(now)
+            self.recent[provider] = window
+            return 0.0
+
+    def should_fail(self, custom_id: str) -> bool:
+        # Deterministic per custom id so reruns see the same failures
+        return self.fail_rate > 0 and (zlib.crc32(custom_id.encode('utf-8')) % 1000) / 1000 < self.fail_rate
+
+
+class FakeBatchHandler(BaseHTTPRequestHandler):
+    state: FakeBatchState = None
+
+    # --- plumbing -------------------------------------------------------
+
+    def _send_json(self, payload, status: int = 200, headers: dict = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_text(self, text: str, content_type: str = "application/jsonl"):
+        body = text.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def log_message(self, *args):
+        pass
+
+    # --- routing --------------------------------------------------------
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        if path == "/v1/files":
+            return self._openai_upload_file()
+        if path == "/v1/batches":
+            return self._openai_create_batch()
+        if path == "/v1/messages/batches":
+            return self._anthropic_create_batch()
+        if match := re.fullmatch(r"/v1/batches/([^/]+)/cancel", path):
+            return self._openai_cancel_batch(match.group(1))
+        if match := re.fullmatch(r"/v1/messages/batches/([^/]+)/cancel", path):
+            return self._anthropic_cancel_batch(match.group(1))
+        # Interactive endpoints, used when a batch item fails and the caller falls back
+        if path == "/v1/chat/completions":
+            body = json.loads(self._read_body())
+            if wait := self.state.retry_after("openai"):
+                return self._send_json({"error": {"message": "Rate limit reached for requests", "type": "requests",
+                                                  "code": "rate_limit_exceeded"}}, 429, {"retry-after": f"{wait:.2f}"})
+            return self._send_json(self._openai_completion(body))
+        if path == "/v1/messages":
+            body = json.loads(self._read_body())
+            if wait := self.state.retry_after("anthropic"):
+                return self._send_json({"type": "error", "error": {"type": "rate_limit_error",
+                                                                   "message": "Number of requests has exceeded your rate limit"}},
+                                       429, {"retry-after": f"{wait:.2f}"})
+            return self._send_json(self._anthropic_message(body))
+        self._send_json({"error": {"message": f"Unknown route {path}"}}, 404)
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if match := re.fullmatch(r"/v1/files/([^/]+)/content", path):
+            return self._openai_file_content(match.group(1))
+        if match := re.fullmatch(r"/v1/batches/([^/]+)", path):
+            return self._openai_retrieve_batch(match.group(1))
+        if match := re.fullmatch(r"/v1/messages/batches/([^/]+)/results", path):
+            return self._anthropic_results(match.group(1))
+        if match := re.fullmatch(r"/v1/messages/batches/([^/]+)", path):
+            return self._anthropic_retrieve_batch(match.group(1))
+        self._send_json({"error": {"message": f"Unknown route {path}"}}, 404)
+
+    # --- OpenAI ---------------------------------------------------------
+
+    def _openai_upload_file(self):
+        raw = self._read_body()
+        header = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8")
+        message = BytesParser(policy=HTTP).parsebytes(header + raw)
+
+        content, filename, purpose = b"", "batch.jsonl", "batch"
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if name == "file":
+                content = part.get_payload(decode=True)
+                filename = part.get_filename() or filename
+            elif name == "purpose":
+                purpose = part.get_payload(decode=True).decode("utf-8")
+
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        with self.state.lock:
+            self.state.files[file_id] = content.decode("utf-8")
+        self._send_json({
+            "id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+            "filename": filename, "purpose": purpose, "status": "processed"
+        })
+
+    def _openai_batch_payload(self, batch: dict) -> dict:
+        return {k: v for k, v in batch.items() if not k.startswith("_")}
+
+    def _openai_create_batch(self):
+        request = json.loads(self._read_body())
+        with self.state.lock:
+            lines = [json.loads(line) for line in self.state.files[request["input_file_id"]].splitlines() if line.strip()]
+            batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+            batch = {
+                "id": batch_id, "object": "batch", "endpoint": request["endpoint"],
+                "input_file_id": request["input_file_id"], "completion_window": request["completion_window"],
+                "status": "validating", "output_file_id": None, "error_file_id": None,
+                "created_at": int(time.time()),
+                "request_counts": {"total": len(lines), "completed": 0, "failed": 0},
+                "_requests": lines, "_polls": 0,
+            }
+            self.state.batches[batch_id] = batch
+        self._send_json(self._openai_batch_payload(batch))
+
+    def _openai_retrieve_batch(self, batch_id: str):
+        with self.state.lock:
+            batch = self.state.batches.get(batch_id)
+            if batch is None:
+                return self._send_json({"error": {"message": "batch not found"}}, 404)
+            batch["_polls"] += 1
+            if batch["status"] in ("validating", "in_progress"):
+                batch["status"] = "in_progress"
+                if batch["_polls"] >= self.state.polls_to_complete:
+                    self._openai_complete(batch)
+            payload = self._openai_batch_payload(batch)
+        self._send_json(payload)
+
+    def _openai_complete(self, batch: dict):
+        out_lines = []
+        failed = 0
+        for request in batch["_requests"]:
+            custom_id = request["custom_id"]
+            if self.state.should_fail(custom_id):
+                failed += 1
+                if not self.state.expire:
+                    out_lines.append({"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": custom_id,
+                                      "response": None, "error": {"code": "server_error", "message": "Injected failure"}})
+                continue
+            out_lines.append({
+                "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                "custom_id": custom_id,
+                "response": {
+                    "status_code": 200,
+                    "request_id": uuid.uuid4().hex,
+                    "body": self._openai_completion(request["body"]),
+                },
+                "error": None,
+            })
+
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        self.state.files[file_id] = "\n".join(json.dumps(line) for line in out_lines) + "\n"
+        batch.update({
+            "status": "expired" if self.state.expire and failed else "completed", "output_file_id": file_id,
+            "completed_at": int(time.time()),
+            "request_counts": {"total": len(batch["_requests"]), "completed": len(batch["_requests"]) - failed,
+                               "failed": failed},
+        })
+
+    def _openai_cancel_batch(self, batch_id: str):
+        with self.state.lock:
+            batch = self.state.batches.get(batch_id)
+            if batch is None:
+                return self._send_json({"error": {"message": "batch not found"}}, 404)
+            if batch["status"] != "completed":
+                batch.update({"status": "cancelled", "cancelled_at": int(time.time())})
+            payload = self._openai_batch_payload(batch)
+        self._send_json(payload)
+
+    @staticmethod
+    def _openai_completion(body: dict, text: str = None) -> dict:
+        prompt = body["messages"][-1]["content"]
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion",
+            "created": int(time.time()), "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": text or fake_completion(prompt, body["model"])}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 50,
+                      "total_tokens": len(prompt) // 4 + 50},
+        }
+
+    def _openai_file_content(self, file_id: str):
+        with self.state.lock:
+            content = self.state.files.get(file_id)
+        if content is None:
+            return self._send_json({"error": {"message": "file not found"}}, 404)
+        self._send_text(content)
+
+    # --- Anthropic ------------------------------------------------------
+
+    def _anthropic_batch_payload(self, batch: dict) -> dict:
+        ended = batch["processing_status"] == "ended"
+        return {
+            "id": batch["id"], "type": "message_batch",
+            "processing_status": batch["processing_status"],
+            "request_counts": batch["request_counts"],
+            "created_at": _iso(batch["_created"]),
+            "expires_at": _iso(batch["_created"] + 86400),
+            "ended_at": _iso(batch["_ended"]) if ended else None,
+            "archived_at": None, "cancel_initiated_at": _iso(batch["_cancel_requested"]) if batch.get("_cancel_requested") else None,
+            "results_url": f"{self._base_url()}/v1/messages/batches/{batch['id']}/results" if ended else None,
+        }
+
+    def _anthropic_create_batch(self):
+        request = json.loads(self._read_body())
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+        batch = {
+            "id": batch_id, "processing_status": "in_progress",
+            "request_counts": {"processing": len(request["requests"]), "succeeded": 0, "errored": 0,
+                               "canceled": 0, "expired": 0},
+            "_requests": request["requests"], "_polls": 0, "_created": time.time(), "_ended": None, "_results": None,
+        }
+        with self.state.lock:
+            self.state.batches[batch_id] = batch
+            payload = self._anthropic_batch_payload(batch)
+        self._send_json(payload)
+
+    def _anthropic_retrieve_batch(self, batch_id: str):
+        with self.state.lock:
+            batch = self.state.batches.get(batch_id)
+            if batch is None:
+                return self._send_json({"type": "error", "error": {"type": "not_found_error", "message": "batch not found"}}, 404)
+            batch["_polls"] += 1
+            if batch["_polls"] >= self.state.polls_to_complete and batch["processing_status"] != "ended":
+                self._anthropic_complete(batch)
+            payload = self._anthropic_batch_payload(batch)
+        self._send_json(payload)
+
+    def _anthropic_complete(self, batch: dict):
+        results = []
+        errored = 0
+        for request in batch["_requests"]:
+            custom_id = request["custom_id"]
+            if self.state.should_fail(custom_id):
+                errored += 1
+                results.append({"custom_id": custom_id, "result": {"type": "expired"}} if self.state.expire else {
+                    "custom_id": custom_id, "result": {
+                        "type": "errored",
+                        "error": {"type": "error", "error": {"type": "api_error", "message": "Injected failure"}}
+                    }})
+                continue
+            results.append({"custom_id": custom_id, "result": {
+                "type": "succeeded", "message": self._anthropic_message(request["params"])
+            }})
+
+        batch.update({
+            "processing_status": "ended", "_ended": time.time(), "_results": results,
+            "request_counts": {"processing": 0, "succeeded": len(results) - errored,
+                               "errored": 0 if self.state.expire else errored,
+                               "canceled": 0, "expired": errored if self.state.expire else 0},
+        })
+
+    def _anthropic_cancel_batch(self, batch_id: str):
+        with self.state.lock:
+            batch = self.state.batches.get(batch_id)
+            if batch is None:
+                return self._send_json({"type": "error", "error": {"type": "not_found_error", "message": "batch not found"}}, 404)
+            if batch["processing_status"] != "ended":
+                batch["processing_status"] = "canceling"
+                batch["_cancel_requested"] = time.time()
+            payload = self._anthropic_batch_payload(batch)
+        self._send_json(payload)
+
+    @staticmethod
+    def _anthropic_message(params: dict, text: str = None) -> dict:
+        prompt = params["messages"][-1]["content"]
+        if isinstance(prompt, list):
+            prompt = "\n\n".join(block.get("text", "") for block in prompt)
+        return {
+            "id": f"msg_{uuid.uuid4().hex[:24]}", "type": "message", "role": "assistant",
+            "model": params["model"],
+            "content": [{"type": "text", "text": text or fake_completion(prompt, params["model"])}],
+            "stop_reason": "end_turn", "stop_sequence": None,
+            "usage": {"input_tokens": len(prompt) // 4, "output_tokens": 50},
+        }
+
+    def _anthropic_results(self, batch_id: str):
+        with self.state.lock:
+            batch = self.state.batches.get(batch_id)
+            results = batch and batch["_results"]
+        if not results:
+            return self._send_json({"type": "error", "error": {"type": "not_found_error", "message": "results not ready"}}, 404)
+        self._send_text("\n".join(json.dumps(result) for result in results) + "\n", "application/binary")
+
+
+def start_fake_batch_server(host: str = "127.0.0.1", port: int = 0, polls_to_complete: int = 2,
+                            fail_rate: float = 0.0, throttle_rpm: int = 0,
+                            throttle_window: float = 60.0, expire: bool = False) -> ThreadingHTTPServer:
+    """Start the fake batch server on a daemon thread; `server.server_address` gives the bound port."""
+    handler = type("BoundFakeBatchHandler", (FakeBatchHandler,),
+                   {"state": FakeBatchState(polls_to_complete, fail_rate, throttle_rpm, throttle_window, expire)})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _smoke_test(fail_rate: float):
+    """Run the full GPT + Claude batch-job cycle against a throwaway fake server."""
+    from models.gpt_model import GPTModel
+    from models.claude_model import ClaudeModel
+    from pipeline.batch_jobs import run_batch_job_mode
+    from pipeline.ingest import records_from_texts
+
+    server = start_fake_batch_server(fail_rate=fail_rate)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    models = {
+        "gpt": GPTModel(api_key="sk-fake", temperature=0.0, base_url=f"{base}/v1"),
+        "claude": ClaudeModel(api_key="sk-ant-fake", temperature=0.0, base_url=base),
+    }
+    labels = ["training", "trust", "community impact", "confidence", "knowledge sharing"]
+    normalized_labels = {label: label for label in labels}
+    texts = [f"After training {i}, my community trusts me and I share knowledge." for i in range(10)]
+    config = {"batch_jobs": {"poll_interval": 0.05, "work_dir": "data/batch_jobs/smoke"}}
+
+    start = time.perf_counter()
+    rows = list(run_batch_job_mode(records_from_texts(texts), models, labels, normalized_labels, config))
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    for i, record, results in rows:
+        print(f"{record['id']:>3}  " + "  ".join(f"{name}: {result['labels']}" for name, result in results.items()))
+    print(f"\n✅ {len(rows)} testimonials × {len(models)} models via fake batch jobs in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--polls-to-complete", type=int, default=2)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of batch items that error")
+    parser.add_argument("--throttle-rpm", type=int, default=0, help="429 interactive calls beyond this many per minute")
+    parser.add_argument("--smoke", action="store_true", help="run a self-contained submit/poll/collect cycle and exit")
+    args = parser.parse_args()
+
+    if args.smoke:
+        _smoke_test(args.fail_rate)
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), type("BoundFakeBatchHandler", (FakeBatchHandler,), {
+            "state": FakeBatchState(args.polls_to_complete, args.fail_rate, args.throttle_rpm)
+        }))
+        print(f"🧪 Fake batch server on http://{args.host}:{args.port}")
+        server.serve_forever()
@@ -0,0 +1,66 @@
+import re
+import json
+import random
+import hashlib
+from typing import Dict, List
+
+RE_CATEGORIES = re.compile(r"Available categories:\s*(.+)")
+RE_BATCH_ITEM = re.compile(r'\[id: ([^\]]+)\]\s*"""(.*?)"""', re.DOTALL)
+RE_TESTIMONIAL = re.compile(r'"""(.*?)"""', re.DOTALL)
+
+
+def prompt_labels(prompt: str) -> List[str]:
+    match = RE_CATEGORIES.search(prompt)
+    if not match:
+        return []
+    return [label.strip() for label in match.group(1).split(",") if label.strip()]
+
+
+def fake_scores(labels: List[str], text: str, seed: str = "") -> Dict[str, float]:
+    """Deterministic pseudo-random scores, so repeated runs produce identical outputs."""
+    rnd = random.Random(hashlib.md5(f"{seed}\x1f{text}".encode("utf-8")).hexdigest())
+    return {label: round(rnd.random(), 1) for label in labels}
+
+
+def fake_completion(prompt: str, seed: str = "") -> str:
+    """
+    Answer a generate_prompt / generate_batch_prompt prompt with label JSON
+    in the shape the adapters' parsers expect.
+    """
+    labels = prompt_labels(prompt)
+    items = RE_BATCH_ITEM.findall(prompt)
+    if items:
+        return json.dumps([
+            {"id": item_id, "labels": fake_scores(labels, text, seed), "explanation": "Mock batch classification."}
+            for item_id, text in items
+        ])
+
+    match = RE_TESTIMONIAL.search(prompt)
+    text = match.group(1) if match else prompt
+    return json.dumps({"labels": fake_scores(labels, text, seed), "explanation": "Mock classification."})
+
+
+# Ways a model answer goes wrong: cut off mid-JSON, no JSON at all, JSON wrapped in a code
+# fence and commentary (recoverable), and JSON with labels missing or renamed
+MALFORMED_KINDS = ("truncated", "prose", "fenced", "missing_labels")
+
+
+def malformed_completion(prompt: str, seed: str = "", kind: str = "truncated", rnd: random.Random = None) -> str:
+    """A broken variant of fake_completion's answer, for exercising the adapters' parsers and retries."""
+    rnd = rnd or random.Random(seed)
+    completion = fake_completion(prompt, seed)
+    if kind == "truncated":
+        return completion[:rnd.randint(1, max(1, len(completion) - 2))]
+    if kind == "prose":
+        labels = prompt_labels(prompt) or ["the main topic"]
+        return f"This testimonial is mostly about {rnd.choice(labels)}, with some mention of other themes."
+    if kind == "fenced":
+        return f"Here is my classification:\n```json\n{completion}\n```\nLet me know if you need more detail."
+    if kind == "missing_labels":
+        data = json.loads(completion)
+        for item in data if isinstance(data, list) else [data]:
+            labels = list(item["labels"])
+            for label in rnd.sample(labels, k=len(labels) // 2):
+                item["labels"][label.upper() if rnd.random() < 0.5 else f"{label}_x"] = item["labels"].pop(label)
+        return json.dumps(data)
+    raise ValueError(f"Unknown malformed output kind: {kind} (choose from {', '.join(MALFORMED_KINDS)})")
@@ -0,0 +1,424 @@
+"""
+Local stand-in for the interactive APIs of all four providers, so main.py can be load-tested
+end to end with no API spend, network or local GPU:
+
+    OpenAI      POST /v1/chat/completions
+    Anthropic   POST /v1/messages
+    Google      POST /v1beta/models/<model>:generateContent   (the SDK's REST transport)
+    Ollama      POST /api/generate (streamed or not, prefix `context`, unload), GET /api/tags
+
+Answers are fake_completion label JSON for the categories in the prompt. Latency, injected
+errors, 429s and malformed answers are configurable, per provider if needed. The batch
+endpoints of mock_llm.batch_server are served as well, and GET /stats reports what was served.
+
+    python -m mock_llm.server --port 8766 --latency lognormal:400:0.5 --error-rate 0.01 --malformed-rate 0.02
+    python -m mock_llm.server --settings mock.yaml   # {default: {...}, openai: {...}, ...}, keys as in DEFAULT_BEHAVIOUR
+    python -m mock_llm.server --smoke                # classify testimonials through every adapter and exit
+
+Point main.py at it with model_settings.<name>.base_url (any non-empty API keys will do):
+    gpt:                    http://127.0.0.1:8766/v1
+    claude, gemini:         http://127.0.0.1:8766
+    mistral, llama3, ...:   http://127.0.0.1:8766
+"""
+import re
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import yaml
+
+from mock_llm.batch_server import FakeBatchHandler, FakeBatchState
+from mock_llm.responses import MALFORMED_KINDS, fake_completion, malformed_completion
+
+PROVIDERS = ("openai", "anthropic", "google", "ollama")
+OLLAMA_MODELS = ("mistral:latest", "llama3:latest", "qwen:7b", "mixtral:latest")
+
+DEFAULT_BEHAVIOUR = {
+    "latency": "fixed:0",                    # see LatencyModel
+    "error_rate": 0.0,                       # fraction of requests answered with a 500
+    "throttle_rate": 0.0,                    # fraction answered with a 429 + Retry-After
+    "retry_after": 1.0,                      # seconds, sent with injected 429s
+    "malformed_rate": 0.0,                   # fraction of answers that are broken
+    "malformed_kinds": list(MALFORMED_KINDS),
+    "error_pattern": None,                   # regex: prompts matching it always get a 500
+}
+
+
+class LatencyModel:
+    """
+    Response time drawn from a distribution written "<kind>:<params>", times in ms:
+    fixed:200, uniform:100:500, normal:300:50 (mean, sd), lognormal:300:0.5 (median, sigma),
+    exponential:200 (mean).
+    """
+    KINDS = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exponential": 1}
+
+    def __init__(self, spec: str = "fixed:0"):
+        kind, *params = str(spec).split(":")
+        if kind not in self.KINDS or len(params) != self.KINDS[kind]:
+            raise ValueError(f"Bad latency spec '{spec}' (e.g. fixed:200, uniform:100:500, normal:300:50, "
+                             f"lognormal:300:0.5, exponential:200)")
+        self.spec = spec
+        self.kind = kind
+        self.params = [float(param) for param in params]
+
+    def sample(self, rnd: random.Random) -> float:
+        """Seconds."""
+        a, b = (self.params + [0.0])[:2]
+        if self.kind == "fixed":
+            ms = a
+        elif self.kind == "uniform":
+            ms = rnd.uniform(a, b)
+        elif self.kind == "normal":
+            ms = rnd.gauss(a, b)
+        elif self.kind == "lognormal":
+            ms = a * math.exp(rnd.gauss(0.0, b))
+        else:
+            ms = rnd.expovariate(1.0 / a) if a > 0 else 0.0
+        return max(0.0, ms) / 1000
+
+
+class MockLLMState(FakeBatchState):
+    """
+    Batch state plus per-provider behaviour and counters. Every injection decision comes from
+    one generator seeded with `seed`, so a sequential run sees the same errors every time.
+    """
+
+    def __init__(self, behaviour: Optional[Dict] = None, seed: int = 0, ollama_models=OLLAMA_MODELS, **batch_options):
+        super().__init__(**batch_options)
+        behaviour = behaviour or {}
+        unknown = set(behaviour) - {"default", *PROVIDERS}
+        if unknown:
+            raise ValueError(f"Unknown provider in mock behaviour: {', '.join(sorted(unknown))}")
+
+        default = dict(DEFAULT_BEHAVIOUR, **(behaviour.get("default") or {}))
+        self.behaviour = {}
+        for provider in PROVIDERS:
+            settings = dict(default, **(behaviour.get(provider) or {}))
+            settings["latency"] = LatencyModel(settings["latency"])
+            for kind in settings["malformed_kinds"]:
+                if kind not in MALFORMED_KINDS:
+                    raise ValueError(f"Unknown malformed output kind: {kind} (choose from {', '.join(MALFORMED_KINDS)})")
+            self.behaviour[provider] = settings
+
+        self.rnd = random.Random(seed)
+        self.ollama_models = list(ollama_models)
+        self.contexts = {}
+        self.started = time.time()
+        self.stats = {provider: {"requests": 0, "ok": 0, "errors": 0, "throttled": 0, "malformed": 0, "latency_s": 0.0}
+                      for provider in PROVIDERS}
+
+    def plan(self, provider: str, prompt: str = "") -> Dict:
+        """
+        How to answer one request: {"status": 200 / 429 / 500, "retry_after", "latency", "malformed", "rnd"}.
+        The sliding-window limit of `throttle_rpm` applies before the random injections; a prompt
+        matching `error_pattern` fails every time, without using up a random draw.
+        """
+        wait = self.retry_after(provider)
+        behaviour = self.behaviour[provider]
+        with self.lock:
+            stats = self.stats[provider]
+            stats["requests"] += 1
+            if behaviour["error_pattern"] and re.search(behaviour["error_pattern"], prompt):
+                stats["errors"] += 1
+                return {"status": 500}
+            rnd = random.Random(self.rnd.getrandbits(64))
+            roll = rnd.random()
+            if wait or roll < behaviour["throttle_rate"]:
+                stats["throttled"] += 1
+                return {"status": 429, "retry_after": wait or behaviour["retry_after"]}
+            if roll < behaviour["throttle_rate"] + behaviour["error_rate"]:
+                stats["errors"] += 1
+                return {"status": 500}
+
+            malformed = None
+            if behaviour["malformed_kinds"] and rnd.random() < behaviour["malformed_rate"]:
+                malformed = rnd.choice(behaviour["malformed_kinds"])
+                stats["malformed"] += 1
+            latency = behaviour["latency"].sample(rnd)
+            stats["ok"] += 1
+            stats["latency_s"] += latency
+        return {"status": 200, "latency": latency, "malformed": malformed, "rnd": rnd}
+
+    def context_for(self, prefix: str) -> List[int]:
+        """Fake Ollama token context for a prompt prefix: its first entry finds the prefix again."""
+        with self.lock:
+            key = next((k for k, p in self.contexts.items() if p == prefix), None)
+            if key is None:
+                key = len(self.contexts) + 1
+                self.contexts[key] = prefix
+        return [key] + [0] * max(0, len(prefix) // 4 - 1)
+
+    def prefix_for(self, context: List[int]) -> str:
+        with self.lock:
+            return self.contexts.get(context[0], "") if context else ""
+
+    def summary(self) -> Dict:
+        with self.lock:
+            elapsed = time.time() - self.started
+            providers = {}
+            for provider, stats in self.stats.items():
+                if not stats["requests"]:
+                    continue
+                providers[provider] = dict(stats, latency_s=round(stats["latency_s"], 3),
+                                           mean_latency_ms=round(1000 * stats["latency_s"] / stats["ok"], 1) if stats["ok"] else 0.0)
+            total = sum(stats["requests"] for stats in self.stats.values())
+        return {"uptime_s": round(elapsed, 3), "requests": total,
+                "requests_per_s": round(total / elapsed, 2) if elapsed else 0.0, "providers": providers}
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class MockLLMHandler(FakeBatchHandler):
+    state: MockLLMState = None
+
+    # --- routing --------------------------------------------------------
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        if path == "/v1/chat/completions":
+            return self._openai_chat(json.loads(self._read_body()))
+        if path == "/v1/messages":
+            return self._anthropic_messages(json.loads(self._read_body()))
+        if match := re.fullmatch(r"/v1beta/models/([^/:]+):generateContent", path):
+            return self._gemini_generate(match.group(1), json.loads(self._read_body()))
+        if path == "/api/generate":
+            return self._ollama_generate(json.loads(self._read_body()))
+        super().do_POST()
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/stats":
+            return self._send_json(self.state.summary())
+        if path == "/v1/models":
+            return self._list_models()
+        if path == "/v1beta/models":
+            return self._gemini_list_models()
+        if path == "/api/tags":
+            return self._send_json({"models": [{"name": name, "model": name, "modified_at": _now_iso(), "size": 0}
+                                               for name in self.state.ollama_models]})
+        super().do_GET()
+
+    # --- shared ---------------------------------------------------------
+
+    def _answer(self, provider: str, prompt: str, model: str):
+        """(plan, text) for an interactive request, or (plan, None) once an injected error has been sent."""
+        plan = self.state.plan(provider, prompt)
+        if plan["status"] != 200:
+            self._send_error(provider, plan["status"], plan.get("retry_after"))
+            return plan, None
+        if plan["malformed"]:
+            return plan, malformed_completion(prompt, model, plan["malformed"], plan["rnd"])
+        return plan, fake_completion(prompt, model)
+
+    def _send_error(self, provider: str, status: int, retry_after: float = None):
+        throttled = status == 429
+        message = "Rate limit reached (injected by mock server)" if throttled else "Internal server error (injected by mock server)"
+        if provider == "openai":
+            payload = {"error": {"message": message, "type": "requests" if throttled else "server_error",
+                                 "code": "rate_limit_exceeded" if throttled else None}}
+        elif provider == "anthropic":
+            payload = {"type": "error", "error": {"type": "rate_limit_error" if throttled else "api_error", "message": message}}
+        elif provider == "google":
+            payload = {"error": {"code": status, "message": message,
+                                 "status": "RESOURCE_EXHAUSTED" if throttled else "INTERNAL"}}
+        else:
+            payload = {"error": message}
+        self._send_json(payload, status, {"retry-after": f"{retry_after:.2f}"} if retry_after else None)
+
+    def _list_models(self):
+        # Both SDKs' health checks list models at /v1/models; only Anthropic's send anthropic-version
+        if self.headers.get("anthropic-version"):
+            return self._send_json({"data": [{"type": "model", "id": "claude-opus-4-20250514", "display_name": "Mock Claude",
+                                              "created_at": _now_iso()}],
+                                    "has_more": False, "first_id": "claude-opus-4-20250514", "last_id": "claude-opus-4-20250514"})
+        self._send_json({"object": "list", "data": [{"id": "gpt-4", "object": "model", "created": int(time.time()),
+                                                     "owned_by": "mock"}]})
+
+    # --- OpenAI / Anthropic ----------------------------------------------
+
+    def _openai_chat(self, body: dict):
+        plan, text = self._answer("openai", body["messages"][-1]["content"], body["model"])
+        if text is not None:
+            time.sleep(plan["latency"])
+            self._send_json(self._openai_completion(body, text))
+
+    def _anthropic_messages(self, body: dict):
+        prompt = body["messages"][-1]["content"]
+        if isinstance(prompt, list):
+            prompt = "\n\n".join(block.get("text", "") for block in prompt)
+        plan, text = self._answer("anthropic", prompt, body["model"])
+        if text is not None:
+            time.sleep(plan["latency"])
+            self._send_json(self._anthropic_message(body, text))
+
+    # --- Gemini ---------------------------------------------------------
+
+    def _gemini_generate(self, model: str, body: dict):
+        prompt = "".join(part.get("text", "") for part in body["contents"][-1]["parts"])
+        plan, text = self._answer("google", prompt, model)
+        if text is None:
+            return
+        time.sleep(plan["latency"])
+        self._send_json({
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"},
+                            "finishReason": "STOP", "index": 0, "safetyRatings": []}],
+            "usageMetadata": {"promptTokenCount": _tokens(prompt), "candidatesTokenCount": _tokens(text),
+                              "totalTokenCount": _tokens(prompt) + _tokens(text)},
+            "modelVersion": model,
+        })
+
+    def _gemini_list_models(self):
+        self._send_json({"models": [{
+            "name": "models/gemini-1.5-pro-latest", "baseModelId": "", "version": "001",
+            "displayName": "Mock Gemini", "description": "Mock model", "inputTokenLimit": 1048576,
+            "outputTokenLimit": 8192, "supportedGenerationMethods": ["generateContent"],
+            "temperature": 1.0, "topP": 0.95, "topK": 40,
+        }]})
+
+    # --- Ollama ---------------------------------------------------------
+
+    def _ollama_generate(self, body: dict):
+        model = body["model"]
+        if not body.get("prompt") and body.get("keep_alive") == 0:
+            return self._send_json({"model": model, "created_at": _now_iso(), "response": "",
+                                    "done": True, "done_reason": "unload"})
+        if (body.get("options") or {}).get("num_predict") == 1 and not body.get("stream", True):
+            # OllamaModel evaluating an instruction prefix for reuse_prefix_context
+            return self._send_json({"model": model, "created_at": _now_iso(), "response": "", "done": True,
+                                    "done_reason": "length", "context": self.state.context_for(body["prompt"]),
+                                    "prompt_eval_count": _tokens(body["prompt"]), "eval_count": 1})
+
+        prompt = body["prompt"]
+        if body.get("context"):
+            prompt = f"{self.state.prefix_for(body['context'])}\n\n{prompt}"
+        plan, text = self._answer("ollama", prompt, model)
+        if text is None:
+            return
+
+        final = {"model": model, "created_at": _now_iso(), "response": "", "done": True, "done_reason": "stop",
+                 "total_duration": int(plan["latency"] * 1e9),
+                 "prompt_eval_count": _tokens(body["prompt"]), "eval_count": _tokens(text)}
+        if not body.get("stream", True):
+            time.sleep(plan["latency"])
+            return self._send_json(dict(final, response=text))
+
+        # One chunk per word, with the latency spread over them like tokens arriving
+        pieces = re.findall(r"\s*\S+", text) or [text]
+        delay = plan["latency"] / (len(pieces) + 1)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            for piece in pieces:
+                time.sleep(delay)
+                chunk = {"model": model, "created_at": _now_iso(), "response": piece, "done": False}
+                self.wfile.write((json.dumps(chunk) + "\n").encode("utf-8"))
+                self.wfile.flush()
+            time.sleep(delay)
+            self.wfile.write((json.dumps(final) + "\n").encode("utf-8"))
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading once the JSON was complete (stop_after_json)
+            pass
+
+
+def start_mock_llm_server(host: str = "127.0.0.1", port: int = 0, behaviour: Optional[Dict] = None, seed: int = 0,
+                          ollama_models=OLLAMA_MODELS, **batch_options) -> ThreadingHTTPServer:
+    """Start the mock server on a daemon thread; `server.server_address` gives the bound port."""
+    handler = type("BoundMockLLMHandler", (MockLLMHandler,),
+                   {"state": MockLLMState(behaviour, seed, ollama_models, **batch_options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _smoke_test(server: ThreadingHTTPServer, n_testimonials: int, concurrency: int):
+    """Classify testimonials through every adapter pointed at the mock server and report throughput."""
+    from models.gpt_model import GPTModel
+    from models.claude_model import ClaudeModel
+    from models.ollama_model import OllamaModel
+    from pipeline.engine import ClassificationEngine
+    from pipeline.ingest import records_from_texts
+
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    models = {
+        "gpt": GPTModel(api_key="sk-fake", temperature=0.0, base_url=f"{base}/v1"),
+        "claude": ClaudeModel(api_key="sk-ant-fake", temperature=0.0, base_url=base),
+        "mistral": OllamaModel(model_name="mistral", api_url=f"{base}/api/generate"),
+    }
+    try:
+        from models.gemini_model import GeminiModel
+        models["gemini"] = GeminiModel(api_key="fake", base_url=base)
+    except Exception as e:
+        # google-generativeai missing or too old for GenerativeModel
+        print(f"⚠️ Skipping gemini: {e}")
+
+    labels = ["training", "trust", "community impact", "confidence", "knowledge sharing"]
+    normalized_labels = {label: label for label in labels}
+    texts = [f"Testimonial {i}: after the training, my community trusts me and I share knowledge with confidence."
+             for i in range(n_testimonials)]
+    engine = ClassificationEngine(models, max_workers=concurrency * len(models),
+                                  per_provider={model.provider: concurrency for model in models.values()})
+
+    start = time.perf_counter()
+    rows = list(engine.run(records_from_texts(texts), labels, normalized_labels))
+    elapsed = time.perf_counter() - start
+
+    calls = len(rows) * len(models)
+    missing = sum(1 for _, _, results in rows for result in results.values() if result is None)
+    print(f"\n✅ {len(rows)} testimonials × {len(models)} models in {elapsed:.2f}s "
+          f"({calls / elapsed:.1f} calls/s), {missing} missing results")
+    print(json.dumps(server.RequestHandlerClass.state.summary(), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--settings", help="YAML file with per-provider behaviour overrides")
+    parser.add_argument("--latency", help="default latency distribution, e.g. lognormal:400:0.5")
+    parser.add_argument("--error-rate", type=float, help="fraction of requests answered with a 500")
+    parser.add_argument("--throttle-rate", type=float, help="fraction of requests answered with a 429")
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with injected 429s")
+    parser.add_argument("--malformed-rate", type=float, help="fraction of answers that are broken")
+    parser.add_argument("--throttle-rpm", type=int, default=0, help="also 429 any provider beyond this many requests per minute")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--smoke", action="store_true", help="classify testimonials through every adapter and exit")
+    parser.add_argument("--testimonials", type=int, default=50, help="testimonials for --smoke")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight per provider for --smoke")
+    args = parser.parse_args()
+
+    behaviour = {}
+    if args.settings:
+        with open(args.settings, "r") as f:
+            behaviour = yaml.safe_load(f) or {}
+    overrides = {"latency": args.latency, "error_rate": args.error_rate, "throttle_rate": args.throttle_rate,
+                 "retry_after": args.retry_after, "malformed_rate": args.malformed_rate}
+    behaviour["default"] = dict(behaviour.get("default") or {}, **{k: v for k, v in overrides.items() if v is not None})
+
+    if args.smoke:
+        server = start_mock_llm_server(behaviour=behaviour, seed=args.seed, throttle_rpm=args.throttle_rpm)
+        _smoke_test(server, args.testimonials, args.concurrency)
+        server.shutdown()
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), type("BoundMockLLMHandler", (MockLLMHandler,), {
+            "state": MockLLMState(behaviour, args.seed, throttle_rpm=args.throttle_rpm)
+        }))
+        server.daemon_threads = True
+        print(f"🧪 Mock LLM server on http://{args.host}:{args.port} (GET /stats for counters)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print(json.dumps(server.RequestHandlerClass.state.summary(), indent=2))
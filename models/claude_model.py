@@ -5,88 +5,118 @@ import re
 from typing import List, Dict
 from dotenv import load_dotenv
 from models.base_model import BaseModel
-from utils.prompt_template import generate_prompt
+from utils.prompt_template import generate_prompt, split_prompt
 from utils.model_safety_mixin import ModelSafetyMixin  # Shared mixin
+from utils.response_cache import CachedResponseMixin, ResponseCache
+from utils.batch_mixin import BatchClassifyMixin
+from utils.token_usage import TokenUsageMixin
+from utils.label_index import LabelIndex
 
 load_dotenv()
 
-class ClaudeModel(BaseModel, ModelSafetyMixin):
-    def __init__(self, api_key: str = None, temperature: float = 0.7, model: str = "claude-opus-4-20250514"):
+class ClaudeModel(BaseModel, ModelSafetyMixin, CachedResponseMixin, BatchClassifyMixin, TokenUsageMixin):
+    provider = "anthropic"
+
+    def __init__(self, api_key: str = None, temperature: float = 0.7, model: str = "claude-opus-4-20250514", cache: ResponseCache = None,
+                 base_url: str = None, timeout: float = 120.0):
         self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
         self.model_name = model
         self.temperature = temperature
-        self.client = anthropic.Anthropic(api_key=self.api_key)
+        self.cache = cache
+        self.client = anthropic.Anthropic(api_key=self.api_key, base_url=base_url, timeout=timeout)
+
+    def health_check(self):
+        """Cheap authenticated request; raises if the API is unreachable or the key is rejected."""
+        self.client.models.list(limit=1)
+
+    def _request_params(self, prompt: str) -> Dict:
+        """
+        Messages request parameters, shared by interactive calls and batch jobs.
+        The static instruction prefix is sent as its own block marked with cache_control,
+        so Anthropic can serve it from the prompt cache on every later testimonial.
+        """
+        prefix, suffix = split_prompt(prompt)
+        if prefix:
+            content = [
+                {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": suffix}
+            ]
+        else:
+            content = prompt
+
+        return {
+            "model": self.model_name,
+            "temperature": self.temperature,
+            "max_tokens": 1024,
+            "messages": [
+                {"role": "user", "content": content}
+            ]
+        }
+
+    def _call_api(self, prompt: str) -> str:
+        response = self.client.messages.create(**self._request_params(prompt))
+        self._record_anthropic_usage(getattr(response, "usage", None))
+        return response.content[0].text
+
+    def _record_anthropic_usage(self, usage):
+        if usage is None:
+            return
+        cache_read = getattr(usage, "cache_read_input_tokens", 0) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", 0) or 0
+        self._record_usage(
+            prompt_tokens=usage.input_tokens + cache_read + cache_write,
+            cached_tokens=cache_read,
+            completion_tokens=usage.output_tokens
+        )
 
     def classify(self, text: str, labels: List[str], normalized_labels: Dict[str, str]) -> Dict:
         prompt = generate_prompt(text, labels)
 
         try:
-            response = self.client.messages.create(
-                model=self.model_name,
-                temperature=self.temperature,
-                max_tokens=1024,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-
-            raw_output = response.content[0].text
+            raw_output = self._generate(prompt)
+        except Exception as e:
+            # No answer is a missing rating, not a row of zeros
+            print("[ERROR] Claude API call failed:", e)
+            return None
+
+        try:
             print("\n[DEBUG] Claude raw output:\n", raw_output)
 
             return self._parse_output(raw_output, labels, normalized_labels)
 
         except Exception as e:
-            print("[ERROR] Claude API call failed:", e)
+            print("[ERROR] Claude response could not be parsed:", e)
+            self._evict_response(prompt)
             return {
                 "labels": {label: 0.0 for label in labels},
                 "binned_labels": {label: 0 for label in labels},
-                "explanation": f"API call failed: {str(e)}"
+                "explanation": f"Parsing failed: {str(e)}"
             }
 
     def _parse_output(self, text: str, labels: List[str], normalized_labels: Dict[str, str]) -> Dict:
-        try:
-            json_str = self._extract_json(text)
-            data = json.loads(json_str)
-
-            score_block = data.get("labels", data)
-            explanation = data.get("explanation", text.replace(json_str, "").strip())
-
-            normalized_block = {}
-            for k, v in score_block.items():
-                norm_key = self._normalize_label(k)
-                for defined_label in labels:
-                    if self._normalize_label(defined_label) == norm_key:
-                        normalized_block[defined_label] = v
-                        break
-                else:
-                    print(f"⚠️ Unexpected label from Claude: '{k}' → normalized as '{norm_key}'")
-
-            for k in score_block:
-                print(f"Normalized '{k}' → '{self._normalize_label(k)}'")
-
-            parsed_scores = {
-                canonical_label: float(normalized_block.get(norm_label, 0.0))
-                for norm_label, canonical_label in normalized_labels.items()
-            }
+        json_str = self._extract_json(text)
+        data = json.loads(json_str)
 
-            binned_scores = {
-                label: 1 if parsed_scores.get(label, 0.0) >= 0.5 else 0 for label in labels
-            }
+        score_block = data.get("labels", data)
+        explanation = data.get("explanation", text.replace(json_str, "").strip())
 
-            self._warn_on_low_scores(parsed_scores, explanation, normalized_labels)
+        label_index = LabelIndex.for_run(labels, normalized_labels)
+        parsed_scores = label_index.parse_scores(score_block, source="Claude")
 
-            return {
-                "labels": parsed_scores,
-                "binned_labels": binned_scores,
-                "explanation": explanation
-            }
+        for k in score_block:
+            print(f"Normalized '{k}' → '{label_index.normalized(k)}'")
 
-        except Exception as e:
-            return {
-                "labels": {label: 0.0 for label in labels},
-                "binned_labels": {label: 0 for label in labels},
-                "explanation": f"Failed to parse JSON: {str(e)}"
-            }
+        binned_scores = {
+            label: 1 if parsed_scores.get(label, 0.0) >= 0.5 else 0 for label in labels
+        }
+
+        self._warn_on_low_scores(parsed_scores, explanation, normalized_labels)
+
+        return {
+            "labels": parsed_scores,
+            "binned_labels": binned_scores,
+            "explanation": explanation
+        }
 
 
 
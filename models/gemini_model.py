@@ -6,71 +6,87 @@ from models.base_model import BaseModel
 from typing import List, Dict
 from utils.prompt_template import generate_prompt
 from utils.model_safety_mixin import ModelSafetyMixin  # NEW
+from utils.response_cache import CachedResponseMixin, ResponseCache
+from utils.batch_mixin import BatchClassifyMixin
+from utils.label_index import LabelIndex
 
 load_dotenv()
 
-class GeminiModel(BaseModel, ModelSafetyMixin):
-    def __init__(self, api_key: str = None, temperature: float = 0.0, model_name: str = "gemini-1.5-pro-latest"):
+class GeminiModel(BaseModel, ModelSafetyMixin, CachedResponseMixin, BatchClassifyMixin):
+    provider = "google"
+
+    def __init__(self, api_key: str = None, temperature: float = 0.0, model_name: str = "gemini-1.5-pro-latest", cache: ResponseCache = None,
+                 base_url: str = None, timeout: float = 120.0):
         self.model_name = model_name
         self.temperature = temperature
+        self.cache = cache
+        self.timeout = timeout
 
         api_key = api_key or os.getenv("GOOGLE_API_KEY")
         if not api_key:
             raise ValueError("Google API key not found in .env under GOOGLE_API_KEY.")
 
-        genai.configure(api_key=api_key)
+        if base_url:
+            # The REST transport accepts an http:// endpoint such as a local mock server
+            genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": base_url})
+        else:
+            genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(model_name=self.model_name)
 
+    def health_check(self):
+        """Cheap authenticated request; raises if the API is unreachable or the key is rejected."""
+        next(iter(genai.list_models()), None)
+
+    def _call_api(self, prompt: str) -> str:
+        response = self.model.generate_content(prompt, request_options={"timeout": self.timeout})
+        return response.text.strip()
+
     def classify(self, text: str, labels: List[str], normalized_labels: Dict[str, str]) -> Dict:
         prompt = generate_prompt(text, labels)
 
         try:
-            response = self.model.generate_content(prompt)
-            raw_text = response.text.strip()
+            raw_text = self._generate(prompt)
+        except Exception as e:
+            # No answer is a missing rating, not a row of zeros
+            print(f"⚠️ Gemini API call failed: {e}")
+            return None
 
+        try:
             print(f"\n[DEBUG] Raw Gemini output:\n{raw_text}\n")
 
-            json_str = self._extract_json(raw_text)
-            result = json.loads(json_str)
+            return self._parse_output(raw_text, labels, normalized_labels)
 
-            score_block = result.get("labels", result)
-            explanation = result.get("explanation", raw_text.replace(json_str, "").strip())
+        except Exception as e:
+            print(f"⚠️ Gemini classification failed: {e}")
+            self._evict_response(prompt)
+            return {
+                "labels": {label: 0.0 for label in labels},
+                "binned_labels": {label: 0 for label in labels},
+                "explanation": "Parsing failed"
+            }
 
-            normalized_block = {}
-            for k, v in score_block.items():
-                norm_key = self._normalize_label(k)
-                for defined_label in labels:
-                    if self._normalize_label(defined_label) == norm_key:
-                        normalized_block[defined_label] = v
-                        break
-                else:
-                    print(f"⚠️ Unexpected label from model: '{k}' → normalized as '{norm_key}'")
+    def _parse_output(self, raw_text: str, labels: List[str], normalized_labels: Dict[str, str]) -> Dict:
+        json_str = self._extract_json(raw_text)
+        result = json.loads(json_str)
 
-            for k in score_block:
-                print(f"Normalized '{k}' → '{self._normalize_label(k)}'")
+        score_block = result.get("labels", result)
+        explanation = result.get("explanation", raw_text.replace(json_str, "").strip())
 
-            parsed_scores = {
-                canonical_label: float(normalized_block.get(norm_label, 0.0))
-                for norm_label, canonical_label in normalized_labels.items()
-            }
+        label_index = LabelIndex.for_run(labels, normalized_labels)
+        parsed_scores = label_index.parse_scores(score_block, source="model")
 
-            binned_scores = {
-                label: 1 if parsed_scores.get(label, 0.0) >= 0.5 else 0 for label in labels
-            }
+        for k in score_block:
+            print(f"Normalized '{k}' → '{label_index.normalized(k)}'")
 
-            self._warn_on_low_scores(parsed_scores, explanation, normalized_labels)
+        binned_scores = {
+            label: 1 if parsed_scores.get(label, 0.0) >= 0.5 else 0 for label in labels
+        }
 
-            return {
-                "labels": parsed_scores,
-                "binned_labels": binned_scores,
-                "explanation": explanation
-            }
+        self._warn_on_low_scores(parsed_scores, explanation, normalized_labels)
 
-        except Exception as e:
-            print(f"⚠️ Gemini classification failed: {e}")
-            return {
-                "labels": {label: 0.0 for label in labels},
-                "binned_labels": {label: 0 for label in labels},
-                "explanation": "Parsing failed or API call failed"
-            }
+        return {
+            "labels": parsed_scores,
+            "binned_labels": binned_scores,
+            "explanation": explanation
+        }
 
@@ -7,85 +7,106 @@ from typing import List, Dict
 from models.base_model import BaseModel
 from utils.prompt_template import generate_prompt
 from utils.model_safety_mixin import ModelSafetyMixin  # Shared mixin
+from utils.response_cache import CachedResponseMixin, ResponseCache
+from utils.batch_mixin import BatchClassifyMixin
+from utils.token_usage import TokenUsageMixin
+from utils.label_index import LabelIndex
 
 load_dotenv()
 
-class GPTModel(BaseModel, ModelSafetyMixin):
-    def __init__(self, api_key: str = None, model: str = "gpt-4", temperature: float = 0.7):
+class GPTModel(BaseModel, ModelSafetyMixin, CachedResponseMixin, BatchClassifyMixin, TokenUsageMixin):
+    provider = "openai"
+
+    def __init__(self, api_key: str = None, model: str = "gpt-4", temperature: float = 0.7, cache: ResponseCache = None,
+                 base_url: str = None, timeout: float = 120.0):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         self.model_name = model
         self.temperature = temperature
-        self.client = OpenAI(api_key=self.api_key)
+        self.cache = cache
+        self.client = OpenAI(api_key=self.api_key, base_url=base_url, timeout=timeout)
+
+    def health_check(self):
+        """Cheap authenticated request; raises if the API is unreachable or the key is rejected."""
+        self.client.models.list()
+
+    def _request_body(self, prompt: str) -> Dict:
+        """
+        Chat-completions request body, shared by interactive calls and batch jobs.
+        The system message and the static prompt prefix come first so OpenAI's automatic
+        prefix caching can reuse them across testimonials.
+        """
+        return {
+            "model": self.model_name,
+            "messages": [{"role": "system", "content": "You are a helpful classifier."},
+                         {"role": "user", "content": prompt}],
+            "temperature": self.temperature
+        }
+
+    def _call_api(self, prompt: str) -> str:
+        response = self.client.chat.completions.create(**self._request_body(prompt))
+        self._record_openai_usage(getattr(response, "usage", None))
+        return response.choices[0].message.content.strip()
+
+    def _record_openai_usage(self, usage):
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        self._record_usage(
+            prompt_tokens=usage.prompt_tokens,
+            cached_tokens=getattr(details, "cached_tokens", 0) if details else 0,
+            completion_tokens=usage.completion_tokens
+        )
 
     def classify(self, text: str, labels: List[str], normalized_labels: Dict[str, str]) -> Dict:
         prompt = generate_prompt(text, labels)
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "system", "content": "You are a helpful classifier."},
-                          {"role": "user", "content": prompt}],
-                temperature=self.temperature
-            )
-            reply = response.choices[0].message.content.strip()
+            reply = self._generate(prompt)
+        except Exception as e:
+            # No answer is a missing rating, not a row of zeros
+            print("[ERROR] GPT API call failed:", e)
+            return None
+
+        try:
             print("\n[DEBUG] GPT raw output:\n", reply)
 
             return self._parse_output(reply, labels, normalized_labels)
 
         except Exception as e:
-            print("[ERROR] GPT API call failed:", e)
+            print("[ERROR] GPT response could not be parsed:", e)
+            self._evict_response(prompt)
             return {
                 "labels": {label: 0.0 for label in labels},
                 "binned_labels": {label: 0 for label in labels},
-                "explanation": f"API call failed: {str(e)}"
+                "explanation": f"Parsing failed: {str(e)}"
             }
 
     def _parse_output(self, text: str, labels: List[str], normalized_labels: Dict[str, str]) -> Dict:
         def bin_score(score: float) -> int:
             return 1 if score >= 0.5 else 0
 
-        try:
-            json_str = self._extract_json(text)
-            data = json.loads(json_str)
-
-            score_block = data.get("labels", data)
-            explanation = data.get("explanation", text.replace(json_str, "").strip())
-
-            normalized_block = {}
-            for k, v in score_block.items():
-                norm_key = self._normalize_label(k)
-                for defined_label in labels:
-                    if self._normalize_label(defined_label) == norm_key:
-                        normalized_block[defined_label] = v
-                        break
-                else:
-                    print(f"⚠️ Unexpected label from GPT: '{k}' → normalized as '{norm_key}'")
-
-            for k in score_block:
-                print(f"Normalized '{k}' → '{self._normalize_label(k)}'")
-
-            parsed_scores = {
-                canonical_label: float(normalized_block.get(norm_label, 0.0))
-                for norm_label, canonical_label in normalized_labels.items()
-            }
+        json_str = self._extract_json(text)
+        data = json.loads(json_str)
 
-            binned_scores = {
-                label: bin_score(parsed_scores.get(label, 0.0)) for label in labels
-            }
+        score_block = data.get("labels", data)
+        explanation = data.get("explanation", text.replace(json_str, "").strip())
 
-            self._warn_on_low_scores(parsed_scores, explanation, normalized_labels)
+        label_index = LabelIndex.for_run(labels, normalized_labels)
+        parsed_scores = label_index.parse_scores(score_block, source="GPT")
 
-            return {
-                "labels": parsed_scores,
-                "binned_labels": binned_scores,
-                "explanation": explanation
-            }
+        for k in score_block:
+            print(f"Normalized '{k}' → '{label_index.normalized(k)}'")
 
-        except Exception as e:
-            return {
-                "labels": {label: 0.0 for label in labels},
-                "binned_labels": {label: 0 for label in labels},
-                "explanation": f"Failed to parse JSON: {str(e)}"
-            }
+        binned_scores = {
+            label: bin_score(parsed_scores.get(label, 0.0)) for label in labels
+        }
+
+        self._warn_on_low_scores(parsed_scores, explanation, normalized_labels)
+
+        return {
+            "labels": parsed_scores,
+            "binned_labels": binned_scores,
+            "explanation": explanation
+        }
 
 
@@ -1,42 +1,131 @@
 import yaml
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
 from dotenv import load_dotenv
-from models.ollama_model import OllamaModel
-from models.gpt_model import GPTModel
-from models.claude_model import ClaudeModel
-from models.gemini_model import GeminiModel
+from utils.response_cache import build_response_cache
+from utils.rate_limiter import attach_governor, build_governors
+from utils.latency import attach_latency_guards
 import os
 
 load_dotenv()
 
+# Provider name → builder(name, settings, cache). Adapter modules (and their SDKs)
+# are imported inside each builder, so only providers listed under `models` are loaded.
+PROVIDER_BUILDERS: Dict[str, Callable] = {}
+
+# Default provider for each model name; model_settings.<name>.provider overrides it
+MODEL_PROVIDERS = {
+    "gpt": "openai",
+    "claude": "anthropic",
+    "gemini": "google",
+    "mistral": "ollama",
+    "llama3": "ollama",
+    "qwen:7b": "ollama",
+    "mixtral": "ollama",
+}
+
+
+def register_provider(name: str):
+    def decorator(builder: Callable) -> Callable:
+        PROVIDER_BUILDERS[name] = builder
+        return builder
+    return decorator
+
+
+@register_provider("ollama")
+def build_ollama(name: str, settings: Dict, cache):
+    from models.ollama_model import OllamaModel
+    base_url = settings.get("base_url", "http://localhost:11434")
+    return OllamaModel(model_name=name, temperature=settings.get("temperature", 0.0), cache=cache,
+                       api_url=base_url.rstrip("/") + "/api/generate",
+                       keep_alive=settings.get("keep_alive", "10m"),
+                       reuse_prefix_context=settings.get("reuse_prefix_context", False),
+                       stream=settings.get("stream", True),
+                       stop_after_json=settings.get("stop_after_json", True),
+                       options=settings.get("options"),
+                       timeout=settings["timeout"])
+
+
+@register_provider("openai")
+def build_openai(name: str, settings: Dict, cache):
+    from models.gpt_model import GPTModel
+    api_key = os.getenv("OPENAI_API_KEY")
+    print("Loaded GPT API Key:", (api_key or "")[:8], "...")  # confirm
+    return GPTModel(api_key=api_key, model="gpt-4", temperature=settings.get("temperature", 0.0), cache=cache,
+                    base_url=settings.get("base_url"), timeout=settings["timeout"])
+
+
+@register_provider("anthropic")
+def build_anthropic(name: str, settings: Dict, cache):
+    from models.claude_model import ClaudeModel
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    return ClaudeModel(api_key=api_key, temperature=settings.get("temperature", 0.0), cache=cache,
+                       base_url=settings.get("base_url"), timeout=settings["timeout"])
+
+
+@register_provider("google")
+def build_google(name: str, settings: Dict, cache):
+    from models.gemini_model import GeminiModel
+    api_key = os.getenv("GOOGLE_API_KEY")
+    return GeminiModel(api_key=api_key, temperature=settings.get("temperature", 0.0), cache=cache,
+                       base_url=settings.get("base_url"), timeout=settings["timeout"])
+
+
+def provider_for(name: str, settings: Dict) -> str:
+    provider = settings.get("provider") or MODEL_PROVIDERS.get(name)
+    if provider not in PROVIDER_BUILDERS:
+        raise ValueError(f"Unsupported model: {name}")
+    return provider
+
+
+def build_model(name: str, settings: Dict, cache, health_check: bool = False):
+    model = PROVIDER_BUILDERS[provider_for(name, settings)](name, settings, cache)
+
+    # Testimonials packed into one prompt (1 = one request per testimonial)
+    model.batch_size = max(1, int(settings.get("batch_size", 1)))
+
+    if health_check and hasattr(model, "health_check"):
+        try:
+            model.health_check()
+            print(f"✅ {name} is reachable")
+        except Exception as e:
+            print(f"⚠️ Health check failed for {name}: {e}")
+    return model
+
+
 def load_models_from_config(config_path="config.yaml"):
     with open(config_path, "r") as f:
         config = yaml.safe_load(f)
 
     model_names = config.get("models", [])
-    model_settings = config.get("model_settings", {})
-    loaded_models = {}
-
-    for name in model_names:
-        temperature = model_settings.get(name, {}).get("temperature", 0.0)
-
-        if name in ["mistral", "llama3", "qwen:7b", "mixtral"]:
-            loaded_models[name] = OllamaModel(model_name=name, temperature=temperature)
+    model_settings = config.get("model_settings", {}) or {}
+    startup = config.get("startup", {}) or {}
+    cache = build_response_cache(config.get("response_cache"))
 
-        elif name == "gpt":
-            api_key = os.getenv("OPENAI_API_KEY")
-            print("Loaded GPT API Key:", api_key[:8], "...")  # confirm
-            loaded_models[name] = GPTModel(api_key=api_key, model="gpt-4", temperature=temperature)
+    # Fail on unknown names before any provider is imported
+    call_timeout = (config.get("latency", {}) or {}).get("call_timeout", 120)
+    settings_by_name = {name: {"timeout": call_timeout, **(model_settings.get(name, {}) or {})} for name in model_names}
+    for name, settings in settings_by_name.items():
+        provider_for(name, settings)
 
-        elif name == "claude":
-            api_key = os.getenv("ANTHROPIC_API_KEY")
-            loaded_models[name] = ClaudeModel(api_key=api_key, temperature=temperature)
+    health_check = startup.get("health_check", False)
+    if startup.get("parallel", True) and len(model_names) > 1:
+        with ThreadPoolExecutor(max_workers=len(model_names), thread_name_prefix="model-init") as pool:
+            futures = {
+                name: pool.submit(build_model, name, settings, cache, health_check)
+                for name, settings in settings_by_name.items()
+            }
+            loaded_models = {name: future.result() for name, future in futures.items()}
+    else:
+        loaded_models = {
+            name: build_model(name, settings, cache, health_check)
+            for name, settings in settings_by_name.items()
+        }
 
-        elif name == "gemini":
-            api_key = os.getenv("GOOGLE_API_KEY")
-            loaded_models[name] = GeminiModel(api_key=api_key, temperature=temperature)
-
-        else:
-            raise ValueError(f"Unsupported model: {name}")
+    # Models of the same provider share one governor, since quotas are per account
+    governors = build_governors(config)
+    for model in loaded_models.values():
+        attach_governor(model, governors.get(model.provider))
+    attach_latency_guards(loaded_models, config)
 
     return loaded_models
-
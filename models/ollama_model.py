@@ -1,110 +1,248 @@
 import requests
+from requests.adapters import HTTPAdapter
 from models.base_model import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Optional
 import re
 import json
-from utils.prompt_template import generate_prompt
-import nltk
-from nltk.stem import PorterStemmer
-from nltk.tokenize import word_tokenize
-import re
+import threading
+import time
+from utils.prompt_template import generate_prompt, split_prompt
+from utils.response_cache import CachedResponseMixin, ResponseCache
+from utils.batch_mixin import BatchClassifyMixin
+from utils.token_usage import TokenUsageMixin
+from utils.label_index import LabelIndex, normalize_label
+from utils.stemming import stemming
+
+
+class _JsonEndTracker:
+    """
+    Follows streamed text and reports when the first top-level JSON value has closed,
+    ignoring brackets inside strings, so generation can be stopped right there. Only
+    `openers` start the value: single prompts expect an object, so a preamble such as
+    "scores [0-1]: {...}" doesn't end the stream at its "]"; batch prompts also allow an array.
+    """
+
+    def __init__(self, openers: str = "{"):
+        self.openers = openers
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, chunk: str) -> int:
+        """Offset in `chunk` just past the closing bracket, or -1 if the value is still open."""
+        for i, ch in enumerate(chunk):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"' and self.started:
+                self.in_string = True
+            elif ch in self.openers or (ch in "{[" and self.started):
+                self.started = True
+                self.depth += 1
+            elif ch in "}]" and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    return i + 1
+        return -1
 
-class OllamaModel(BaseModel):
-    def __init__(self, model_name="mistral", temperature: float = 0.0):
-        self.api_url = "http://localhost:11434/api/generate"
+
+class OllamaModel(BaseModel, CachedResponseMixin, BatchClassifyMixin, TokenUsageMixin):
+    provider = "ollama"
+
+    def __init__(self, model_name="mistral", temperature: float = 0.0, api_url: str = "http://localhost:11434/api/generate",
+                 cache: ResponseCache = None, keep_alive: str = "10m", reuse_prefix_context: bool = False,
+                 stream: bool = True, stop_after_json: bool = True, options: Optional[Dict] = None,
+                 timeout=(5, 600), pool_size: int = 8):
+        self.api_url = api_url
         self.model_name = model_name
         self.temperature = temperature
+        self.cache = cache
+        self.keep_alive = keep_alive
+        self.reuse_prefix_context = reuse_prefix_context
+        self.stream = stream
+        self.stop_after_json = stop_after_json
+        # Passed straight to Ollama, e.g. num_predict / num_ctx / num_thread from model_settings
+        self.options = {"temperature": temperature, **(options or {})}
+        # (connect, read) seconds; a single number is the read / whole-call deadline
+        self.timeout = tuple(timeout) if isinstance(timeout, (tuple, list)) else (5, timeout)
+        self._prefix_contexts = {}
+        self._context_lock = threading.Lock()
 
-    def classify(self, text: str, labels: List[str], normalized_labels: Dict[str, str]) -> Dict:
-        prompt = generate_prompt(text, labels)
+        # One pooled keep-alive connection set per model instead of a new socket per call
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
-        try:
-            response = requests.post(self.api_url, json={
-                "model": self.model_name,
-                "prompt": prompt,
-                "temperature": self.temperature,
-                "stream": False
-            })
+    def health_check(self):
+        """Raise if the Ollama server is down or this model has not been pulled."""
+        tags_url = self.api_url.rsplit("/api/", 1)[0] + "/api/tags"
+        response = self.session.get(tags_url, timeout=5)
+        response.raise_for_status()
+        names = {m.get("name", "") for m in response.json().get("models", [])}
+        if self.model_name not in names and f"{self.model_name}:latest" not in names:
+            raise RuntimeError(f"model '{self.model_name}' is not pulled on {tags_url}")
 
-            raw_output = response.json().get("response", "")
+    def unload(self):
+        """Ask Ollama to release this model's weights now instead of waiting for keep_alive."""
+        response = self.session.post(self.api_url, json={"model": self.model_name, "keep_alive": 0},
+                                     timeout=self.timeout)
+        response.raise_for_status()
 
-            print(f"\n[DEBUG] Raw Ollama output:\n{raw_output}\n")
+    def _call_api(self, prompt: str) -> str:
+        payload = {
+            "model": self.model_name,
+            "prompt": prompt,
+            "temperature": self.temperature,
+            "stream": self.stream,
+            "keep_alive": self.keep_alive,
+            "options": self.options
+        }
 
-            json_str = self._extract_json(raw_output)
-            output_dict = json.loads(json_str)
-
-            # Handle nested vs flat JSON and normalize label keys
-            score_block = output_dict.get("labels", output_dict)  # fallback if not nested
-            explanation = output_dict.get("explanation", raw_output.replace(json_str, "").strip())
-
-            # Normalize keys in score_block and map them to config-defined labels
-            normalized_block = {}
-            for k, v in score_block.items():
-                norm_key = self._normalize_label(k)
-                for defined_label in labels:
-                    if self._normalize_label(defined_label) == norm_key:
-                        normalized_block[defined_label] = v
-                        break
-                else:
-                    # Log unexpected keys if no match is found
-                    print(f"⚠️ Unexpected label from model: '{k}' → normalized as '{norm_key}'")
-
-            # DEBUG: Show how each label key was normalized
-            for k in score_block.keys():
-                print(f"Normalized '{k}' → '{self._normalize_label(k)}'")
-
-            # Build parsed_scores using canonical label names
-            parsed_scores = {}
-            for norm_label, canonical_label in normalized_labels.items():
-                parsed_scores[canonical_label] = float(normalized_block.get(norm_label, 0.0))
-                
-            binned_scores = {
-                label: 1 if parsed_scores.get(label, 0.0) >= 0.5 else 0 for label in labels
-            }
+        # Evaluate the static prefix once and continue from its context for each testimonial
+        prefix, suffix = split_prompt(prompt)
+        context = self._prefix_context(prefix) if prefix and self.reuse_prefix_context else None
+        if context:
+            payload["prompt"] = suffix
+            payload["context"] = context
 
-            # Warn about unexpected label keys
-            for key in score_block:
-                normalized = self._normalize_label(key)
-                if normalized not in [self._normalize_label(label) for label in labels]:
-                    print(f"⚠️ Unexpected label from model: '{key}' → normalized as '{normalized}'")
+        if self.stream:
+            text, data = self._stream_generate(payload, batch=getattr(prompt, "batch", False))
+        else:
+            response = self.session.post(self.api_url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+            text = data.get("response", "")
 
-            # Stem explanation and labels to catch morphological variants
-            stemmed_expl = self._stemmed_words(explanation)
-            stemmer = PorterStemmer()
+        self._record_usage(
+            prompt_tokens=data.get("prompt_eval_count", 0) + (len(context) if context else 0),
+            cached_tokens=len(context) if context else 0,
+            completion_tokens=data.get("eval_count", 0)
+        )
+        return text
 
-            for norm_label, canonical_label in normalized_labels.items():
-                # Stem each word in the normalized label (e.g., "knowledge sharing" → ["knowledg", "share"])
-                label_stems = {stemmer.stem(word) for word in norm_label.split()}
+    def _stream_generate(self, payload: Dict, batch: bool = False):
+        """
+        Read Ollama's NDJSON stream chunk by chunk. With `stop_after_json`, the connection is
+        closed as soon as the first JSON object (or array, for a batch prompt) is complete,
+        which makes Ollama stop generating any trailing commentary. Returns (text, final stats chunk or {}).
+        """
+        tracker = _JsonEndTracker("{[" if batch else "{") if self.stop_after_json else None
+        parts = []
+        final = {}
+        chunks = 0
+        # The read timeout applies per chunk; bound the whole generation as well
+        deadline = time.monotonic() + self.timeout[1]
 
-                # If all stemmed words are in the explanation, warn if score is low
-                if label_stems.issubset(stemmed_expl) and parsed_scores.get(canonical_label, 0.0) < 0.1:
-                    print(f"⚠️ Warning: '{canonical_label}' mentioned in explanation (stem match) but has very low score ({parsed_scores[canonical_label]})")
+        with self.session.post(self.api_url, json=payload, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(f"Ollama error: {chunk['error']}")
 
-            return {
-                "labels": parsed_scores,
-                "binned_labels": binned_scores,
-                "explanation": explanation
-            }
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Ollama generation exceeded {self.timeout[1]}s")
+
+                piece = chunk.get("response", "")
+                chunks += 1
+                if chunk.get("done"):
+                    final = chunk
+
+                end = tracker.feed(piece) if tracker is not None else -1
+                if end != -1:
+                    parts.append(piece[:end])
+                    break
+                parts.append(piece)
+                if final:
+                    break
+
+        if not final:
+            # Stopped early: Ollama never sent its stats chunk, so count streamed tokens instead
+            final = {"eval_count": chunks}
+        return "".join(parts), final
+
+    def _prefix_context(self, prefix: str) -> list:
+        """Token context of the instruction prefix, computed once per distinct prefix."""
+        with self._context_lock:
+            if prefix not in self._prefix_contexts:
+                response = self.session.post(self.api_url, json={
+                    "model": self.model_name,
+                    "prompt": prefix,
+                    "temperature": self.temperature,
+                    "stream": False,
+                    "keep_alive": self.keep_alive,
+                    "options": {**self.options, "num_predict": 1}
+                }, timeout=self.timeout)
+                self._prefix_contexts[prefix] = response.json().get("context", [])
+            return self._prefix_contexts[prefix]
+
+    def classify(self, text: str, labels: List[str], normalized_labels: Dict[str, str]) -> Dict:
+        prompt = generate_prompt(text, labels)
+        try:
+            raw_output = self._generate(prompt)
+        except Exception as e:
+            # No answer is a missing rating, not a row of zeros
+            print(f"⚠️ Ollama API call failed: {e}")
+            return None
+
+        try:
+            print(f"\n[DEBUG] Raw Ollama output:\n{raw_output}\n")
+
+            return self._parse_output(raw_output, labels, normalized_labels)
 
         except Exception as e:
             print("⚠️ Failed to parse response from Ollama model:", raw_output)
             print("Error:", str(e))
+            self._evict_response(prompt)
             return {
                 "labels": {label: 0.0 for label in labels},
                 "binned_labels": {label: 0 for label in labels},
-                "explanation": f"Parsing failed or API call failed: {str(e)}"
+                "explanation": f"Parsing failed: {str(e)}"
             }
 
+    def _parse_output(self, raw_output: str, labels: List[str], normalized_labels: Dict[str, str]) -> Dict:
+        json_str = self._extract_json(raw_output)
+        output_dict = json.loads(json_str)
+
+        # Handle nested vs flat JSON and normalize label keys
+        score_block = output_dict.get("labels", output_dict)  # fallback if not nested
+        explanation = output_dict.get("explanation", raw_output.replace(json_str, "").strip())
+
+        # Map returned keys onto config-defined labels (warns about unexpected keys)
+        label_index = LabelIndex.for_run(labels, normalized_labels)
+        parsed_scores = label_index.parse_scores(score_block, source="model")
+
+        # DEBUG: Show how each label key was normalized
+        for k in score_block.keys():
+            print(f"Normalized '{k}' → '{label_index.normalized(k)}'")
+
+        binned_scores = {
+            label: 1 if parsed_scores.get(label, 0.0) >= 0.5 else 0 for label in labels
+        }
+
+        # Stem explanation and labels to catch morphological variants; warn if a mentioned label scored low
+        stemming.check_low_scores(parsed_scores, explanation, normalized_labels, source=self.model_name)
+
+        return {
+            "labels": parsed_scores,
+            "binned_labels": binned_scores,
+            "explanation": explanation
+        }
+
     def _normalize_label(self, label: str) -> str:
         """Standardize label for matching (lowercase, camelCase → spaced, dashes/underscores → space)."""
-        label = re.sub(r'([a-z])([A-Z])', r'\1 \2', label)  # split camelCase
-        label = label.replace("_", " ").replace("-", " ")
-        return label.strip().lower()
+        return normalize_label(label)
     
     def _stemmed_words(self, text: str) -> set:
-        stemmer = PorterStemmer()
-        tokens = word_tokenize(text.lower())
-        return {stemmer.stem(token) for token in tokens if token.isalpha()}
+        return stemming.stemmed_words(text)
 
     def _extract_json(self, text: str) -> str:
         """
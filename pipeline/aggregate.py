@@ -1,13 +1,39 @@
 import pandas as pd
-from typing import List, Dict
-from collections import Counter
+from typing import List, Dict, Union
 import numpy as np
-import os
 
-def aggregate_concept_frequencies(ratings: List[Dict], model_names: List[str]) -> pd.DataFrame:
+from pipeline.ratings_store import RatingsStore
+from utils.output_sinks import open_sink
+
+
+def _store_model_scores(store: RatingsStore, model_names: List[str]) -> np.ndarray:
+    """(testimonials × labels × len(model_names)) scores with 0.0 for missing ratings, as `.get(model, 0.0)` does."""
+    values = store.as_float64()
+    picked = np.zeros(values.shape[:2] + (len(model_names),))
+    for k, model in enumerate(model_names):
+        m = store.model_index.get(model)
+        if m is not None:
+            picked[:, :, k] = np.nan_to_num(values[:, :, m], nan=0.0)
+    return picked
+
+def aggregate_concept_frequencies(ratings: Union[List[Dict], RatingsStore], model_names: List[str]) -> pd.DataFrame:
     """
     Returns a DataFrame with counts and mean scores per label per model.
     """
+    if isinstance(ratings, RatingsStore):
+        # Same rows, in the same order, as the loop below; only labels some model rated count
+        rated = ratings.rated_labels()
+        scores = _store_model_scores(ratings, model_names)[rated]
+        df = pd.DataFrame({
+            "label": np.repeat(np.array(ratings.labels, dtype=object)[np.nonzero(rated)[1]], len(model_names)),
+            "model": np.tile(np.array(model_names, dtype=object), len(scores)),
+            "score": scores.ravel(),
+        })
+        return df.groupby(["label", "model"]).agg(
+            count=("score", "count"),
+            mean_score=("score", "mean")
+        ).reset_index()
+
     rows = []
     for testimonial in ratings:
         for label, model_scores in testimonial["labels"].items():
@@ -21,11 +47,14 @@ def aggregate_concept_frequencies(ratings: List[Dict], model_names: List[str]) -
         mean_score=("score", "mean")
     ).reset_index()
 
-def compute_consensus_labels(ratings: List[Dict], model_names: List[str], method: str = "vote", threshold: float = 0.5) -> List[Dict]:
+def compute_consensus_labels(ratings: Union[List[Dict], RatingsStore], model_names: List[str], method: str = "vote", threshold: float = 0.5) -> List[Dict]:
     """
     Compute consensus labels per testimonial using vote or mean aggregation.
     Returns a list of consensus label dictionaries per testimonial.
     """
+    if isinstance(ratings, RatingsStore):
+        return _store_consensus_labels(ratings, model_names, method, threshold)
+
     consensus_results = []
 
     for testimonial in ratings:
@@ -46,12 +75,96 @@ def compute_consensus_labels(ratings: List[Dict], model_names: List[str], method
 
     return consensus_results
 
-def export_consensus_to_excel(consensus_data: List[Dict], out_path: str):
+def _store_consensus_labels(store: RatingsStore, model_names: List[str], method: str, threshold: float) -> List[Dict]:
+    scores = _store_model_scores(store, model_names)
+    if method == "vote":
+        values = (scores >= threshold).sum(axis=2) >= len(model_names) / 2
+    elif method == "mean":
+        values = scores.mean(axis=2)
+    else:
+        raise ValueError(f"Unknown consensus method: {method}")
+
+    rated = store.rated_labels()
+    consensus_results = []
+    for i, text in enumerate(store.texts):
+        consensus = {}
+        for j in np.flatnonzero(rated[i]):
+            consensus[store.labels[j]] = int(values[i, j]) if method == "vote" else values[i, j]
+        consensus_results.append({"text": text, "consensus_labels": consensus})
+    return consensus_results
+
+class ConceptFrequencyAggregator:
+    """
+    Running version of aggregate_concept_frequencies: `add` updates per (label, model) counts
+    and sums in O(labels × models) and `snapshot` returns the same DataFrame at any point.
+    Sums use the compensated (Kahan) summation pandas' groupby mean uses, so the means match
+    the batch function bit for bit.
+    """
+
+    def __init__(self, model_names: List[str]):
+        self.model_names = list(model_names)
+        self._stats: Dict[str, List[np.ndarray]] = {}  # label -> [counts, sums, compensation]
+
+    def add(self, testimonial: Dict):
+        for label, model_scores in testimonial["labels"].items():
+            stats = self._stats.get(label)
+            if stats is None:
+                n = len(self.model_names)
+                stats = self._stats[label] = [np.zeros(n, dtype=np.int64), np.zeros(n), np.zeros(n)]
+            counts, sums, compensation = stats
+            scores = np.array([model_scores.get(model, 0.0) for model in self.model_names], dtype=np.float64)
+            valid = ~np.isnan(scores)
+            counts += valid
+            y = scores - compensation
+            t = sums + y
+            # As in pandas: an infinite score leaves NaN compensation, which is reset to 0
+            new_compensation = (t - sums) - y
+            compensation[valid] = np.where(np.isnan(new_compensation), 0.0, new_compensation)[valid]
+            sums[valid] = t[valid]
+
+    def extend(self, ratings):
+        for testimonial in ratings:
+            self.add(testimonial)
+
+    def snapshot(self) -> pd.DataFrame:
+        rows = []
+        model_order = sorted(range(len(self.model_names)), key=lambda k: self.model_names[k])
+        for label in sorted(self._stats):
+            counts, sums, _ = self._stats[label]
+            for k in model_order:
+                rows.append({"label": label, "model": self.model_names[k],
+                             "count": int(counts[k]),
+                             "mean_score": sums[k] / counts[k] if counts[k] else np.nan})
+        return pd.DataFrame(rows, columns=["label", "model", "count", "mean_score"])
+
+
+class ConsensusAggregator:
     """
-    Export consensus labels to an Excel file.
+    Running version of compute_consensus_labels: each testimonial's consensus depends only on
+    its own scores, so `add` computes it once and `snapshot` returns the list so far.
     """
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    df = pd.DataFrame(consensus_data)
 
-    with pd.ExcelWriter(out_path, engine="openpyxl") as writer:
-        df.to_excel(writer, sheet_name="Consensus Labels", index=False)
\ No newline at end of file
+    def __init__(self, model_names: List[str], method: str = "vote", threshold: float = 0.5):
+        if method not in ("vote", "mean"):
+            raise ValueError(f"Unknown consensus method: {method}")
+        self.model_names = list(model_names)
+        self.method = method
+        self.threshold = threshold
+        self.results: List[Dict] = []
+
+    def add(self, testimonial: Dict):
+        self.results.extend(compute_consensus_labels([testimonial], self.model_names, self.method, self.threshold))
+
+    def extend(self, ratings):
+        for testimonial in ratings:
+            self.add(testimonial)
+
+    def snapshot(self) -> List[Dict]:
+        return list(self.results)
+
+def export_consensus_to_excel(consensus_data: List[Dict], out_path: str, output_format: str = "xlsx"):
+    """
+    Export consensus labels to an Excel file (or another output format).
+    """
+    with open_sink(out_path, output_format) as sink:
+        sink.write_table("Consensus Labels", pd.DataFrame(consensus_data))
@@ -0,0 +1,298 @@
+import os
+import io
+import json
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+from utils.prompt_template import generate_prompt
+
+
+def _batches(items: Iterable, size: int) -> Iterator[List]:
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
+
+
+class ProviderBatchJob(ABC):
+    """
+    Submit every prompt for one model as a provider-side asynchronous batch,
+    poll until it finishes, and return raw response text keyed by custom id.
+    """
+
+    def __init__(self, model, work_dir: str = "data/batch_jobs", poll_interval: float = 60.0,
+                 max_wait_hours: float = 24.0):
+        self.model = model
+        self.work_dir = work_dir
+        self.poll_interval = poll_interval
+        self.max_wait_seconds = max_wait_hours * 3600
+
+    def run(self, requests: List[Tuple[str, str]]) -> Dict[str, str]:
+        job_id = self.submit(requests)
+        print(f"📤 Submitted {len(requests)} {self.model.model_name} requests as batch {job_id}")
+
+        deadline = time.time() + self.max_wait_seconds
+        while not self.is_finished(job_id):
+            if time.time() > deadline:
+                # Don't keep paying for a job whose results will not be read
+                try:
+                    self.cancel(job_id)
+                except Exception as e:
+                    print(f"⚠️ Could not cancel batch {job_id}: {e}")
+                raise TimeoutError(f"Batch {job_id} did not finish within {self.max_wait_seconds / 3600:.1f}h")
+            time.sleep(self.poll_interval)
+
+        outputs = self.collect(job_id)
+        print(f"📥 Batch {job_id} returned {len(outputs)}/{len(requests)} responses")
+        return outputs
+
+    @abstractmethod
+    def submit(self, requests: List[Tuple[str, str]]) -> str:
+        """Create the provider job for (custom id, prompt) pairs; returns its id."""
+
+    @abstractmethod
+    def is_finished(self, job_id: str) -> bool:
+        """True once the job has ended and its results can be collected; raises if it failed outright."""
+
+    @abstractmethod
+    def collect(self, job_id: str) -> Dict[str, str]:
+        """Raw response text of every request that succeeded, keyed by custom id."""
+
+    @abstractmethod
+    def cancel(self, job_id: str):
+        """Ask the provider to stop the job."""
+
+
+class OpenAIBatchJob(ProviderBatchJob):
+    """OpenAI Batch API: JSONL input file → /v1/batches → output file."""
+
+    def write_input_file(self, requests: List[Tuple[str, str]]) -> str:
+        os.makedirs(self.work_dir, exist_ok=True)
+        # Unique per job: several chunks' jobs can be written in the same second
+        path = os.path.join(self.work_dir, f"openai_{self.model.model_name}_{int(time.time())}_{uuid.uuid4().hex[:8]}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for custom_id, prompt in requests:
+                json.dump({
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": self.model._request_body(prompt)
+                }, f, ensure_ascii=False)
+                f.write("\n")
+        return path
+
+    def submit(self, requests: List[Tuple[str, str]]) -> str:
+        path = self.write_input_file(requests)
+        with open(path, "rb") as f:
+            input_file = self.model.client.files.create(file=f, purpose="batch")
+        batch = self.model.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        return batch.id
+
+    def is_finished(self, job_id: str) -> bool:
+        batch = self.model.client.batches.retrieve(job_id)
+        if batch.status == "failed":
+            raise RuntimeError(f"OpenAI batch {job_id} failed: {getattr(batch, 'errors', None)}")
+        # Expired and cancelled batches still have an output file for the requests that did run
+        return batch.status in ("completed", "expired", "cancelled")
+
+    def collect(self, job_id: str) -> Dict[str, str]:
+        batch = self.model.client.batches.retrieve(job_id)
+        if batch.status != "completed":
+            print(f"⚠️ OpenAI batch {job_id} ended '{batch.status}' — collecting the requests it finished")
+        if not batch.output_file_id:
+            return {}
+
+        content = self.model.client.files.content(batch.output_file_id).text
+        outputs = {}
+        for line in io.StringIO(content):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            response = item.get("response") or {}
+            if item.get("error") or response.get("status_code") != 200:
+                print(f"⚠️ OpenAI batch item {item.get('custom_id')} failed: {item.get('error') or response}")
+                continue
+            usage = response["body"].get("usage") or {}
+            self.model._record_usage(
+                prompt_tokens=usage.get("prompt_tokens", 0),
+                cached_tokens=(usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0),
+                completion_tokens=usage.get("completion_tokens", 0)
+            )
+            outputs[item["custom_id"]] = response["body"]["choices"][0]["message"]["content"].strip()
+        return outputs
+
+    def cancel(self, job_id: str):
+        self.model.client.batches.cancel(job_id)
+
+
+class AnthropicBatchJob(ProviderBatchJob):
+    """Anthropic Message Batches: requests → /v1/messages/batches → results stream."""
+
+    def submit(self, requests: List[Tuple[str, str]]) -> str:
+        batch = self.model.client.messages.batches.create(requests=[
+            {"custom_id": custom_id, "params": self.model._request_params(prompt)}
+            for custom_id, prompt in requests
+        ])
+        return batch.id
+
+    def is_finished(self, job_id: str) -> bool:
+        batch = self.model.client.messages.batches.retrieve(job_id)
+        return batch.processing_status == "ended"
+
+    def collect(self, job_id: str) -> Dict[str, str]:
+        outputs = {}
+        for item in self.model.client.messages.batches.results(job_id):
+            if item.result.type != "succeeded":
+                print(f"⚠️ Anthropic batch item {item.custom_id} {item.result.type}")
+                continue
+            self.model._record_anthropic_usage(item.result.message.usage)
+            outputs[item.custom_id] = item.result.message.content[0].text
+        return outputs
+
+    def cancel(self, job_id: str):
+        self.model.client.messages.batches.cancel(job_id)
+
+
+BATCH_JOB_CLASSES = {
+    "openai": OpenAIBatchJob,
+    "anthropic": AnthropicBatchJob,
+}
+
+
+def supports_batch_jobs(model) -> bool:
+    return getattr(model, "provider", None) in BATCH_JOB_CLASSES
+
+
+def classify_with_batch_job(model, records: List[Dict], labels: List[str], normalized_labels: Dict[str, str],
+                            settings: Dict = None) -> List[Dict]:
+    """
+    Classify records with one provider batch job and parse each response with the
+    model's own `_parse_output`. Cached prompts are not resubmitted, and only responses that
+    parse are cached. Anything the job fails to return — a failed or unparseable item, or the
+    whole job if it fails or runs past `max_wait_hours` — falls back to an interactive
+    `classify` call, or is recorded as missing with `on_failure: missing`.
+    """
+    settings = settings or {}
+    job = BATCH_JOB_CLASSES[model.provider](
+        model,
+        work_dir=settings.get("work_dir", "data/batch_jobs"),
+        poll_interval=settings.get("poll_interval", 60),
+        max_wait_hours=settings.get("max_wait_hours", 24),
+    )
+
+    prompts = [generate_prompt(record["text"], labels) for record in records]
+    raw_outputs = {}
+    to_submit = []
+    for i, prompt in enumerate(prompts):
+        cached = model.cache.get(model.provider, model.model_name, model.temperature, prompt) if model.cache else None
+        if cached is not None:
+            raw_outputs[f"t-{i}"] = cached
+        else:
+            to_submit.append((f"t-{i}", prompt))
+
+    submitted = {}
+    if to_submit:
+        try:
+            submitted = job.run(to_submit)
+        except Exception as e:
+            print(f"⚠️ Batch job for {model.model_name} failed: {e}")
+        raw_outputs.update(submitted)
+
+    results = []
+    for i, record in enumerate(records):
+        custom_id = f"t-{i}"
+        result = None
+        if custom_id in raw_outputs:
+            try:
+                result = model._parse_output(raw_outputs[custom_id], labels, normalized_labels)
+            except Exception as e:
+                print(f"⚠️ Could not parse batch response for testimonial {record['id']} from {model.model_name}: {e}")
+                model._evict_response(prompts[i])
+            else:
+                # Only responses that parse are cached
+                if custom_id in submitted and model.cache is not None:
+                    model.cache.put(model.provider, model.model_name, model.temperature, prompts[i], submitted[custom_id])
+
+        if result is not None:
+            results.append(result)
+        elif settings.get("on_failure", "interactive") == "missing":
+            print(f"⚠️ No batch response for testimonial {record['id']} from {model.model_name} — recorded as missing")
+            results.append(None)
+        else:
+            print(f"🔁 No batch response for testimonial {record['id']} from {model.model_name} — calling interactively")
+            results.append(model.classify(record["text"], labels, normalized_labels))
+    return results
+
+
+def _job_results(name: str, future, n_records: int) -> List[Dict]:
+    try:
+        return future.result()
+    except Exception as e:
+        # Never lose the other models' results to one model's job
+        print(f"⚠️ Batch classification with {name} failed: {e} — its ratings are recorded as missing")
+        return [None] * n_records
+
+
+def run_batch_job_mode(testimonials: Iterable[Dict], models: Dict, labels: List[str],
+                       normalized_labels: Dict[str, str], config: Dict) -> Iterator[Tuple[int, Dict, Dict[str, Dict]]]:
+    """
+    Same contract as ClassificationEngine.run, but OpenAI and Anthropic models go through
+    provider batch jobs. Other models are classified interactively through the engine.
+
+    Testimonials are read and submitted in chunks of `chunk_size`, with up to `chunks_in_flight`
+    chunks' jobs running at once; each chunk is yielded (so written and checkpointed by main.py)
+    as soon as its jobs finish. Jobs still in flight when the run stops are not resumed: their
+    chunks are submitted again on the next run.
+    """
+    from pipeline.engine import build_engine_from_config
+
+    settings = config.get("batch_jobs", {}) or {}
+    chunk_size = max(1, int(settings.get("chunk_size", 5000)))
+    chunks_in_flight = max(1, int(settings.get("chunks_in_flight", 2)))
+    job_models = {name: model for name, model in models.items() if supports_batch_jobs(model)}
+    interactive_models = {name: model for name, model in models.items() if name not in job_models}
+
+    chunks = _batches(testimonials, chunk_size)
+    pending = deque()   # (offset, records, {model name: future}) in input order
+    submitted = 0
+
+    # Provider jobs are submitted and polled in the background while the rest run interactively
+    with ThreadPoolExecutor(max_workers=max(1, len(job_models) * chunks_in_flight), thread_name_prefix="batch-job") as pool:
+        def submit_next() -> bool:
+            nonlocal submitted
+            records = next(chunks, None)
+            if records is None:
+                return False
+            futures = {
+                name: pool.submit(classify_with_batch_job, model, records, labels, normalized_labels, settings)
+                for name, model in job_models.items()
+            }
+            pending.append((submitted, records, futures))
+            submitted += len(records)
+            return True
+
+        while len(pending) < chunks_in_flight and submit_next():
+            pass
+
+        while pending:
+            offset, records, futures = pending.popleft()
+            interactive_results = [{} for _ in records]
+            if interactive_models:
+                engine = build_engine_from_config(interactive_models, config)
+                for i, _, results in engine.run(records, labels, normalized_labels):
+                    interactive_results[i] = results
+
+            job_results = {name: _job_results(name, future, len(records)) for name, future in futures.items()}
+            for i, record in enumerate(records):
+                results = {}
+                for model_name in models:
+                    results[model_name] = job_results[model_name][i] if model_name in job_results else interactive_results[i][model_name]
+                yield offset + i, record, results
+            submit_next()
@@ -1,13 +1,19 @@
+import numpy as np
 import pandas as pd
-from typing import List, Dict
-import os
+from typing import List, Dict, Union
 
+from pipeline.ratings_store import RatingsStore
+from utils.output_sinks import open_sink
 
-def compute_model_disagreements(ratings: List[Dict[str, Dict[str, float]]], threshold: float = 0.5) -> pd.DataFrame:
+
+def compute_model_disagreements(ratings: Union[List[Dict[str, Dict[str, float]]], RatingsStore], threshold: float = 0.5) -> pd.DataFrame:
     """
     Calculate binary disagreements per testimonial and label between models.
     Returns a DataFrame of disagreement records.
     """
+    if isinstance(ratings, RatingsStore):
+        return _store_model_disagreements(ratings, threshold)
+
     disagreements = []
 
     for testimonial in ratings:
@@ -25,6 +31,56 @@ def compute_model_disagreements(ratings: List[Dict[str, Dict[str, float]]], thre
     return pd.DataFrame(disagreements)
 
 
+def _store_model_disagreements(store: RatingsStore, threshold: float) -> pd.DataFrame:
+    """compute_model_disagreements on a RatingsStore: only models that rated a label take part."""
+    scores = store.as_float64()
+    present = ~np.isnan(scores)
+    binary = scores >= threshold
+    disagree = (present & binary).any(axis=2) & (present & ~binary).any(axis=2)
+    rows, cols = np.nonzero(disagree)
+    if len(rows) == 0:
+        return pd.DataFrame()
+
+    data = {
+        "testimonial": np.array(store.texts, dtype=object)[rows],
+        "label": np.array(store.labels, dtype=object)[cols],
+    }
+    # Columns appear in the order the list path first meets each model among disagreement rows
+    present_rows = present[rows, cols]
+    first_seen = [(np.argmax(present_rows[:, m]), m) for m in range(len(store.model_names)) if present_rows[:, m].any()]
+    for _, m in sorted(first_seen):
+        column = binary[rows, cols, m].astype(int)
+        if present_rows[:, m].all():
+            data[store.model_names[m]] = column
+        else:
+            data[store.model_names[m]] = np.where(present_rows[:, m], column, np.nan)
+    return pd.DataFrame(data)
+
+
+def _model_votes(disagreement_df: pd.DataFrame):
+    """
+    Model columns, their 0/1 votes as a float array (NaN where a model gave none) and a boolean
+    array of where each model deviates from the row's majority vote. Ties go to 0 and a
+    missing vote always counts as deviating, as the former row-by-row `max(set(...))` did.
+    """
+    model_cols = [col for col in disagreement_df.columns if col not in ["testimonial", "label"]]
+    votes = disagreement_df[model_cols].to_numpy(dtype=float)
+    majority = ((votes == 1).sum(axis=1) > (votes == 0).sum(axis=1)).astype(float)
+    deviates = votes != majority[:, None]
+    return model_cols, votes, deviates
+
+
+def _deviations_per_label(disagreement_df: pd.DataFrame):
+    """Labels (first-seen order), model columns, per label × model deviation counts and per-label row totals."""
+    model_cols, _, deviates = _model_votes(disagreement_df)
+    codes, labels = pd.factorize(disagreement_df["label"])
+    totals = np.bincount(codes, minlength=len(labels))
+    counts = np.zeros((len(labels), len(model_cols)), dtype=np.int64)
+    for m in range(len(model_cols)):
+        counts[:, m] = np.bincount(codes, weights=deviates[:, m], minlength=len(labels))
+    return list(labels), model_cols, counts, totals
+
+
 def summarize_disagreements(disagreement_df: pd.DataFrame) -> pd.DataFrame:
     """
     Summarize number of disagreements per label and per model.
@@ -32,26 +88,17 @@ def summarize_disagreements(disagreement_df: pd.DataFrame) -> pd.DataFrame:
     if disagreement_df.empty:
         return pd.DataFrame()
 
-    model_cols = [col for col in disagreement_df.columns if col not in ["testimonial", "label"]]
-    summary_rows = []
-
-    for label in disagreement_df['label'].unique():
-        label_df = disagreement_df[disagreement_df['label'] == label]
-        for model in model_cols:
-            disagreement_count = sum(
-                row[model] != max(set(list(row[model_cols])), key=list(row[model_cols]).count)
-                for _, row in label_df.iterrows()
-            )
-            disagreement_pct = disagreement_count / len(label_df)
-            summary_rows.append({
-                "label": label,
-                "model": model,
-                "disagreements": disagreement_count,
-                "total": len(label_df),
-                "disagreement_pct": round(disagreement_pct, 2)
-            })
-
-    return pd.DataFrame(summary_rows)
+    labels, model_cols, counts, totals = _deviations_per_label(disagreement_df)
+    if not model_cols:
+        return pd.DataFrame()
+
+    return pd.DataFrame({
+        "label": np.repeat(np.array(labels, dtype=object), len(model_cols)),
+        "model": np.tile(np.array(model_cols, dtype=object), len(labels)),
+        "disagreements": counts.ravel(),
+        "total": np.repeat(totals, len(model_cols)),
+        "disagreement_pct": [round(float(pct), 2) for pct in (counts / totals[:, None]).ravel()],
+    })
 
 
 def flag_high_disagreement_testimonials(disagreement_df: pd.DataFrame, model_names: List[str], threshold: int = 2) -> pd.DataFrame:
@@ -61,23 +108,19 @@ def flag_high_disagreement_testimonials(disagreement_df: pd.DataFrame, model_nam
     if disagreement_df.empty:
         return pd.DataFrame()
 
-    flagged_rows = []
-
-    grouped = disagreement_df.groupby(['testimonial', 'label'])
-    for (text, label), group in grouped:
-        disagreement_counts = []
-        for _, row in group.iterrows():
-            values = [row[model] for model in model_names if model in row]
-            if len(set(values)) > 1:
-                disagreement_counts.append(1)
-        if sum(disagreement_counts) >= threshold:
-            flagged_rows.append({
-                "testimonial": text,
-                "label": label,
-                "disagreement_instances": sum(disagreement_counts)
-            })
-
-    return pd.DataFrame(flagged_rows)
+    # A row counts when the listed models' votes are not all equal; each missing vote is distinct
+    votes = disagreement_df[[model for model in model_names if model in disagreement_df.columns]].to_numpy(dtype=float)
+    distinct = (votes == 0).any(axis=1).astype(int) + (votes == 1).any(axis=1) + np.isnan(votes).sum(axis=1)
+    instances = pd.DataFrame({
+        "testimonial": disagreement_df["testimonial"].to_numpy(),
+        "label": disagreement_df["label"].to_numpy(),
+        "disagreement_instances": (distinct > 1).astype(np.int64),
+    }).groupby(["testimonial", "label"])["disagreement_instances"].sum()
+
+    flagged = instances[instances >= threshold]
+    if flagged.empty:
+        return pd.DataFrame()
+    return flagged.reset_index()
 
 
 def export_disagreements_to_excel(
@@ -85,20 +128,19 @@ def export_disagreements_to_excel(
         summary_df: pd.DataFrame, 
         flagged_df: pd.DataFrame,
         model_pct_df: pd.DataFrame, 
-        out_path: str
+        out_path: str,
+        output_format: str = "xlsx"
 ):
     """
-    Save disagreement log, summary statistics, and flagged rows to Excel.
+    Save disagreement log, summary statistics, and flagged rows to Excel (or another output format).
     """
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
-
-    with pd.ExcelWriter(out_path, engine="openpyxl") as writer:
-        disagreement_df.to_excel(writer, sheet_name="Disagreements", index=False)
-        summary_df.to_excel(writer, sheet_name="Summary", index=False)
+    with open_sink(out_path, output_format) as sink:
+        sink.write_table("Disagreements", disagreement_df)
+        sink.write_table("Summary", summary_df)
         if not flagged_df.empty:
-            flagged_df.to_excel(writer, sheet_name="Flagged", index=False)
+            sink.write_table("Flagged", flagged_df)
         if not model_pct_df.empty:
-            model_pct_df.to_excel(writer, sheet_name="Model Contributions", index=False)
+            sink.write_table("Model Contributions", model_pct_df)
 
 def model_disagreement_percentages(disagreement_df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -107,26 +149,15 @@ def model_disagreement_percentages(disagreement_df: pd.DataFrame) -> pd.DataFram
     if disagreement_df.empty:
         return pd.DataFrame()
 
-    model_cols = [col for col in disagreement_df.columns if col not in ["testimonial", "label"]]
-    total_counts = disagreement_df.groupby("label").size().to_dict()
-
-    results = []
-    for label in disagreement_df["label"].unique():
-        label_df = disagreement_df[disagreement_df["label"] == label]
-        for model in model_cols:
-            # Count how often the model disagrees with majority vote
-            disagreements = label_df.apply(
-                lambda row: row[model] != max(set([row[m] for m in model_cols]), key=[row[m] for m in model_cols].count),
-                axis=1
-            ).sum()
-            pct = disagreements / total_counts[label]
-            results.append({
-                "label": label,
-                "model": model,
-                "disagreement_count": disagreements,
-                "total_disagreements": total_counts[label],
-                "percent_of_label_disagreements": round(pct * 100, 2)
-            })
-
-    return pd.DataFrame(results)
+    # Count how often each model disagrees with the majority vote
+    labels, model_cols, counts, totals = _deviations_per_label(disagreement_df)
+    if not model_cols:
+        return pd.DataFrame()
 
+    return pd.DataFrame({
+        "label": np.repeat(np.array(labels, dtype=object), len(model_cols)),
+        "model": np.tile(np.array(model_cols, dtype=object), len(labels)),
+        "disagreement_count": counts.ravel(),
+        "total_disagreements": np.repeat(totals, len(model_cols)),
+        "percent_of_label_disagreements": np.round(counts / totals[:, None] * 100, 2).ravel(),
+    })
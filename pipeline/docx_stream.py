@@ -0,0 +1,102 @@
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+RE_TOPIC = re.compile(r"^Topic Title:\s*(.+)$", re.IGNORECASE)
+RE_SPEAKER = re.compile(r"^Speaker:\s*(.+)$", re.IGNORECASE)
+RE_DATE = re.compile(r"^Date:\s*(.+)$", re.IGNORECASE)
+SEPARATOR = "---"
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_RUN_CHARS = {W + "tab": "\t", W + "ptab": "\t", W + "cr": "\n", W + "noBreakHyphen": "-"}
+
+
+def _run_text(run: ET.Element) -> str:
+    parts = []
+    for child in run:
+        if child.tag == W + "t":
+            parts.append(child.text or "")
+        elif child.tag == W + "br":
+            # Page and column breaks have no text, as in python-docx
+            parts.append("\n" if child.get(W + "type", "textWrapping") == "textWrapping" else "")
+        elif child.tag in _RUN_CHARS:
+            parts.append(_RUN_CHARS[child.tag])
+    return "".join(parts)
+
+
+def _paragraph_text(paragraph: ET.Element) -> str:
+    """Same text as python-docx's Paragraph.text: runs and hyperlinked runs, in order."""
+    parts = []
+    for child in paragraph:
+        if child.tag == W + "r":
+            parts.append(_run_text(child))
+        elif child.tag == W + "hyperlink":
+            parts.extend(_run_text(run) for run in child.findall(W + "r"))
+    return "".join(parts)
+
+
+def iter_docx_paragraphs(path: str) -> Iterator[str]:
+    """
+    Text of each body-level paragraph (what `Document(path).paragraphs` lists), streamed from
+    word/document.xml with iterparse; each finished block is dropped so memory stays flat.
+    """
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as xml:
+        depth = 0
+        body = None
+        for event, elem in ET.iterparse(xml, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if depth == 2 and elem.tag == W + "body":
+                    body = elem
+                continue
+            depth -= 1
+            if depth == 2 and body is not None:
+                if elem.tag == W + "p":
+                    yield _paragraph_text(elem)
+                body.remove(elem)
+
+
+def split_entries(lines: Iterable[str]) -> Iterator[Tuple[Optional[Dict], List[str]]]:
+    """
+    Apply the transcript structure rules to stripped, non-empty lines: one (entry, warnings) per
+    `---`-separated block (and the trailing block), entry None when the block is skipped.
+    """
+    current = {"topic": None, "speaker": None, "date": None, "body": []}
+
+    def flush():
+        warnings = []
+        if current["topic"] and current["body"]:
+            entry = {
+                "topic": current["topic"],
+                "speaker": current["speaker"] or "unknown",
+                "date": current["date"] or "unknown",
+                "body": current["body"]
+            }
+            if not current["speaker"]:
+                warnings.append(f"⚠️ Missing speaker in topic: '{current['topic']}' → replaced with 'unknown'")
+            if not current["date"]:
+                warnings.append(f"⚠️ Missing date in topic: '{current['topic']}' → replaced with 'unknown'")
+            return entry, warnings
+        if not current["topic"]:
+            warnings.append("⚠️ Missing Topic Title in an entry → entry skipped.")
+        elif not current["body"]:
+            warnings.append(f"⚠️ Missing body text for topic: '{current['topic']}' → entry skipped.")
+        return None, warnings
+
+    for line in lines:
+        if line == SEPARATOR:
+            yield flush()
+            current = {"topic": None, "speaker": None, "date": None, "body": []}
+            continue
+
+        if match := RE_TOPIC.match(line):
+            current["topic"] = match.group(1)
+        elif match := RE_SPEAKER.match(line):
+            current["speaker"] = match.group(1)
+        elif match := RE_DATE.match(line):
+            current["date"] = match.group(1)
+        else:
+            current["body"].append(line)
+
+    yield flush()
@@ -0,0 +1,151 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+DEFAULT_PROVIDER_LIMITS = {
+    "openai": 8,
+    "anthropic": 4,
+    "google": 4,
+    "ollama": 1,
+}
+
+
+class ClassificationEngine:
+    """
+    Fans out (testimonial, model) classify calls over one thread pool per provider,
+    sized to that provider's concurrency limit, so a slow provider with a low limit
+    (e.g. a local Ollama model) never holds workers the others could use. Results are
+    yielded in input order so downstream CSV / IRR output matches the serial loop.
+    """
+
+    def __init__(self, models: Dict, max_workers: int = 16, max_pending: int = 32,
+                 per_provider: Dict[str, int] = None):
+        self.models = models
+        self.max_pending = max(1, max_pending)
+
+        limits = dict(DEFAULT_PROVIDER_LIMITS)
+        limits.update(per_provider or {})
+        providers = sorted({self._provider_of(model) for model in models.values()})
+        self.workers = {provider: max(1, limits.get(provider, 1)) for provider in providers}
+
+        # `max_workers` caps the threads across all providers: trim the largest pools first,
+        # but every provider keeps at least one worker
+        while sum(self.workers.values()) > max(max_workers, len(self.workers)):
+            largest = max(self.workers, key=self.workers.get)
+            self.workers[largest] -= 1
+        self.max_workers = sum(self.workers.values())
+
+    @staticmethod
+    def _provider_of(model) -> str:
+        return getattr(model, "provider", type(model).__name__.lower())
+
+    def _call(self, model, chunk: List[Dict], labels: List[str], normalized_labels: Dict[str, str]) -> List[Dict]:
+        """Classify a chunk of records with one model, batching the prompt when the model supports it."""
+        if len(chunk) == 1 or not hasattr(model, "classify_batch"):
+            return [model.classify(record["text"], labels, normalized_labels) for record in chunk]
+
+        results = model.classify_batch(
+            [(str(record["id"]), record["text"]) for record in chunk], labels, normalized_labels
+        )
+        return [results.get(str(record["id"])) for record in chunk]
+
+    def run(self, testimonials: Iterable[Dict], labels: List[str],
+            normalized_labels: Dict[str, str]) -> Iterator[Tuple[int, Dict, Dict[str, Dict]]]:
+        """
+        Yield (index, record, {model_name: result}) for every testimonial record, in input order.
+        Records carry the text under "text" (see pipeline/ingest.py).
+        Testimonials are read in blocks of the largest model `batch_size`; each model splits a block
+        into its own batches. At most `max_pending` testimonials are in flight, so the input may be
+        a lazy iterator.
+        """
+        block_size = max([getattr(model, "batch_size", 1) for model in self.models.values()] + [1])
+        pending = deque()
+        in_flight = 0
+
+        with ExitStack() as stack:
+            pools = {
+                provider: stack.enter_context(ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"classify-{provider}"))
+                for provider, workers in self.workers.items()
+            }
+            for start, block in _blocks(testimonials, block_size):
+                futures = {}
+                for model_name, model in self.models.items():
+                    pool = pools[self._provider_of(model)]
+                    size = max(1, getattr(model, "batch_size", 1))
+                    futures[model_name] = [
+                        (len(block[j:j + size]), pool.submit(self._call, model, block[j:j + size], labels, normalized_labels))
+                        for j in range(0, len(block), size)
+                    ]
+                pending.append((start, block, futures))
+                in_flight += len(block)
+
+                while pending and in_flight >= self.max_pending:
+                    in_flight -= len(pending[0][1])
+                    yield from self._collect(pending.popleft())
+
+            while pending:
+                yield from self._collect(pending.popleft())
+
+    @staticmethod
+    def _collect(item) -> Iterator[Tuple[int, Dict, Dict[str, Dict]]]:
+        start, block, futures = item
+        per_model = {}
+        for model_name, model_futures in futures.items():
+            per_model[model_name] = []
+            for chunk_len, future in model_futures:
+                try:
+                    per_model[model_name].extend(future.result())
+                except Exception as e:
+                    print(f"⚠️ {model_name} raised during classification: {e}")
+                    per_model[model_name].extend([None] * chunk_len)
+
+        for offset, record in enumerate(block):
+            yield start + offset, record, {model_name: results[offset] for model_name, results in per_model.items()}
+
+
+def _blocks(records: Iterable[Dict], size: int) -> Iterator[Tuple[int, List[Dict]]]:
+    """Group an iterator of records into (start_index, list) blocks of at most `size`."""
+    block = []
+    start = 0
+    for i, record in enumerate(records):
+        if not block:
+            start = i
+        block.append(record)
+        if len(block) >= size:
+            yield start, block
+            block = []
+    if block:
+        yield start, block
+
+
+def build_engine_from_config(models: Dict, config: Dict):
+    """
+    ClassificationEngine for the configured concurrency, or a ModelAffinityScheduler
+    (pipeline/scheduler.py) when several local models would otherwise swap weights.
+    """
+    settings = config.get("concurrency", {}) or {}
+    engine_settings = {
+        "max_workers": settings.get("max_workers", 16),
+        "max_pending": settings.get("max_pending", 32),
+        "per_provider": settings.get("per_provider", {}),
+    }
+
+    from pipeline.scheduler import ModelAffinityScheduler, count_local_models
+    local = config.get("local_scheduling", {}) or {}
+    if local.get("enabled", True) and count_local_models(models) > 1:
+        model_settings = config.get("model_settings", {}) or {}
+        return ModelAffinityScheduler(
+            models,
+            block_size=local.get("block_size", 64),
+            memory_budget_gb=local.get("memory_budget_gb"),
+            max_resident=local.get("max_resident", 1),
+            memory_gb={name: (model_settings.get(name) or {})["memory_gb"]
+                       for name in models if "memory_gb" in (model_settings.get(name) or {})},
+            unload_between_waves=local.get("unload_between_waves", True),
+            keep_alive=local.get("keep_alive"),
+            engine_settings=engine_settings,
+        )
+
+    return ClassificationEngine(models, **engine_settings)
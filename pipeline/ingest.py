@@ -0,0 +1,143 @@
+import os
+import csv
+import json
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+METADATA_FIELDS = ["topic", "speaker", "date"]
+
+
+def _coerce_id(value):
+    """CSV round-trips ids as strings; restore the integer ids preprocessing assigns."""
+    return int(value) if isinstance(value, str) and value.isdigit() else value
+
+
+def iter_testimonials(path: str) -> Iterator[Dict]:
+    """
+    Lazily read testimonials.jsonl (as written by pipeline/preprocessing.py).
+    Yields {"id", "topic", "speaker", "date", "text"} one line at a time.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️ Skipping malformed line {line_no} in {path}: {e}")
+                continue
+
+            content = entry.get("content", entry.get("text", ""))
+            text = " ".join(content) if isinstance(content, list) else str(content)
+            if not text.strip():
+                continue
+
+            record = {"id": entry.get("id", line_no)}
+            for field in METADATA_FIELDS:
+                record[field] = entry.get(field, "unknown")
+            record["text"] = text
+            yield record
+
+
+class TestimonialTexts:
+    """Re-iterable view of the testimonial texts in a JSONL: every pass reads the file again lazily."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __iter__(self) -> Iterator[str]:
+        return (record["text"] for record in iter_testimonials(self.path))
+
+
+def records_from_texts(texts: Iterable[str]) -> Iterator[Dict]:
+    """Wrap plain strings as testimonial records with sequential ids."""
+    for idx, text in enumerate(texts, 1):
+        yield {"id": idx, "topic": "unknown", "speaker": "unknown", "date": "unknown", "text": text}
+
+
+def skip_completed(records: Iterable[Dict], completed: int, last_id=None) -> Iterator[Dict]:
+    """Drop the first `completed` records, checking the last one skipped matches the checkpoint."""
+    records = iter(records)
+    skipped = None
+    for _ in range(completed):
+        skipped = next(records, None)
+        if skipped is None:
+            break
+
+    if last_id is not None and skipped is not None and str(skipped["id"]) != str(last_id):
+        print(f"⚠️ Checkpoint id {last_id} does not match input record {skipped['id']} — "
+              f"input may have changed since the interrupted run.")
+
+    yield from records
+
+
+class RunCheckpoint:
+    """
+    Records the last fully written testimonial, plus the CSV size at that point,
+    so an interrupted run can truncate partial rows and resume after it. Testimonials
+    no model answered have no CSV rows; they are listed under "unrated" instead.
+    """
+
+    def __init__(self, path: str = "data/outputs/checkpoint.json"):
+        self.path = path
+
+    def load(self) -> Optional[Dict]:
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ Ignoring unreadable checkpoint {self.path}: {e}")
+            return None
+
+    def save(self, state: Dict):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def load_results_csv(path: str, labels: List[str], unrated: Optional[List[Dict]] = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Rebuild `ratings` and `explanations_log` from the rows already written to the results CSV.
+    `unrated` ({"position", "id", "text"} from the checkpoint) restores the testimonials no model
+    answered, with no ratings, at their place in the run.
+    """
+    ratings = []
+    explanations_log = []
+    by_id = {}
+
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            label_scores = {label: float(row.get(label) or 0.0) for label in labels}
+
+            testimonial_id = _coerce_id(row["ID"])
+            testimonial = by_id.get(testimonial_id)
+            if testimonial is None:
+                testimonial = {"id": testimonial_id, "text": row["Testimonial"], "labels": {}}
+                by_id[testimonial_id] = testimonial
+                ratings.append(testimonial)
+
+            for label in labels:
+                testimonial["labels"].setdefault(label, {})[row["Model"]] = label_scores[label]
+
+            explanations_log.append({
+                "id": testimonial_id,
+                "testimonial": row["Testimonial"],
+                "model": row["Model"],
+                "label_scores": json.dumps(label_scores, indent=2),
+                "explanation": row["Explanation"]
+            })
+
+    for entry in sorted(unrated or [], key=lambda entry: entry["position"]):
+        ratings.insert(entry["position"], {"id": entry["id"], "text": entry["text"], "labels": {}})
+
+    return ratings, explanations_log
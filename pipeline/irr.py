@@ -1,23 +1,370 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import numpy as np
 import pandas as pd
-from sklearn.metrics import cohen_kappa_score
-from statsmodels.stats.inter_rater import fleiss_kappa
-from pingouin import intraclass_corr
-import krippendorff
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple, Union
+
+from pipeline.ratings_store import RatingsStore
+
+
+def ratings_array(ratings: List[Dict]) -> Tuple[np.ndarray, List[str], List[str]]:
+    """
+    Dense (testimonials × labels × models) float64 array of scores, NaN where a model has
+    no rating, plus the label and model order (first seen, as in the reference loop).
+    """
+    # A model with no result for a testimonial is missing there (not 0.0), so collect
+    # labels and models from every testimonial rather than the first one
+    labels, model_names = [], []
+    for testimonial in ratings:
+        for label, model_scores in testimonial["labels"].items():
+            if label not in labels:
+                labels.append(label)
+            model_names.extend(model for model in model_scores if model not in model_names)
+
+    label_pos = {label: j for j, label in enumerate(labels)}
+    model_pos = {model: m for m, model in enumerate(model_names)}
+    scores = np.full((len(ratings), len(labels), len(model_names)), np.nan)
+    for i, testimonial in enumerate(ratings):
+        for label, model_scores in testimonial["labels"].items():
+            for model, score in model_scores.items():
+                scores[i, label_pos[label], model_pos[model]] = score
+    return scores, labels, model_names
+
+
+def _interval_alpha(values: np.ndarray) -> np.ndarray:
+    """
+    Krippendorff's interval alpha over the last axis pair (units × raters), NaN = missing;
+    leading axes are independent problems. Uses the pairwise form of the coincidence matrix:
+    alpha = 1 - (n - 1) * Σ_u D_u / D, with D_u the within-unit squared differences / (m_u - 1).
+    """
+    present = ~np.isnan(values)
+    v = np.where(present, values, 0.0)
+    m = present.sum(-1)
+    pairable = m >= 2
+    s1 = np.where(pairable, v.sum(-1), 0.0)
+    s2 = np.where(pairable, (v * v).sum(-1), 0.0)
+    m_p = np.where(pairable, m, 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        within = np.where(pairable, 2 * (m_p * s2 - s1 * s1) / (m_p - 1), 0.0).sum(-1)
+        n = m_p.sum(-1)
+        t1, t2 = s1.sum(-1), s2.sum(-1)
+        total = 2 * (n * t2 - t1 * t1)
+        return 1 - (n - 1) * within / total
+
+
+def _round(value, digits: int = 3):
+    """round() that reports a float-noise -0.0 as 0.0, like the reference implementation."""
+    return round(value, digits) + 0.0
+
+
+def compute_irr_array(scores: np.ndarray, labels: List[str], model_names: List[str],
+                      threshold: float = 0.5) -> Dict:
+    """
+    Vectorized IRR over a (testimonials × labels × models) array (NaN = missing rating).
+    Every label is computed at once; returns the same dictionary as compute_irr_scores_reference.
+    ICC, Fleiss, Cohen and % agreement use the testimonials every model rated (per label);
+    Krippendorff's alpha uses every available rating.
+    """
+    n_items, _, k = scores.shape
+    complete = ~np.isnan(scores).any(axis=2)                        # (n, L)
+    N = complete.sum(axis=0).astype(float)                          # (L,)
+    x = np.where(complete[:, :, None], scores, 0.0)
+    binary = (x >= threshold) & complete[:, :, None]                # (n, L, k)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # ICC: two-way ANOVA mean squares, then the mean of ICC1/2/3 and ICC1k/2k/3k (as pingouin)
+        row_mean = x.sum(axis=2) / k
+        grand = row_mean.sum(axis=0) / N
+        col_mean = x.sum(axis=0) / N[:, None]
+        ss_rows = k * (complete * (row_mean - grand) ** 2).sum(axis=0)
+        ss_cols = N * ((col_mean - grand[:, None]) ** 2).sum(axis=1)
+        ss_total = (complete[:, :, None] * (x - grand[None, :, None]) ** 2).sum(axis=(0, 2))
+        ss_error = ss_total - ss_rows - ss_cols
+        msb = ss_rows / (N - 1)
+        msj = ss_cols / (k - 1)
+        mse = ss_error / ((N - 1) * (k - 1))
+        msw = (ss_cols + ss_error) / (N * (k - 1))
+        icc = np.mean([
+            (msb - msw) / (msb + (k - 1) * msw),
+            (msb - mse) / (msb + (k - 1) * mse + k * (msj - mse) / N),
+            (msb - mse) / (msb + (k - 1) * mse),
+            (msb - msw) / msb,
+            (msb - mse) / (msb + (msj - mse) / N),
+            (msb - mse) / msb,
+        ], axis=0)
+
+        # Fleiss' kappa on per-testimonial counts of 0 / 1 votes
+        ones = binary.sum(axis=2).astype(float)
+        zeros = np.where(complete, k - ones, 0.0)
+        p1 = ones.sum(axis=0) / (N * k)
+        p_item = (ones ** 2 + zeros ** 2 - k) / (k * (k - 1))
+        p_mean = (complete * p_item).sum(axis=0) / N
+        p_exp = p1 ** 2 + (1 - p1) ** 2
+        fleiss = (p_mean - p_exp) / (1 - p_exp)
+
+        # Cohen's kappa for every model pair at once
+        b = binary.astype(float)
+        both = np.einsum("nli,nlj->lij", b, b)                       # (L, k, k) both 1
+        pos = b.sum(axis=0)                                          # (L, k) 1-votes per model
+        agree = (N[:, None, None] - pos[:, :, None] - pos[:, None, :] + 2 * both) / N[:, None, None]
+        p_a, p_b = pos[:, :, None] / N[:, None, None], pos[:, None, :] / N[:, None, None]
+        expected = p_a * p_b + (1 - p_a) * (1 - p_b)
+        kappa = (agree - expected) / (1 - expected)
+
+        percent = ((ones == 0) | (ones == k))
+        percent = (percent & complete).sum(axis=0) / N
+
+    kripp = _interval_alpha(scores.transpose(1, 0, 2))
+    overall_kripp = _interval_alpha(scores.reshape(-1, k))
+
+    pairs = [(i, j) for i in range(k) for j in range(i + 1, k)]
+    constant = (pos == 0) | (pos == N[:, None])
+
+    per_label_results = {}
+    for l, label in enumerate(labels):
+        cohen_scores = []
+        cohen_notes = None
+        for i, j in pairs:
+            if constant[l, i] and constant[l, j] and pos[l, i] == pos[l, j]:
+                cohen_notes = f"No variation in binary labels for models {model_names[i]} vs {model_names[j]}"
+                continue  # skip this pair
+            if not np.isnan(kappa[l, i, j]):
+                cohen_scores.append(kappa[l, i, j])
+
+        per_label_results[label] = {
+            "icc": _round(icc[l], 3),
+            "fleiss": _round(fleiss[l], 3),
+            "cohen": _round(np.mean(cohen_scores), 3) if cohen_scores else "N/A",
+            "krippendorff": _round(kripp[l], 3),
+            "percent_agreement": _round(percent[l], 3)
+        }
+        if cohen_notes:
+            per_label_results[label]["cohen_notes"] = cohen_notes
+
+    return {
+        "per_label": per_label_results,
+        "overall": {
+            "krippendorff": _round(overall_kripp, 3),
+        }
+    }
+
+
+IRR_METRICS = ["icc", "fleiss", "cohen", "krippendorff", "percent_agreement"]
 
 
-def compute_irr_scores(ratings: List[Dict[str, Dict[str, float]]], threshold: float = 0.5) -> Dict:
+def _bootstrap_features(scores: np.ndarray, threshold: float) -> Tuple[np.ndarray, Dict]:
+    """
+    Per-testimonial terms whose sums determine every IRR metric, flattened to (n, D), plus the
+    (offset, shape) of each block. A bootstrap replicate is then one weighted sum: counts @ features.
+    """
+    n, L, k = scores.shape
+    complete = ~np.isnan(scores).any(axis=2)
+    x = np.where(complete[:, :, None], scores, 0.0)
+    row_mean = x.sum(axis=2) / k
+    binary = ((x >= threshold) & complete[:, :, None]).astype(float)
+    ones = binary.sum(axis=2)
+    zeros = np.where(complete, k - ones, 0.0)
+
+    present = ~np.isnan(scores)
+    v = np.where(present, scores, 0.0)
+    m = present.sum(axis=2)
+    pairable = m >= 2
+    s1 = np.where(pairable, v.sum(axis=2), 0.0)
+    s2 = np.where(pairable, (v * v).sum(axis=2), 0.0)
+    m_p = np.where(pairable, m, 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        within = np.where(pairable, 2 * (m_p * s2 - s1 * s1) / (m_p - 1), 0.0)
+        p_item = np.where(complete, (ones ** 2 + zeros ** 2 - k) / (k * (k - 1)), 0.0)
+
+    blocks = {
+        "N": complete.astype(float), "R1": row_mean, "R2": row_mean ** 2, "C": x, "Q": (x * x).sum(axis=2),
+        "ones": ones, "p_item": p_item, "unanimous": (complete & ((ones == 0) | (ones == k))).astype(float),
+        "pos": binary, "both": np.einsum("nli,nlj->nlij", binary, binary),
+        "k_within": within, "k_n": m_p.astype(float), "k_t1": s1, "k_t2": s2,
+    }
+    layout, columns, offset = {}, [], 0
+    for name, block in blocks.items():
+        flat = block.reshape(n, -1)
+        layout[name] = (offset, block.shape[1:])
+        columns.append(flat)
+        offset += flat.shape[1]
+    return np.concatenate(columns, axis=1), layout
+
+
+def _metrics_from_sums(sums: np.ndarray, layout: Dict, k: int) -> Dict[str, np.ndarray]:
+    """IRR metrics for a batch of summed features (b, D): (b, L) per metric and (b,) overall alpha."""
+    def block(name):
+        offset, shape = layout[name]
+        size = int(np.prod(shape))
+        return sums[:, offset:offset + size].reshape((len(sums),) + shape)
+
+    N, R1, R2, C, Q = block("N"), block("R1"), block("R2"), block("C"), block("Q")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        grand = R1 / N
+        ss_rows = k * (R2 - N * grand ** 2)
+        ss_cols = N * ((C / N[..., None] - grand[..., None]) ** 2).sum(axis=-1)
+        ss_error = Q - N * k * grand ** 2 - ss_rows - ss_cols
+        msb = ss_rows / (N - 1)
+        msj = ss_cols / (k - 1)
+        mse = ss_error / ((N - 1) * (k - 1))
+        msw = (ss_cols + ss_error) / (N * (k - 1))
+        icc = np.mean([
+            (msb - msw) / (msb + (k - 1) * msw),
+            (msb - mse) / (msb + (k - 1) * mse + k * (msj - mse) / N),
+            (msb - mse) / (msb + (k - 1) * mse),
+            (msb - msw) / msb,
+            (msb - mse) / (msb + (msj - mse) / N),
+            (msb - mse) / msb,
+        ], axis=0)
+
+        p1 = block("ones") / (N * k)
+        p_exp = p1 ** 2 + (1 - p1) ** 2
+        fleiss = (block("p_item") / N - p_exp) / (1 - p_exp)
+
+        pos, both = block("pos"), block("both")
+        n_ = N[..., None, None]
+        agree = (n_ - pos[..., :, None] - pos[..., None, :] + 2 * both) / n_
+        p_a, p_b = pos[..., :, None] / n_, pos[..., None, :] / n_
+        expected = p_a * p_b + (1 - p_a) * (1 - p_b)
+        kappa = (agree - expected) / (1 - expected)
+        # Pairs are skipped as in compute_irr_array: both models constant on the same value, or undefined
+        constant = (pos == 0) | (pos == N[..., None])
+        skipped = constant[..., :, None] & constant[..., None, :] & (pos[..., :, None] == pos[..., None, :])
+        valid = np.triu(np.ones((k, k), dtype=bool), 1) & ~skipped & ~np.isnan(kappa)
+        cohen = np.where(valid, kappa, 0.0).sum(axis=(-2, -1)) / valid.sum(axis=(-2, -1))
+
+        percent = block("unanimous") / N
+
+        within, n_pairs, t1, t2 = block("k_within"), block("k_n"), block("k_t1"), block("k_t2")
+        krippendorff = 1 - (n_pairs - 1) * within / (2 * (n_pairs * t2 - t1 * t1))
+        within, n_pairs, t1, t2 = within.sum(-1), n_pairs.sum(-1), t1.sum(-1), t2.sum(-1)
+        overall = 1 - (n_pairs - 1) * within / (2 * (n_pairs * t2 - t1 * t1))
+
+    return {"icc": icc, "fleiss": fleiss, "cohen": cohen, "krippendorff": krippendorff,
+            "percent_agreement": percent, "overall_krippendorff": overall}
+
+
+_WORKER_FEATURES = None
+
+
+def _init_bootstrap_worker(features: np.ndarray, layout: Dict, k: int):
+    global _WORKER_FEATURES
+    _WORKER_FEATURES = (features, layout, k)
+
+
+def _bootstrap_batch(seed_sequence: np.random.SeedSequence, size: int) -> Dict[str, np.ndarray]:
+    """`size` replicates: resample testimonial indices, count them, and weight the feature sums."""
+    features, layout, k = _WORKER_FEATURES
+    n = len(features)
+    rng = np.random.default_rng(seed_sequence)
+    indices = rng.integers(0, n, size=(size, n))
+    counts = np.bincount((indices + n * np.arange(size)[:, None]).ravel(), minlength=size * n).reshape(size, n)
+    return _metrics_from_sums(counts.astype(float) @ features, layout, k)
+
+
+def bootstrap_irr(scores: np.ndarray, labels: List[str], threshold: float = 0.5, replicates: int = 1000,
+                  confidence: float = 0.95, seed: int = 0, workers: Optional[int] = None,
+                  batch_size: int = 100) -> Dict:
+    """
+    Percentile bootstrap CIs for every per-label metric and the overall Krippendorff's alpha,
+    resampling testimonials. Batches of replicates run in a process pool, each with its own
+    child of SeedSequence(seed), so results do not depend on the number of workers.
+    """
+    n, _, k = scores.shape
+    features, layout = _bootstrap_features(scores, threshold)
+    batches = [min(batch_size, replicates - start) for start in range(0, replicates, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    workers = min(workers or os.cpu_count() or 1, len(batches))
+
+    if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+        # fork: workers inherit the features and main.py (which has no __main__ guard) is not re-run
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"),
+                                       initializer=_init_bootstrap_worker, initargs=(features, layout, k))
+    else:
+        _init_bootstrap_worker(features, layout, k)
+        executor = ThreadPoolExecutor(max_workers=workers)
+    with executor:
+        results = list(executor.map(_bootstrap_batch, seeds, batches))
+
+    draws = {key: np.concatenate([result[key] for result in results]) for key in results[0]}
+    tail = (1 - confidence) / 2 * 100
+
+    def interval(values: np.ndarray):
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return None
+        low, high = np.percentile(values, [tail, 100 - tail])
+        return [_round(low, 3), _round(high, 3)]
+
+    return {
+        "replicates": replicates,
+        "confidence": confidence,
+        "seed": seed,
+        "per_label": {
+            label: {metric: interval(draws[metric][:, l]) for metric in IRR_METRICS}
+            for l, label in enumerate(labels)
+        },
+        "overall": {"krippendorff": interval(draws["overall_krippendorff"])},
+    }
+
+
+def compute_irr_scores(ratings: Union[List[Dict[str, Dict[str, float]]], RatingsStore], threshold: float = 0.5,
+                       bootstrap: int = 0, confidence: float = 0.95, seed: int = 0,
+                       workers: Optional[int] = None) -> Dict:
     """
     Computes IRR scores across multiple models for each label and overall.
+    Input:
+        ratings: List of testimonials with per-label ratings per model, or a RatingsStore.
+        threshold: Cutoff for converting scores to binary for Fleiss/Cohen/etc.
+        bootstrap: Number of bootstrap replicates for confidence intervals (0 = none).
+    Output:
+        Dictionary with ICC, Fleiss, Cohen, Krippendorff, and % Agreement, plus a
+        "bootstrap" section of [low, high] intervals when requested.
+    """
+    if isinstance(ratings, RatingsStore):
+        scores = ratings.as_float64()
+        rated = ~np.isnan(scores)
+        # Same shape the list path sees: labels and models that never got a rating are left out
+        label_cols = np.flatnonzero(rated.any(axis=(0, 2)))
+        model_cols = np.flatnonzero(rated.any(axis=(0, 1)))
+        scores = scores[:, label_cols][:, :, model_cols]
+        labels = [ratings.labels[j] for j in label_cols]
+        model_names = [ratings.model_names[m] for m in model_cols]
+    else:
+        scores, labels, model_names = ratings_array(ratings)
+
+    irr_scores = compute_irr_array(scores, labels, model_names, threshold)
+    if bootstrap and len(scores):
+        irr_scores["bootstrap"] = bootstrap_irr(scores, labels, threshold, bootstrap, confidence, seed, workers)
+    return irr_scores
+
+
+def compute_irr_scores_reference(ratings: List[Dict[str, Dict[str, float]]], threshold: float = 0.5) -> Dict:
+    """
+    Original per-label implementation on pingouin / statsmodels / sklearn / krippendorff,
+    kept to validate and benchmark compute_irr_array (benchmarks/bench_irr.py).
     Input:
         ratings: List of testimonials with per-label ratings per model.
         threshold: Cutoff for converting scores to binary for Fleiss/Cohen/etc.
     Output:
         Dictionary with ICC, Fleiss, Cohen, Krippendorff, and % Agreement.
     """
-    all_labels = list(ratings[0]["labels"].keys())
-    model_names = list(next(iter(ratings[0]["labels"].values())).keys())
+    from sklearn.metrics import cohen_kappa_score
+    from statsmodels.stats.inter_rater import fleiss_kappa
+    from pingouin import intraclass_corr
+    import krippendorff
+
+    # A model with no result for a testimonial is missing there (not 0.0), so collect
+    # labels and models from every testimonial rather than the first one
+    all_labels, model_names = [], []
+    for testimonial in ratings:
+        for label, model_scores in testimonial["labels"].items():
+            if label not in all_labels:
+                all_labels.append(label)
+            model_names.extend(model for model in model_scores if model not in model_names)
 
     per_label_results = {}
     all_scores_matrix = []  # For overall Krippendorff
@@ -27,11 +374,13 @@ def compute_irr_scores(ratings: List[Dict[str, Dict[str, float]]], threshold: fl
         binary_scores = []  # Binarized for Fleiss, Cohen, % Agreement
 
         for testimonial in ratings:
-            model_scores = testimonial["labels"][label]
-            row = [model_scores.get(model, 0.0) for model in model_names]
+            model_scores = testimonial["labels"].get(label, {})
+            row = [model_scores.get(model, np.nan) for model in model_names]
+            all_scores_matrix.append(row)  # Flattened for Krippendorff overall (NaN = missing)
+            if any(np.isnan(score) for score in row):
+                continue  # ICC, Fleiss, Cohen and % agreement need every model's rating
             label_scores.append(row)
             binary_scores.append([int(score >= threshold) for score in row])
-            all_scores_matrix.append(row)  # Flattened for Krippendorff overall
 
         df = pd.DataFrame(label_scores, columns=model_names)
         df_long = pd.melt(df.reset_index(), id_vars=['index'], var_name='rater', value_name='score')
@@ -64,7 +413,8 @@ def compute_irr_scores(ratings: List[Dict[str, Dict[str, float]]], threshold: fl
 
         cohen = round(np.mean(cohen_scores), 3) if cohen_scores else "N/A"
 
-        kripp = krippendorff.alpha(reliability_data=np.array(label_scores).T, level_of_measurement='interval')
+        kripp = krippendorff.alpha(reliability_data=np.array(all_scores_matrix[-len(ratings):]).T,
+                                   level_of_measurement='interval')
 
         percent = np.mean([
             len(set([row[i] >= threshold for i in range(len(row))])) == 1
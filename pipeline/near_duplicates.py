@@ -0,0 +1,279 @@
+import os
+import re
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def text_key(text: str) -> str:
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+def shingles(text: str, size: int = 5) -> set:
+    """Character shingles of the text lowercased, with punctuation and runs of whitespace collapsed to one space."""
+    normalized = re.sub(r"[\W_]+", " ", text.lower()).strip()
+    if len(normalized) <= size:
+        return {normalized}
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+
+def lsh_params(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    (bands, rows) with bands * rows <= num_perm that minimise the false positive plus false
+    negative probability mass around `threshold` (the S-curve 1 - (1 - s^rows)^bands).
+    """
+    s = np.linspace(0.0, 1.0, 201)
+    best, best_error = (1, num_perm), np.inf
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        p = 1.0 - (1.0 - s ** rows) ** bands
+        error = np.mean(np.where(s < threshold, p, 1.0 - p))
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class NearDuplicateIndex:
+    """
+    Persistent MinHash signatures of classified testimonials, with LSH band buckets for
+    candidate lookup. Single SQLite file like the response cache: representatives (and
+    their model results), their band buckets, and the near-duplicate links found.
+    Writes are committed every `commit_every` changes and on `flush` / `close`.
+    """
+
+    def __init__(self, path: str = "data/cache/near_duplicates.sqlite", threshold: float = 0.85,
+                 num_perm: int = 128, shingle_size: int = 5, seed: int = 1, commit_every: int = 500):
+        self.path = path
+        self.commit_every = max(1, commit_every)
+        self._uncommitted = 0
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_MERSENNE_PRIME), num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_MERSENNE_PRIME), num_perm, dtype=np.uint64)
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        params = json.dumps({"num_perm": num_perm, "shingle_size": shingle_size, "seed": seed,
+                             "bands": self.bands, "rows": self.rows})
+        stored = self._conn.execute("SELECT value FROM meta WHERE name = 'params'").fetchone()
+        if stored and stored[0] != params:
+            # Signatures from other hash functions or band sizes can't be compared; start over
+            print(f"⚠️ Near-duplicate index {path} was built with other MinHash settings — rebuilding it.")
+            self._conn.executescript("DROP TABLE IF EXISTS representatives; DROP TABLE IF EXISTS bands; DROP TABLE IF EXISTS links;")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS representatives (
+                key TEXT PRIMARY KEY,
+                record_id TEXT,
+                signature BLOB,
+                results_key TEXT,
+                results TEXT,
+                complete INTEGER DEFAULT 0,
+                created_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS bands (band INTEGER, bucket INTEGER, key TEXT, PRIMARY KEY (band, bucket, key));
+            CREATE TABLE IF NOT EXISTS links (
+                key TEXT,
+                record_id TEXT,
+                representative TEXT,
+                similarity REAL,
+                created_at REAL,
+                PRIMARY KEY (key, representative)
+            );
+        """)
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('params', ?)", (params,))
+        self._conn.commit()
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles(text, self.shingle_size)), dtype=np.uint64
+        )
+        # Universal hashing (a * x + b) mod p, wrapping in uint64 as usual for MinHash
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def _buckets(self, signature: np.ndarray) -> List[int]:
+        return [
+            int.from_bytes(hashlib.blake2b(signature[i * self.rows:(i + 1) * self.rows].tobytes(), digest_size=8).digest(),
+                           "little", signed=True)
+            for i in range(self.bands)
+        ]
+
+    def _changed(self):
+        """Count a write (lock held) and commit once `commit_every` have piled up."""
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self._conn.commit()
+            self._uncommitted = 0
+
+    def flush(self):
+        with self._lock:
+            self._conn.commit()
+            self._uncommitted = 0
+
+    def query(self, signature: np.ndarray, eligible: Callable[[str], bool]) -> Optional[Tuple[str, str, float]]:
+        """
+        Most similar eligible representative at or above the threshold: (key, record_id, estimated Jaccard).
+        An exact copy of a representative matches it with similarity 1.0.
+        """
+        with self._lock:
+            candidates = set()
+            for band, bucket in enumerate(self._buckets(signature)):
+                candidates.update(row[0] for row in self._conn.execute(
+                    "SELECT key FROM bands WHERE band = ? AND bucket = ?", (band, bucket)
+                ))
+            rows = [self._conn.execute("SELECT key, record_id, signature FROM representatives WHERE key = ?", (candidate,)).fetchone()
+                    for candidate in sorted(candidates)]
+
+        best = None
+        for row in rows:
+            if row is None or not eligible(row[0]):
+                continue
+            similarity = float(np.mean(np.frombuffer(row[2], dtype=np.uint32) == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[2]):
+                best = (row[0], row[1], similarity)
+        return best
+
+    def add_representative(self, key: str, record_id, signature: np.ndarray):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO representatives (key, record_id, signature, created_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET record_id = excluded.record_id",
+                (key, str(record_id), signature.tobytes(), time.time())
+            )
+            self._conn.executemany("INSERT OR IGNORE INTO bands VALUES (?, ?, ?)",
+                                   [(band, bucket, key) for band, bucket in enumerate(self._buckets(signature))])
+            self._changed()
+
+    def store_results(self, key: str, results_key: str, results: Dict, complete: bool):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE representatives SET results_key = ?, results = ?, complete = ? WHERE key = ?",
+                (results_key, json.dumps(results, default=str), int(complete), key)
+            )
+            self._changed()
+
+    def results(self, key: str, results_key: str, complete_only: bool = False) -> Optional[Dict]:
+        """Stored {model: result} of a representative, if it was classified for the same labels and models."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT results, complete FROM representatives WHERE key = ? AND results_key = ?", (key, results_key)
+            ).fetchone()
+        if row is None or row[0] is None or (complete_only and not row[1]):
+            return None
+        return json.loads(row[0])
+
+    def add_link(self, key: str, record_id, representative: str, similarity: float):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO links VALUES (?, ?, ?, ?, ?)",
+                               (key, str(record_id), representative, similarity, time.time()))
+            self._changed()
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+class NearDuplicateStage:
+    """
+    Sits around the classification engine: `filter` holds back testimonials that are
+    near-duplicates of a representative (classified earlier in this run or a previous one)
+    and `merge` puts them back, in input order, with a copy of the representative's results.
+    A near-duplicate shares its representative's outcome, including any model that failed for it.
+    Exact copies count too: a testimonial whose text was already classified, with every model
+    answering, is not sent to the models again.
+    """
+
+    def __init__(self, index: NearDuplicateIndex, labels: List[str], model_names: List[str]):
+        self.index = index
+        self.model_names = list(model_names)
+        self.results_key = hashlib.sha256(json.dumps([list(labels), self.model_names]).encode("utf-8")).hexdigest()
+        self.links: List[Dict] = []
+
+        self._pending = set()       # representatives sent for classification in this run
+        self._queued = deque()      # (duplicates held before it, key) per representative, in input order
+        self._held = deque()        # (record, representative key, representative id, similarity)
+        self._held_total = 0
+
+    def _eligible(self, key: str) -> bool:
+        return key in self._pending or self.index.results(key, self.results_key, complete_only=True) is not None
+
+    def filter(self, records: Iterable[Dict]) -> Iterator[Dict]:
+        for record in records:
+            key = text_key(record["text"])
+            signature = self.index.signature(record["text"])
+            match = self.index.query(signature, self._eligible)
+            if match:
+                self._held.append((record, *match))
+                self._held_total += 1
+                continue
+            self.index.add_representative(key, record["id"], signature)
+            self._pending.add(key)
+            self._queued.append((self._held_total, key))
+            yield record
+
+    def merge(self, classified: Iterable[Tuple[int, Dict, Dict[str, Dict]]]) -> Iterator[Tuple[int, Dict, Dict[str, Dict]]]:
+        """Engine results for the representatives, with the held near-duplicates slotted back in."""
+        position = 0
+        for _, record, model_results in classified:
+            held_before, key = self._queued.popleft()
+            for item in self._release(held_before):
+                yield position, *item
+                position += 1
+            complete = all(result and "labels" in result for result in model_results.values())
+            self.index.store_results(key, self.results_key, model_results, complete)
+            yield position, record, model_results
+            position += 1
+        for item in self._release(None):
+            yield position, *item
+            position += 1
+
+    def _release(self, upto: Optional[int]) -> Iterator[Tuple[Dict, Dict[str, Dict]]]:
+        released = self._held_total - len(self._held)
+        while self._held and (upto is None or released < upto):
+            record, rep_key, rep_id, similarity = self._held.popleft()
+            released += 1
+            results = self.index.results(rep_key, self.results_key) or {}
+            key = text_key(record["text"])
+            self.index.add_link(key, record["id"], rep_key, similarity)
+            self.links.append({"id": record["id"], "representative_id": rep_id,
+                               "similarity": round(similarity, 3), "testimonial": record["text"]})
+            kind = "an exact copy" if key == rep_key else "a near-duplicate"
+            print(f"\n🔁 Testimonial id {record['id']} is {kind} of id {rep_id} "
+                  f"(similarity {similarity:.2f}) — reusing its classification")
+            yield record, {model_name: results.get(model_name) for model_name in self.model_names}
+
+    def close(self):
+        self.index.close()
+
+
+def build_near_duplicate_stage(settings: Optional[Dict], labels: List[str], model_names: List[str]) -> Optional[NearDuplicateStage]:
+    settings = settings or {}
+    if not settings.get("enabled", False):
+        return None
+    index = NearDuplicateIndex(
+        path=settings.get("index_path", "data/cache/near_duplicates.sqlite"),
+        threshold=settings.get("threshold", 0.85),
+        num_perm=settings.get("num_perm", 128),
+        shingle_size=settings.get("shingle_size", 5),
+    )
+    return NearDuplicateStage(index, labels, model_names)
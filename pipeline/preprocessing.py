@@ -1,11 +1,19 @@
 import os
 import re
 import json
+import argparse
 import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from docx import Document
-from typing import List, Dict
+from typing import Dict, Iterator, List, Optional, Tuple
 from collections import OrderedDict
 
+from pipeline.docx_stream import iter_docx_paragraphs, split_entries
+
+PARSERS = ("stream", "docx")
+DEFAULT_PARSER = "stream"
+
 
 def clean_line(line: str) -> str:
     return re.sub(r'\s+', ' ', line).strip()
@@ -59,6 +67,25 @@ def extract_testimonials(doc_path: str) -> List[Dict]:
     return entries
 
 
+def parse_transcript(doc_path: str, min_len: int = 40) -> Tuple[List[Dict], List[str]]:
+    """
+    Single pass over a raw transcript: validate_docx's structure rules and extract_testimonials'
+    cleaning, read straight from word/document.xml. Returns (entries, warnings).
+    """
+    lines = (text.strip() for text in iter_docx_paragraphs(doc_path))
+    entries, warnings = [], []
+    for block, block_warnings in split_entries(line for line in lines if line):
+        warnings.extend(block_warnings)
+        if block:
+            entries.append(OrderedDict({
+                "topic": clean_line(block["topic"]),
+                "speaker": clean_line(block["speaker"]),
+                "date": clean_line(block["date"]),
+                "content": merge_short_lines(block["body"], min_len),
+            }))
+    return entries, warnings
+
+
 def save_as_jsonl(entries: List[Dict], out_path: str):
     with open(out_path, "w", encoding="utf-8") as f:
         for entry in entries:
@@ -66,31 +93,202 @@ def save_as_jsonl(entries: List[Dict], out_path: str):
             f.write("\n")
 
 
-if __name__ == "__main__":
-    input_folder = "data/validated"
-    output_jsonl = "data/processed/testimonials.jsonl"
-    os.makedirs(os.path.dirname(output_jsonl), exist_ok=True)
+class IngestManifest:
+    """
+    Persistent ingestion state next to the JSONL: per .docx file its mtime, size, content md5, the
+    parser that read it and the entry hashes it produced, plus the dedupe index (entry hash -> id) so ids stay stable
+    across runs. Written atomically like RunCheckpoint.
+    """
 
-    all_entries = []
-    seen_hashes = set()
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, Dict] = {}
+        self.ids: Dict[str, int] = {}
+        self.next_id = 1
 
-    for filename in os.listdir(input_folder):
-        if filename.endswith(".docx"):
-            file_path = os.path.join(input_folder, filename)
+    def load(self) -> "IngestManifest":
+        if os.path.exists(self.path):
             try:
-                entries = extract_testimonials(file_path)
-                for entry in entries:
-                    text_blob = " ".join(entry["content"])
-                    content_hash = generate_unique_id(text_blob)
-                    if content_hash not in seen_hashes:
-                        seen_hashes.add(content_hash)
-                        all_entries.append(entry)
-            except Exception as e:
-                print(f"❌ Failed to process {filename}: {e}")
-
-    # Assign unique IDs starting from 1
-    for idx, entry in enumerate(all_entries, 1):
-        entry["id"] = idx
-
-    save_as_jsonl(all_entries, output_jsonl)
-    print(f"\n✅ Extracted {len(all_entries)} total unique testimonials → {output_jsonl}")
+                with open(self.path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                self.files, self.ids, self.next_id = state["files"], state["ids"], state["next_id"]
+            except (OSError, json.JSONDecodeError, KeyError) as e:
+                print(f"⚠️ Ignoring unreadable ingest manifest {self.path}: {e}")
+        return self
+
+    def save(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files, "ids": self.ids, "next_id": self.next_id}, f)
+        os.replace(tmp_path, self.path)
+
+    def live_hashes(self) -> set:
+        return {content_hash for record in self.files.values() for content_hash in record["hashes"]}
+
+    def id_for(self, content_hash: str) -> int:
+        """The id this text had before, or the next unused one."""
+        if content_hash not in self.ids:
+            self.ids[content_hash] = self.next_id
+            self.next_id += 1
+        return self.ids[content_hash]
+
+
+def file_md5(path: str) -> str:
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _extract_file(path: str, parser: str = DEFAULT_PARSER) -> Tuple[str, Optional[List[Dict]], List[str], Optional[str]]:
+    """Worker: (path, entries, warnings, error) so one bad file doesn't stop the pool."""
+    try:
+        if parser == "stream":
+            return (path, *parse_transcript(path), None)
+        return path, extract_testimonials(path), [], None
+    except Exception as e:
+        return path, None, [], str(e)
+
+
+def _extract_all(paths: List[str], workers: int, parser: str = DEFAULT_PARSER) -> Iterator[Tuple[str, Optional[List[Dict]], List[str], Optional[str]]]:
+    """Extract in a process pool, yielding in input order as soon as each file is done."""
+    extract = partial(_extract_file, parser=parser)
+    if workers <= 1 or len(paths) <= 1:
+        yield from map(extract, paths)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(extract, paths, chunksize=max(1, min(16, len(paths) // (4 * workers))))
+
+
+def _compact_jsonl(out_path: str, stale_ids: set) -> int:
+    """Drop entries whose text no longer comes from any file; returns how many were removed."""
+    tmp_path = out_path + ".tmp"
+    removed = 0
+    with open(out_path, "r", encoding="utf-8") as src, open(tmp_path, "w", encoding="utf-8") as dst:
+        for line in src:
+            if line.strip() and json.loads(line).get("id") in stale_ids:
+                removed += 1
+                continue
+            dst.write(line)
+    os.replace(tmp_path, out_path)
+    return removed
+
+
+def ingest_folder(input_folder: str, out_path: str, manifest_path: Optional[str] = None,
+                  workers: Optional[int] = None, full: bool = False, parser: str = DEFAULT_PARSER) -> Dict:
+    """
+    Incrementally ingest every .docx in `input_folder` into `out_path`.
+    `parser` is "stream" to read raw transcripts directly (structure warnings are printed per file)
+    or "docx" for validate_docx.py output.
+    Files whose mtime and size (or, failing that, md5) match the manifest and that were extracted
+    with the same parser are skipped; the rest are
+    extracted in a process pool and their new entries appended to the JSONL as they arrive.
+    Entries are deduplicated by text across all files, and an id never changes once assigned.
+    Entries of deleted or edited files that no other file provides are removed at the end.
+    """
+    if parser not in PARSERS:
+        raise ValueError(f"Unknown parser: {parser} (choose from {', '.join(PARSERS)})")
+    manifest_path = manifest_path or os.path.join(os.path.dirname(out_path), "ingest_manifest.json")
+    manifest = IngestManifest(manifest_path)
+    if not full:
+        manifest.load()
+    if not os.path.exists(out_path):
+        # Rebuilding the JSONL: every file is extracted again, but known texts keep their ids
+        manifest.files = {}
+    if os.path.dirname(out_path):
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+    previously_live = manifest.live_hashes()
+    stats = {"files": 0, "unchanged": 0, "extracted": 0, "failed": 0, "new_entries": 0, "duplicates": 0, "removed": 0}
+
+    # Cheap pass: stat every file, hash only those whose mtime or size moved
+    on_disk = {}
+    for item in sorted(os.scandir(input_folder), key=lambda e: e.name):
+        if item.is_file() and item.name.endswith(".docx"):
+            on_disk[item.name] = item
+    stats["files"] = len(on_disk)
+
+    for name in list(manifest.files):
+        if name not in on_disk:
+            del manifest.files[name]
+
+    to_extract = []
+    for name, item in on_disk.items():
+        stat = item.stat()
+        record = manifest.files.get(name)
+        # The parsers don't produce identical entries; manifests from before the choice existed used "docx"
+        if record and record.get("parser", "docx") != parser:
+            record = None
+        if record and record["mtime_ns"] == stat.st_mtime_ns and record["size"] == stat.st_size:
+            stats["unchanged"] += 1
+            continue
+        md5 = file_md5(item.path)
+        if record and record["md5"] == md5:
+            record.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            stats["unchanged"] += 1
+            continue
+        manifest.files.pop(name, None)
+        to_extract.append((name, item.path, stat, md5))
+
+    # Everything in the JSONL already; stale texts are compacted away at the end
+    written = set(previously_live)
+    with open(out_path, "a" if previously_live else "w", encoding="utf-8") as out:
+        paths = [path for _, path, _, _ in to_extract]
+        extracted = _extract_all(paths, workers or os.cpu_count() or 1, parser)
+        for (name, _, stat, md5), (_, entries, warnings, error) in zip(to_extract, extracted):
+            if error is not None:
+                stats["failed"] += 1
+                print(f"❌ Failed to process {name}: {error}")
+                continue
+            if warnings or not entries:
+                print(f"\n🔍 {name}: {len(entries)} entries")
+                if not entries:
+                    print("❌ No valid entries found.")
+                for w in warnings:
+                    print(" -", w)
+
+            stats["extracted"] += 1
+            hashes = []
+            for entry in entries:
+                content_hash = generate_unique_id(" ".join(entry["content"]))
+                hashes.append(content_hash)
+                if content_hash in written:
+                    if content_hash not in previously_live:
+                        stats["duplicates"] += 1
+                    continue
+                written.add(content_hash)
+                entry["id"] = manifest.id_for(content_hash)
+                json.dump(entry, out, ensure_ascii=False)
+                out.write("\n")
+                stats["new_entries"] += 1
+            out.flush()
+            manifest.files[name] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "md5": md5, "parser": parser,
+                                    "hashes": hashes}
+
+    stale = previously_live - manifest.live_hashes()
+    if stale:
+        stats["removed"] = _compact_jsonl(out_path, {manifest.ids[content_hash] for content_hash in stale})
+
+    manifest.save()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract testimonials from .docx transcripts into JSONL.")
+    parser.add_argument("--input", default=None, help="defaults to data/raw for --parser stream, data/validated for docx")
+    parser.add_argument("--output", default="data/processed/testimonials.jsonl")
+    parser.add_argument("--manifest", default=None, help="defaults to ingest_manifest.json next to the output")
+    parser.add_argument("--workers", type=int, default=None, help="extraction processes (default: one per CPU)")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and rebuild the JSONL")
+    parser.add_argument("--parser", choices=PARSERS, default=DEFAULT_PARSER,
+                        help="stream: validate and extract raw transcripts in one pass; docx: read validate_docx.py output")
+    args = parser.parse_args()
+    args.input = args.input or ("data/raw" if args.parser == "stream" else "data/validated")
+
+    stats = ingest_folder(args.input, args.output, args.manifest, args.workers, args.full, args.parser)
+    print(f"\n✅ {stats['new_entries']} new unique testimonials from {stats['extracted']} changed files "
+          f"({stats['unchanged']} unchanged, {stats['failed']} failed, {stats['duplicates']} duplicates, "
+          f"{stats['removed']} removed) → {args.output}")
@@ -0,0 +1,166 @@
+import os
+import json
+import numpy as np
+from typing import Dict, Iterator, List, Optional
+
+
+class RatingsStore:
+    """
+    Columnar replacement for the list of {"text", "labels": {label: {model: score}}} dicts.
+    Scores live in one float32 array (testimonials × labels × models, NaN = no rating) with
+    label / model / testimonial-id index maps; each testimonial text is stored once.
+    With `path`, the array is a memory-mapped file that grows on append, for corpora larger
+    than RAM; `flush()` also writes a `<path>.json` sidecar so `RatingsStore.load` can reopen it.
+    """
+
+    def __init__(self, labels: List[str], model_names: List[str], capacity: int = 1024, path: Optional[str] = None):
+        self.labels = list(labels)
+        self.model_names = list(model_names)
+        self.label_index = {label: j for j, label in enumerate(self.labels)}
+        self.model_index = {model: m for m, model in enumerate(self.model_names)}
+        self.ids: List = []
+        self.id_index: Dict = {}
+        self.texts: List[str] = []
+        self.path = path
+        self.size = 0
+        self._data = self._allocate(max(1, capacity))
+
+    # --- storage --------------------------------------------------------
+
+    def _allocate(self, capacity: int, old: np.ndarray = None) -> np.ndarray:
+        shape = (capacity, len(self.labels), len(self.model_names))
+        if self.path is None:
+            data = np.full(shape, np.nan, dtype=np.float32)
+            if old is not None:
+                data[:self.size] = old[:self.size]
+            return data
+
+        if old is not None:
+            old.flush()
+            del old
+        else:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            open(self.path, "wb").close()
+        old_bytes = os.path.getsize(self.path)
+        with open(self.path, "r+b") as f:
+            f.truncate(int(np.prod(shape)) * 4)
+        data = np.memmap(self.path, dtype=np.float32, mode="r+", shape=shape)
+        data.reshape(-1)[old_bytes // 4:] = np.nan
+        return data
+
+    def _ensure_capacity(self, needed: int):
+        if needed > self._data.shape[0]:
+            self._data = self._allocate(max(needed, 2 * self._data.shape[0]), self._data)
+
+    @property
+    def scores(self) -> np.ndarray:
+        """float32 view of the filled rows (testimonials × labels × models)."""
+        return self._data[:self.size]
+
+    def as_float64(self) -> np.ndarray:
+        """
+        Scores as float64, rounded to 6 decimals: float32 keeps ~7 significant digits, so this
+        restores the short decimals models return (0.7 rather than 0.699999988) before any
+        threshold comparison.
+        """
+        return np.round(self.scores.astype(np.float64), 6)
+
+    def __len__(self) -> int:
+        return self.size
+
+    # --- writing --------------------------------------------------------
+
+    def append(self, testimonial_id, text: str, label_scores: Dict[str, Dict[str, float]]) -> int:
+        """Add one testimonial's {label: {model: score}} ratings; returns its row index."""
+        self._ensure_capacity(self.size + 1)
+        row = self.size
+        for label, model_scores in label_scores.items():
+            j = self.label_index.get(label)
+            if j is None:
+                continue
+            for model, score in model_scores.items():
+                m = self.model_index.get(model)
+                if m is not None:
+                    self._data[row, j, m] = score
+        self.ids.append(testimonial_id)
+        self.id_index[testimonial_id] = row
+        self.texts.append(text)
+        self.size += 1
+        return row
+
+    def append_rating(self, testimonial: Dict) -> int:
+        """Append a legacy `{"id", "text", "labels"}` ratings entry."""
+        return self.append(testimonial.get("id", self.size), testimonial["text"], testimonial["labels"])
+
+    @classmethod
+    def from_ratings(cls, ratings: List[Dict], labels: List[str] = None, model_names: List[str] = None,
+                     path: Optional[str] = None) -> "RatingsStore":
+        if labels is None or model_names is None:
+            seen_labels, seen_models = [], []
+            for testimonial in ratings:
+                for label, model_scores in testimonial["labels"].items():
+                    if label not in seen_labels:
+                        seen_labels.append(label)
+                    seen_models.extend(model for model in model_scores if model not in seen_models)
+            labels = labels if labels is not None else seen_labels
+            model_names = model_names if model_names is not None else seen_models
+
+        store = cls(labels, model_names, capacity=max(1, len(ratings)), path=path)
+        for testimonial in ratings:
+            store.append_rating(testimonial)
+        return store
+
+    # --- reading --------------------------------------------------------
+
+    def rated_labels(self) -> np.ndarray:
+        """(testimonials × labels) mask of labels with at least one model rating."""
+        return ~np.isnan(self.scores).all(axis=2)
+
+    def get(self, testimonial_id) -> Dict:
+        return self.to_rating(self.id_index[testimonial_id])
+
+    def to_rating(self, row: int) -> Dict:
+        """Legacy dict view of one testimonial (missing ratings omitted)."""
+        values = np.round(self._data[row].astype(np.float64), 6)
+        label_scores = {}
+        for j, label in enumerate(self.labels):
+            present = {model: float(values[j, m]) for m, model in enumerate(self.model_names) if not np.isnan(values[j, m])}
+            if present:
+                label_scores[label] = present
+        return {"id": self.ids[row], "text": self.texts[row], "labels": label_scores}
+
+    def __iter__(self) -> Iterator[Dict]:
+        for row in range(self.size):
+            yield self.to_rating(row)
+
+    # --- persistence ----------------------------------------------------
+
+    def flush(self):
+        if self.path is None:
+            return
+        self._data.flush()
+        with open(self.path + ".json", "w", encoding="utf-8") as f:
+            json.dump({"labels": self.labels, "model_names": self.model_names, "size": self.size,
+                       "capacity": self._data.shape[0], "ids": self.ids, "texts": self.texts}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "RatingsStore":
+        with open(path + ".json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        store = cls.__new__(cls)
+        store.labels, store.model_names = meta["labels"], meta["model_names"]
+        store.label_index = {label: j for j, label in enumerate(store.labels)}
+        store.model_index = {model: m for m, model in enumerate(store.model_names)}
+        store.ids, store.texts, store.size, store.path = meta["ids"], meta["texts"], meta["size"], path
+        store.id_index = {testimonial_id: row for row, testimonial_id in enumerate(store.ids)}
+        store._data = np.memmap(path, dtype=np.float32, mode="r+",
+                                shape=(meta["capacity"], len(store.labels), len(store.model_names)))
+        return store
+
+
+def build_ratings_store(labels: List[str], model_names: List[str], settings: Optional[Dict] = None) -> RatingsStore:
+    """RatingsStore from config `ratings_store` (memmap_path: null keeps scores in RAM)."""
+    settings = settings or {}
+    return RatingsStore(labels, model_names, capacity=settings.get("initial_capacity", 1024),
+                        path=settings.get("memmap_path"))
@@ -0,0 +1,111 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from pipeline.engine import ClassificationEngine, _blocks
+
+
+# Approximate resident size (GB) of the default Ollama builds; override with model_settings.<name>.memory_gb
+DEFAULT_MODEL_MEMORY_GB = {
+    "mistral": 4.5,
+    "llama3": 4.7,
+    "qwen:7b": 4.5,
+    "mixtral": 26.0,
+}
+
+
+def plan_waves(models: Dict, memory_gb: Dict[str, float], memory_budget_gb: float = None,
+               max_resident: int = 1) -> List[Dict]:
+    """
+    Group local models (in config order) into waves that can be loaded at the same time:
+    at most `max_resident` models per wave and, if a budget is set, their sizes within it.
+    A model larger than the budget still gets a wave of its own.
+    """
+    waves, current, used = [], {}, 0.0
+    for name, model in models.items():
+        size = memory_gb.get(name, 8.0)
+        too_big = memory_budget_gb is not None and current and used + size > memory_budget_gb
+        if current and (len(current) >= max_resident or too_big):
+            waves.append(current)
+            current, used = {}, 0.0
+        current[name] = model
+        used += size
+    if current:
+        waves.append(current)
+    return waves
+
+
+class ModelAffinityScheduler:
+    """
+    Runs local (Ollama) models one wave at a time over a block of testimonials, so each
+    model classifies the whole block while its weights are loaded instead of swapping on
+    every call. Remote models run through the normal engine alongside the local waves.
+    Same contract as ClassificationEngine.run: results are yielded in input order.
+    """
+
+    def __init__(self, models: Dict, block_size: int = 64, memory_budget_gb: float = None,
+                 max_resident: int = 1, memory_gb: Dict[str, float] = None, unload_between_waves: bool = True,
+                 keep_alive: str = None, engine_settings: Dict = None):
+        self.models = models
+        self.block_size = max(1, block_size)
+        self.unload_between_waves = unload_between_waves
+        self.engine_settings = engine_settings or {}
+
+        self.local_models = {name: model for name, model in models.items() if getattr(model, "provider", None) == "ollama"}
+        self.remote_models = {name: model for name, model in models.items() if name not in self.local_models}
+
+        # Waves are unloaded explicitly, so keep_alive only has to bridge the gaps between calls
+        if keep_alive is not None:
+            for model in self.local_models.values():
+                model.keep_alive = keep_alive
+
+        sizes = dict(DEFAULT_MODEL_MEMORY_GB)
+        sizes.update(memory_gb or {})
+        self.waves = plan_waves(self.local_models, sizes, memory_budget_gb, max(1, max_resident))
+
+    def _engine(self, models: Dict) -> ClassificationEngine:
+        return ClassificationEngine(models, **self.engine_settings)
+
+    def _run_waves(self, waves: List[Dict], block: List[Dict], labels: List[str],
+                   normalized_labels: Dict[str, str]) -> List[Dict[str, Dict]]:
+        results = [{} for _ in block]
+        for w, wave in enumerate(waves):
+            print(f"🧳 Local wave {w + 1}/{len(waves)}: {', '.join(wave)} on {len(block)} testimonials")
+            for i, _, wave_results in self._engine(wave).run(block, labels, normalized_labels):
+                results[i].update(wave_results)
+
+            # The last wave stays loaded: it runs first on the next block
+            if self.unload_between_waves and w < len(waves) - 1:
+                for name, model in wave.items():
+                    try:
+                        model.unload()
+                    except Exception as e:
+                        print(f"⚠️ Could not unload {name}: {e}")
+        return results
+
+    def run(self, testimonials: Iterable[Dict], labels: List[str],
+            normalized_labels: Dict[str, str]) -> Iterator[Tuple[int, Dict, Dict[str, Dict]]]:
+        remote_engine = self._engine(self.remote_models) if self.remote_models else None
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="remote-block") as pool:
+            for b, (start, block) in enumerate(_blocks(testimonials, self.block_size)):
+                remote_future = pool.submit(
+                    _collect_block, remote_engine, block, labels, normalized_labels
+                ) if remote_engine else None
+
+                # Alternate wave order so the model loaded last is reused first
+                waves = self.waves if b % 2 == 0 else self.waves[::-1]
+                local_results = self._run_waves(waves, block, labels, normalized_labels)
+                remote_results = remote_future.result() if remote_future else [{} for _ in block]
+
+                for offset, record in enumerate(block):
+                    merged = {**remote_results[offset], **local_results[offset]}
+                    yield start + offset, record, {name: merged.get(name) for name in self.models}
+
+
+def _collect_block(engine: ClassificationEngine, block: List[Dict], labels: List[str],
+                   normalized_labels: Dict[str, str]) -> List[Dict[str, Dict]]:
+    return [results for _, _, results in engine.run(block, labels, normalized_labels)]
+
+
+def count_local_models(models: Dict) -> int:
+    return sum(1 for model in models.values() if getattr(model, "provider", None) == "ollama")
@@ -0,0 +1,240 @@
+import os
+import hashlib
+from collections import Counter
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import joblib
+import numpy as np
+from sklearn.decomposition import LatentDirichletAllocation, MiniBatchNMF
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+METHODS = ("nmf", "lda")
+
+DEFAULT_SETTINGS = {
+    "n_labels": 8,
+    "words_per_label": 2,
+    "max_features": 5000,
+    "min_df": 2,
+    "max_df": 0.5,
+    "ngram_range": [1, 2],
+    "batch_size": 2048,
+    "passes": 2,
+    "seed": 0,
+    "cache_path": "data/cache/topic_model.joblib",
+}
+
+
+def _batches(items: Iterable, size: int) -> Iterator[List]:
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
+
+
+def _text_hash(text: str) -> bytes:
+    return hashlib.md5(text.encode("utf-8")).digest()[:8]
+
+
+class TopicModel:
+    """
+    Sparse bag-of-words topic model fitted in mini-batches: TF-IDF + MiniBatchNMF ("nmf") or
+    term counts + online LDA ("lda"). The vocabulary is fixed by the first fit; document
+    frequencies and the model keep being updated by `partial_fit` as new testimonials arrive.
+    """
+
+    def __init__(self, method: str = "nmf", settings: Optional[Dict] = None):
+        if method not in METHODS:
+            raise ValueError(f"Unknown topic model method: {method} (choose from {', '.join(METHODS)})")
+        self.method = method
+        self.settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+        self.vectorizer: Optional[CountVectorizer] = None
+        self.doc_freq: Optional[np.ndarray] = None
+        self.n_docs = 0
+        self.seen = set()
+        self.n_components: Optional[int] = None
+        self.model = None
+
+    @property
+    def params(self) -> Dict:
+        """Settings that change the fitted model; a cache fitted with others is discarded."""
+        keys = ["n_labels", "max_features", "min_df", "max_df", "ngram_range", "seed"]
+        return {"method": self.method, **{key: self.settings[key] for key in keys}, "n_components": self.n_components}
+
+    @property
+    def capped(self) -> bool:
+        """Whether the corpus was too small for `n_labels` topics when the model was fitted."""
+        return self.n_components is not None and self.n_components < self.settings["n_labels"]
+
+    def _analyzer(self, vocabulary=None) -> CountVectorizer:
+        # Words of two or more letters: numbers and ids make poor labels
+        return CountVectorizer(stop_words="english", token_pattern=r"(?u)\b[^\W\d_]{2,}\b",
+                               ngram_range=tuple(self.settings["ngram_range"]), vocabulary=vocabulary, dtype=np.float32)
+
+    def build_vocabulary(self, texts: Iterable[str]):
+        """
+        First streaming pass: document frequencies of every term, then the top `max_features`
+        of them; their counts seed `doc_freq`.
+        """
+        analyze = self._analyzer().build_analyzer()
+        doc_freq = Counter()
+        seen = set()
+        for text in texts:
+            if (text_hash := _text_hash(text)) in seen:
+                continue
+            seen.add(text_hash)
+            doc_freq.update(set(analyze(text)))
+        if not seen:
+            raise ValueError("No testimonials to build topics from")
+
+        max_df = self.settings["max_df"]
+        max_count = max_df * len(seen) if isinstance(max_df, float) else max_df
+        kept = [term for term, count in doc_freq.items() if self.settings["min_df"] <= count <= max_count]
+        if not kept:
+            # Too few testimonials for the document-frequency limits; keep every term
+            kept = list(doc_freq)
+        kept.sort(key=lambda term: (-doc_freq[term], term))
+        vocabulary = sorted(kept[:self.settings["max_features"]])
+        if not vocabulary:
+            raise ValueError("No terms left to build topics from — are the testimonials empty?")
+
+        self.vectorizer = self._analyzer(vocabulary)
+        self.doc_freq = np.array([doc_freq[term] for term in vocabulary], dtype=np.int64)
+        self.n_docs = len(seen)
+        self.seen = seen
+        self.n_components = self._n_components()
+
+    def _n_components(self) -> int:
+        n_labels = self.settings["n_labels"]
+        if self.method == "lda":
+            return n_labels
+        # NNDSVD initialisation needs at least as many documents (in the first batch) and terms as topics
+        n_components = min(n_labels, self.n_docs, len(self.doc_freq), self.settings["batch_size"])
+        if n_components < n_labels:
+            print(f"⚠️ Only {self.n_docs} testimonials and {len(self.doc_freq)} terms: "
+                  f"fitting {n_components} topics instead of {n_labels}.")
+        return n_components
+
+    def _new_model(self):
+        n_components = self.n_components
+        if self.method == "nmf":
+            return MiniBatchNMF(n_components=n_components, batch_size=self.settings["batch_size"],
+                                init="nndsvda", random_state=self.settings["seed"])
+        return LatentDirichletAllocation(n_components=n_components, learning_method="online",
+                                         batch_size=self.settings["batch_size"], random_state=self.settings["seed"])
+
+    def _features(self, counts):
+        if self.method == "lda":
+            return counts
+        # Smoothed idf from the running document frequencies, as TfidfTransformer computes it
+        idf = np.log((1 + self.n_docs) / (1 + self.doc_freq)) + 1
+        return normalize(counts.multiply(idf.astype(np.float32)).tocsr())
+
+    def partial_fit(self, texts: List[str], count_documents: bool = True):
+        """Update document frequencies with `texts` and fit the model on them."""
+        counts = self.vectorizer.transform(texts)
+        if count_documents:
+            self.doc_freq += np.bincount(counts.indices, minlength=len(self.doc_freq))
+            self.n_docs += counts.shape[0]
+            self.seen.update(map(_text_hash, texts))
+        if self.model is None:
+            self.model = self._new_model()
+        self.model.partial_fit(self._features(counts))
+
+    def fit(self, texts: Iterable[str]):
+        """Full fit: vocabulary pass, then `passes` mini-batch passes (texts must be re-iterable)."""
+        self.build_vocabulary(texts)
+        self.model = None
+        for _ in range(max(1, self.settings["passes"])):
+            for batch in _batches(texts, self.settings["batch_size"]):
+                self.partial_fit(batch, count_documents=False)
+        return self
+
+    def update(self, texts: Iterable[str]) -> int:
+        """Incremental refit on the testimonials not seen before; returns how many there were."""
+        new = 0
+        unseen = (text for text in texts if _text_hash(text) not in self.seen)
+        for batch in _batches(unseen, self.settings["batch_size"]):
+            # Duplicates within the new texts only count once
+            batch = list({_text_hash(text): text for text in batch if _text_hash(text) not in self.seen}.values())
+            if batch:
+                self.partial_fit(batch)
+                new += len(batch)
+        return new
+
+    def labels(self) -> List[str]:
+        """One label per topic: its `words_per_label` highest-weighted terms, skipping terms that repeat a word."""
+        terms = self.vectorizer.get_feature_names_out()
+        labels = []
+        for weights in self.model.components_:
+            words, covered = [], set()
+            for index in np.argsort(weights)[::-1]:
+                term = terms[index]
+                if covered.intersection(term.split()):
+                    continue
+                words.append(term)
+                covered.update(term.split())
+                if len(words) >= self.settings["words_per_label"]:
+                    break
+            label = " ".join(words)
+            if label and label not in labels:
+                labels.append(label)
+        return labels
+
+    def save(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        joblib.dump({"params": self.params, "vectorizer": self.vectorizer, "doc_freq": self.doc_freq,
+                     "n_docs": self.n_docs, "seen": self.seen, "model": self.model}, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, method: str = "nmf", settings: Optional[Dict] = None) -> Optional["TopicModel"]:
+        """The cached model, or None if there is none or it was fitted with other settings."""
+        topic_model = cls(method, settings)
+        if not os.path.exists(path):
+            return None
+        try:
+            state = joblib.load(path)
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable topic model cache {path}: {e}")
+            return None
+        # The topic count is capped by the corpus the cache was fitted on, not set by the caller
+        params = dict(state.get("params") or {})
+        topic_model.n_components = params.get("n_components")
+        if topic_model.n_components is None or params != topic_model.params:
+            print(f"⚠️ Topic model cache {path} was fitted with other settings — refitting.")
+            return None
+        for key in ("vectorizer", "doc_freq", "n_docs", "seen", "model"):
+            setattr(topic_model, key, state[key])
+        return topic_model
+
+
+def generate_labels_from_topic_model(texts: Iterable[str], method: str = "nmf", settings: Optional[Dict] = None) -> List[str]:
+    """
+    Candidate labels from a topic model over the testimonial texts. The fitted model is cached
+    (`cache_path`); later calls only fit the testimonials not seen before. A first fit reads
+    `texts` more than once, so pass a list or a re-iterable such as pipeline.ingest.TestimonialTexts.
+    """
+    settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+    cache_path = settings["cache_path"]
+
+    topic_model = TopicModel.load(cache_path, method, settings) if cache_path else None
+    if topic_model is not None and topic_model.capped and any(_text_hash(text) not in topic_model.seen for text in texts):
+        # Fitted with fewer topics than asked for; with new testimonials there may be room for more
+        topic_model = None
+    if topic_model is None:
+        print(f"🧩 Fitting {method.upper()} topic model ({settings['n_labels']} topics)...")
+        topic_model = TopicModel(method, settings).fit(texts)
+        print(f"🧩 Fitted on {topic_model.n_docs} testimonials, {len(topic_model.doc_freq)} terms")
+    else:
+        new = topic_model.update(texts)
+        print(f"🧩 Topic model loaded from {cache_path}" + (f", updated with {new} new testimonials" if new else ""))
+
+    if cache_path:
+        topic_model.save(cache_path)
+
+    labels = topic_model.labels()
+    print("🧩 Generated labels:", ", ".join(labels))
+    return labels
@@ -3,6 +3,8 @@ import json
 import matplotlib.pyplot as plt
 import pandas as pd
 
+from utils.output_sinks import open_sink
+
 def load_irr_scores(path="data/outputs/irr_scores.json"):
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
@@ -65,7 +67,16 @@ def print_irr_table(irr_scores: dict):
     print("\n📋 Inter-Rater Reliability Table:\n")
     print(df.round(3))
 
-def export_irr_to_excel(irr_scores: dict, output_path="data/outputs/irr_scores.xlsx"):
+    bootstrap = irr_scores.get("bootstrap")
+    if bootstrap:
+        intervals = pd.DataFrame(bootstrap["per_label"]).T.map(
+            lambda bounds: f"[{bounds[0]:.3f}, {bounds[1]:.3f}]" if bounds else "N/A"
+        )
+        intervals.index.name = "Label"
+        print(f"\n📐 {bootstrap['confidence']:.0%} bootstrap intervals ({bootstrap['replicates']} replicates):\n")
+        print(intervals.to_string())
+
+def export_irr_to_excel(irr_scores: dict, output_path="data/outputs/irr_scores.xlsx", output_format="xlsx"):
     df = pd.DataFrame(irr_scores["per_label"]).T
     df.index.name = "Label"
 
@@ -81,6 +92,22 @@ def export_irr_to_excel(irr_scores: dict, output_path="data/outputs/irr_scores.x
         }], index=["OVERALL"])
         df = pd.concat([df, overall_df])
 
-    df.to_excel(output_path)
-    print(f"\n📁 IRR scores exported to {output_path}")
+    bootstrap = irr_scores.get("bootstrap")
+    with open_sink(output_path, output_format) as sink:
+        sink.write_table("IRR Scores", df.rename_axis("Label").reset_index())
+        if bootstrap:
+            # One row per label and metric: point estimate with its bootstrap interval
+            rows = []
+            intervals = dict(bootstrap["per_label"], OVERALL=bootstrap["overall"])
+            for label, metrics in intervals.items():
+                for metric, bounds in metrics.items():
+                    rows.append({
+                        "Label": label,
+                        "metric": metric,
+                        "estimate": df.loc[label, metric],
+                        "ci_low": bounds[0] if bounds else None,
+                        "ci_high": bounds[1] if bounds else None,
+                    })
+            sink.write_table(f"{bootstrap['confidence']:.0%} CI ({bootstrap['replicates']} reps)", pd.DataFrame(rows))
+    print(f"\n📁 IRR scores exported to {sink.location}")
 
@@ -0,0 +1,126 @@
+import pytest
+
+from mock_llm.batch_server import start_fake_batch_server
+from mock_llm.responses import fake_scores
+from mock_llm.server import start_mock_llm_server
+from models.claude_model import ClaudeModel
+from models.gpt_model import GPTModel
+from models.ollama_model import OllamaModel
+from pipeline.batch_jobs import ProviderBatchJob, run_batch_job_mode
+from pipeline.ingest import records_from_texts
+
+LABELS = ["training", "trust", "community impact", "confidence", "knowledge sharing"]
+NORMALIZED_LABELS = {label: label for label in LABELS}
+TEXTS = [f"After training {i}, my community trusts me and I share knowledge." for i in range(7)]
+
+
+@pytest.fixture
+def servers():
+    started = []
+    yield started
+    for server in started:
+        server.shutdown()
+
+
+def start(servers, factory=start_fake_batch_server, **options):
+    server = factory(**options)
+    servers.append(server)
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def config(tmp_path, **settings):
+    return {"batch_jobs": {"poll_interval": 0.01, "work_dir": str(tmp_path), **settings}}
+
+
+def run(models, tmp_path, **settings):
+    return list(run_batch_job_mode(records_from_texts(TEXTS), models, LABELS, NORMALIZED_LABELS, config(tmp_path, **settings)))
+
+
+def expected(model, text):
+    return fake_scores(LABELS, text, model.model_name)
+
+
+def test_submit_poll_collect_in_chunks(servers, tmp_path):
+    server, base = start(servers)
+    models = {"gpt": GPTModel(api_key="sk-fake", temperature=0.0, base_url=f"{base}/v1"),
+              "claude": ClaudeModel(api_key="sk-ant-fake", temperature=0.0, base_url=base)}
+
+    rows = run(models, tmp_path, chunk_size=3)
+
+    assert [i for i, _, _ in rows] == list(range(len(TEXTS)))
+    assert [record["text"] for _, record, _ in rows] == TEXTS
+    for _, record, results in rows:
+        for name, model in models.items():
+            assert results[name]["labels"] == expected(model, record["text"])
+    # 3 chunks (3 + 3 + 1 testimonials), one job per provider each
+    batches = server.RequestHandlerClass.state.batches.values()
+    assert sorted(len(batch["_requests"]) for batch in batches) == [1, 1, 3, 3, 3, 3]
+
+
+def test_failed_items_fall_back_to_interactive_calls(servers, tmp_path):
+    server, base = start(servers, fail_rate=0.4)
+    model = GPTModel(api_key="sk-fake", temperature=0.0, base_url=f"{base}/v1")
+
+    rows = run({"gpt": model}, tmp_path)
+
+    state = server.RequestHandlerClass.state
+    assert sum(state.should_fail(f"t-{i}") for i in range(len(TEXTS))) > 0
+    for _, record, results in rows:
+        assert results["gpt"]["labels"] == expected(model, record["text"])
+
+
+def test_failed_items_recorded_as_missing(servers, tmp_path):
+    server, base = start(servers, fail_rate=0.4)
+    model = GPTModel(api_key="sk-fake", temperature=0.0, base_url=f"{base}/v1")
+
+    rows = run({"gpt": model}, tmp_path, on_failure="missing")
+
+    state = server.RequestHandlerClass.state
+    for i, record, results in rows:
+        if state.should_fail(f"t-{i}"):
+            assert results["gpt"] is None
+        else:
+            assert results["gpt"]["labels"] == expected(model, record["text"])
+
+
+@pytest.mark.parametrize("provider", ["openai", "anthropic"])
+def test_expired_batch_keeps_the_requests_that_ran(servers, tmp_path, provider):
+    server, base = start(servers, fail_rate=0.4, expire=True)
+    model = (GPTModel(api_key="sk-fake", temperature=0.0, base_url=f"{base}/v1") if provider == "openai"
+             else ClaudeModel(api_key="sk-ant-fake", temperature=0.0, base_url=base))
+
+    rows = run({"m": model}, tmp_path, on_failure="missing")
+
+    state = server.RequestHandlerClass.state
+    statuses = {batch.get("status", batch.get("processing_status")) for batch in state.batches.values()}
+    assert statuses == ({"expired"} if provider == "openai" else {"ended"})
+    answered = [results["m"] is not None for _, _, results in rows]
+    assert answered == [not state.should_fail(f"t-{i}") for i in range(len(TEXTS))]
+    assert any(answered) and not all(answered)
+
+
+def test_timed_out_job_is_cancelled_and_other_models_survive(servers, tmp_path):
+    # Mock server that never finishes a batch, and also serves Ollama for the interactive model
+    server, base = start(servers, start_mock_llm_server, polls_to_complete=10 ** 6)
+    models = {"gpt": GPTModel(api_key="sk-fake", temperature=0.0, base_url=f"{base}/v1"),
+              "mistral": OllamaModel(model_name="mistral", api_url=f"{base}/api/generate", stream=False)}
+
+    rows = run(models, tmp_path, max_wait_hours=0.2 / 3600, on_failure="missing")
+
+    assert len(rows) == len(TEXTS)
+    for _, record, results in rows:
+        assert results["gpt"] is None
+        assert results["mistral"]["labels"] == fake_scores(LABELS, record["text"], "mistral")
+    assert [batch["status"] for batch in server.RequestHandlerClass.state.batches.values()] == ["cancelled"]
+
+
+def test_provider_batch_job_is_abstract():
+    with pytest.raises(TypeError):
+        ProviderBatchJob(model=None)
+
+    class Incomplete(ProviderBatchJob):
+        def submit(self, requests):
+            return "job"
+
+    with pytest.raises(TypeError):
+        Incomplete(model=None)
@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+from models.claude_model import ClaudeModel
+from models.gpt_model import GPTModel
+from utils.prompt_template import generate_batch_prompt, generate_prompt
+from utils.response_cache import ResponseCache
+
+LABELS = ["training", "trust"]
+NORMALIZED_LABELS = {label: label for label in LABELS}
+ITEMS = [("a", "The training was useful."), ("b", "I trust the health workers."),
+         ("c", "We meet every week."), ("d", "Nothing changed for me.")]
+
+
+def answer(item_id=None, trust=0.9, **overrides):
+    element = {"labels": {"training": 0.1, "trust": trust}, "explanation": f"about {item_id}"}
+    if item_id is not None:
+        element["id"] = item_id
+    element.update(overrides)
+    return element
+
+
+class ScriptedAPI:
+    """Replaces a model's `_call_api`: batch prompts get `batch_reply(ids)`, single prompts a valid answer."""
+
+    def __init__(self, batch_reply):
+        self.batch_reply = batch_reply
+        self.prompts = []
+
+    def __call__(self, prompt):
+        self.prompts.append(prompt)
+        if getattr(prompt, "batch", False):
+            ids = [item_id for item_id, text in ITEMS if f"[id: {item_id}]" in prompt]
+            return self.batch_reply(ids)
+        return json.dumps(answer(trust=0.5))
+
+    def batch_sizes(self):
+        return [prompt.count("[id: ") for prompt in self.prompts if getattr(prompt, "batch", False)]
+
+    def single_calls(self):
+        return sum(not getattr(prompt, "batch", False) for prompt in self.prompts)
+
+
+@pytest.fixture(params=[GPTModel, ClaudeModel])
+def model(request):
+    model = request.param(api_key="sk-fake", temperature=0.0)
+    model.batch_size = len(ITEMS)
+    return model
+
+
+def script(monkeypatch, model, batch_reply):
+    api = ScriptedAPI(batch_reply)
+    monkeypatch.setattr(model, "_call_api", api)
+    return api
+
+
+def test_complete_batch_is_one_request(model, monkeypatch):
+    api = script(monkeypatch, model, lambda ids: json.dumps([answer(item_id) for item_id in ids]))
+    results = model.classify_batch(ITEMS, LABELS, NORMALIZED_LABELS)
+
+    assert {item_id: result["explanation"] for item_id, result in results.items()} == {
+        item_id: f"about {item_id}" for item_id, _ in ITEMS}
+    assert api.batch_sizes() == [4] and api.single_calls() == 0
+
+
+def test_missing_items_are_resent_as_a_smaller_batch(model, monkeypatch):
+    # The first reply drops two testimonials; the retry only asks for those
+    api = script(monkeypatch, model, lambda ids: json.dumps([answer(item_id) for item_id in ids if len(ids) < 4 or item_id in "ab"]))
+    results = model.classify_batch(ITEMS, LABELS, NORMALIZED_LABELS)
+
+    assert api.batch_sizes() == [4, 2]
+    assert all(results[item_id]["explanation"] == f"about {item_id}" for item_id, _ in ITEMS)
+
+
+@pytest.mark.parametrize("broken", [
+    {"labels": {"training": "high", "trust": 0.2}},    # score that isn't a number
+    {"labels": ["training", "trust"]},                  # labels not an object
+])
+def test_unparseable_item_counts_as_missing(model, monkeypatch, broken):
+    def reply(ids):
+        return json.dumps([answer(item_id, **(broken if item_id == "c" else {})) for item_id in ids])
+
+    api = script(monkeypatch, model, reply)
+    results = model.classify_batch(ITEMS, LABELS, NORMALIZED_LABELS)
+
+    # "c" is never answered in a batch, so after the retries it is classified on its own
+    assert api.batch_sizes() == [4]
+    assert api.single_calls() == 1
+    assert results["c"]["labels"] == {"training": 0.1, "trust": 0.5}
+    assert all(results[item_id]["explanation"] == f"about {item_id}" for item_id in "abd")
+
+
+def test_items_still_missing_after_retries_fall_back_to_classify(model, monkeypatch):
+    model.max_batch_retries = 2
+    api = script(monkeypatch, model, lambda ids: json.dumps([answer(item_id) for item_id in ids if item_id not in "cd"]))
+    results = model.classify_batch(ITEMS, LABELS, NORMALIZED_LABELS)
+
+    assert api.batch_sizes() == [4, 2, 2]
+    assert api.single_calls() == 2
+    assert results["c"]["labels"]["trust"] == 0.5 and results["d"]["labels"]["trust"] == 0.5
+
+
+def test_useless_batch_reply_is_not_cached(model, monkeypatch, tmp_path):
+    model.cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+    api = script(monkeypatch, model, lambda ids: "I cannot help with that.")
+    results = model.classify_batch(ITEMS, LABELS, NORMALIZED_LABELS)
+
+    assert api.single_calls() == 4 and all(result["labels"]["trust"] == 0.5 for result in results.values())
+    assert model.cache.get(model.provider, model.model_name, 0.0, generate_batch_prompt(ITEMS, LABELS)) is None
+    assert model.cache.get(model.provider, model.model_name, 0.0, generate_prompt(ITEMS[0][1], LABELS)) is not None
+    model.cache.close()
@@ -0,0 +1,124 @@
+import random
+import threading
+import time
+
+from pipeline.engine import ClassificationEngine
+from pipeline.ingest import records_from_texts
+
+LABELS = ["training", "trust"]
+NORMALIZED_LABELS = {label: label for label in LABELS}
+
+
+class Concurrency:
+    """Counts calls in flight per provider and remembers the peak."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = {}
+        self.peak = {}
+
+    def __call__(self, provider, delta):
+        with self.lock:
+            self.current[provider] = self.current.get(provider, 0) + delta
+            self.peak[provider] = max(self.peak.get(provider, 0), self.current[provider])
+
+
+class SlowModel:
+    """Classifies by echoing the text back after `delay` seconds (jittered by `jitter`)."""
+
+    def __init__(self, provider, delay, concurrency, jitter=0.0, fail_on=None, batch_size=1):
+        self.provider = provider
+        self.delay = delay
+        self.jitter = jitter
+        self.concurrency = concurrency
+        self.fail_on = fail_on
+        self.batch_size = batch_size
+        self.rnd = random.Random(0)
+
+    def classify(self, text, labels, normalized_labels):
+        self.concurrency(self.provider, +1)
+        try:
+            time.sleep(self.delay + self.rnd.random() * self.jitter)
+            if self.fail_on and self.fail_on in text:
+                raise RuntimeError("provider down")
+            return {"labels": {}, "explanation": text}
+        finally:
+            self.concurrency(self.provider, -1)
+
+
+class BatchingModel(SlowModel):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches = []
+
+    def classify_batch(self, items, labels, normalized_labels):
+        self.batches.append([item_id for item_id, _ in items])
+        return {item_id: {"labels": {}, "explanation": text} for item_id, text in items}
+
+
+def texts(n):
+    return [f"testimonial {i}" for i in range(n)]
+
+
+def test_results_come_back_in_input_order():
+    concurrency = Concurrency()
+    models = {
+        "gpt": SlowModel("openai", 0.001, concurrency, jitter=0.02),
+        "claude": SlowModel("anthropic", 0.001, concurrency, jitter=0.02),
+    }
+    engine = ClassificationEngine(models, max_pending=8, per_provider={"openai": 4, "anthropic": 3})
+    rows = list(engine.run(records_from_texts(texts(30)), LABELS, NORMALIZED_LABELS))
+
+    assert [index for index, _, _ in rows] == list(range(30))
+    for index, record, results in rows:
+        assert record["text"] == f"testimonial {index}"
+        assert {name: result["explanation"] for name, result in results.items()} == {"gpt": record["text"], "claude": record["text"]}
+
+
+def test_each_provider_runs_up_to_its_own_limit():
+    concurrency = Concurrency()
+    models = {
+        "gpt": SlowModel("openai", 0.02, concurrency),
+        "claude": SlowModel("anthropic", 0.02, concurrency),
+        "mistral": SlowModel("ollama", 0.02, concurrency),
+    }
+    engine = ClassificationEngine(models, max_pending=16, per_provider={"openai": 4, "anthropic": 2, "ollama": 1})
+    list(engine.run(records_from_texts(texts(16)), LABELS, NORMALIZED_LABELS))
+    assert concurrency.peak == {"openai": 4, "anthropic": 2, "ollama": 1}
+
+
+def test_slow_provider_does_not_starve_the_others():
+    # With one shared pool, queued Ollama calls held workers while waiting for Ollama's single slot
+    concurrency = Concurrency()
+    models = {
+        "mistral": SlowModel("ollama", 0.05, concurrency),
+        "gpt": SlowModel("openai", 0.02, concurrency),
+    }
+    engine = ClassificationEngine(models, max_workers=5, max_pending=16, per_provider={"openai": 4, "ollama": 1})
+    assert engine.workers == {"ollama": 1, "openai": 4}
+
+    list(engine.run(records_from_texts(texts(16)), LABELS, NORMALIZED_LABELS))
+    assert concurrency.peak == {"ollama": 1, "openai": 4}
+
+
+def test_max_workers_caps_the_pools():
+    models = {"gpt": SlowModel("openai", 0, None), "claude": SlowModel("anthropic", 0, None),
+              "mistral": SlowModel("ollama", 0, None)}
+    engine = ClassificationEngine(models, max_workers=6, per_provider={"openai": 8, "anthropic": 4, "ollama": 1})
+    assert engine.workers == {"anthropic": 2, "ollama": 1, "openai": 3}
+
+    engine = ClassificationEngine(models, max_workers=1)
+    assert engine.workers == {"anthropic": 1, "ollama": 1, "openai": 1}
+
+
+def test_batches_and_failures():
+    concurrency = Concurrency()
+    batching = BatchingModel("openai", 0, concurrency, batch_size=3)
+    models = {"gpt": batching, "mistral": SlowModel("ollama", 0, concurrency, fail_on="testimonial 4")}
+    rows = list(ClassificationEngine(models).run(records_from_texts(texts(7)), LABELS, NORMALIZED_LABELS))
+
+    # The last single testimonial goes through plain classify
+    assert sorted(batching.batches) == [["1", "2", "3"], ["4", "5", "6"]]
+    assert all(results["gpt"]["explanation"] == record["text"] for _, record, results in rows)
+    # A model that raises is a missing result for its chunk, not a failed run
+    assert [index for index, _, results in rows if results["mistral"] is None] == [4]
@@ -0,0 +1,216 @@
+import time
+import threading
+
+import pytest
+
+from utils.latency import CircuitBreaker, CircuitOpenError, LatencyGuard, RunDeadlineExceeded, attach_latency_guards
+from utils.rate_limiter import RequestGovernor
+from utils.response_cache import CachedResponseMixin
+
+
+class Throttled(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: str = None):
+        super().__init__("throttled")
+        self.response = type("Response", (), {"headers": {"retry-after": retry_after} if retry_after else {}})()
+
+
+class Down(Exception):
+    status_code = 500
+
+
+class FakeModel(CachedResponseMixin):
+    """Adapter stand-in: `_call_api` replays `behaviour` (a callable per call index)."""
+    provider = "openai"
+    model_name = "fake"
+    temperature = 0.0
+
+    def __init__(self, behaviour=None):
+        self.behaviour = behaviour or (lambda i, prompt: f"answer to {prompt}")
+        self.sent = 0
+        self._lock = threading.Lock()
+
+    def _call_api(self, prompt: str) -> str:
+        with self._lock:
+            i = self.sent
+            self.sent += 1
+        return self.behaviour(i, prompt)
+
+
+def failing(i, prompt):
+    raise Down("provider down")
+
+
+def test_breaker_opens_after_threshold_and_fails_fast():
+    model = FakeModel(failing)
+    model.latency_guard = LatencyGuard(breaker=CircuitBreaker("openai", failure_threshold=3, reset_after=60))
+
+    for _ in range(3):
+        with pytest.raises(Down):
+            model._generate("p")
+    for _ in range(5):
+        with pytest.raises(CircuitOpenError):
+            model._generate("p")
+
+    assert model.sent == 3
+    assert model.latency_guard.stats["rejected"] == 5
+    assert model.latency_guard.breaker.state == "open"
+
+
+def test_breaker_half_open_trial_closes_or_reopens():
+    outcomes = iter([Down, Down, Down, "ok"])
+
+    def behaviour(i, prompt):
+        outcome = next(outcomes)
+        if outcome is Down:
+            raise Down("down")
+        return outcome
+
+    breaker = CircuitBreaker("openai", failure_threshold=2, reset_after=0.05)
+    model = FakeModel(behaviour)
+    model.latency_guard = LatencyGuard(breaker=breaker)
+
+    for _ in range(2):
+        with pytest.raises(Down):
+            model._generate("p")
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    with pytest.raises(Down):
+        model._generate("p")          # failed trial reopens at once
+    assert breaker.state == "open" and breaker.times_opened == 2
+
+    time.sleep(0.06)
+    assert model._generate("p") == "ok"
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_run_deadline_rejects_without_sending():
+    model = FakeModel()
+    model.latency_guard = LatencyGuard(run_deadline=time.monotonic() - 1)
+
+    with pytest.raises(RunDeadlineExceeded):
+        model._generate("p")
+    assert model.sent == 0
+    assert model.latency_guard.stats["rejected"] == 1
+
+
+def test_slow_attempt_is_hedged_and_the_faster_answer_wins():
+    def behaviour(i, prompt):
+        # The 21st send stalls; its hedge (the 22nd) answers quickly
+        time.sleep(1.0 if i == 20 else 0.01)
+        return f"answer {i}"
+
+    model = FakeModel(behaviour)
+    model.latency_guard = LatencyGuard(hedge_percentile=95, hedge_min_samples=20, hedge_budget=1.0)
+    for _ in range(20):
+        model._generate("warm-up")
+
+    start = time.perf_counter()
+    assert model._generate("slow") == "answer 21"
+    assert time.perf_counter() - start < 0.5
+    assert model.latency_guard.stats["hedged"] == 1
+    assert model.latency_guard.stats["hedge_wins"] == 1
+
+
+def test_hedges_stay_within_budget():
+    def behaviour(i, prompt):
+        time.sleep(0.01 if i < 20 else 0.05)
+        return "answer"
+
+    model = FakeModel(behaviour)
+    guard = model.latency_guard = LatencyGuard(hedge_percentile=50, hedge_min_samples=20, hedge_budget=0.1)
+    for _ in range(60):
+        model._generate("p")
+
+    assert 0 < guard.stats["hedged"] <= 0.1 * guard.stats["calls"]
+
+
+def stall_21st(i, prompt):
+    # The 21st send stalls; a hedge (the 22nd send) would answer quickly
+    time.sleep(0.6 if i == 20 else 0.01)
+    return f"answer {i}"
+
+
+def hedging_model(governor, behaviour=stall_21st):
+    model = FakeModel(behaviour)
+    model.governor = governor
+    model.latency_guard = LatencyGuard(hedge_percentile=95, hedge_min_samples=20, hedge_budget=1.0)
+    for _ in range(20):
+        model._generate("warm-up")
+    return model
+
+
+def test_hedge_is_skipped_when_the_governor_is_at_its_limit():
+    # The primary attempt holds the only slot
+    model = hedging_model(RequestGovernor("openai", max_concurrency=1))
+    assert model._generate("slow") == "answer 20"
+    assert model.sent == 21
+    assert model.latency_guard.stats["hedged"] == 0 and model.latency_guard.stats["hedges_skipped"] == 1
+
+
+def test_hedge_is_skipped_when_the_request_quota_is_spent():
+    # 1 request/s with 21 s of burst: the warm-up and the primary attempt use up the bucket
+    model = hedging_model(RequestGovernor("openai", max_concurrency=4, requests_per_minute=60, burst_seconds=21))
+    assert model._generate("slow") == "answer 20"
+    assert model.sent == 21
+    assert model.governor.stats["extra_refused"] == 1
+
+
+def test_hedge_holds_a_governor_slot_until_it_finishes():
+    active = []
+
+    def behaviour(i, prompt):
+        if i == 21:
+            active.append(model.governor._active)
+        return stall_21st(i, prompt)
+
+    model = hedging_model(RequestGovernor("openai", max_concurrency=2), behaviour)
+    assert model._generate("slow") == "answer 21"
+    assert active == [2]
+    assert model.governor.stats["extra_calls"] == 1
+    time.sleep(0.7)  # let the stalled primary finish
+    assert model.governor._active == 0
+
+
+def test_throttled_hedge_slows_the_provider_down():
+    def behaviour(i, prompt):
+        if i == 21:
+            raise Throttled(retry_after="0.05")
+        return stall_21st(i, prompt)
+
+    model = hedging_model(RequestGovernor("openai", max_concurrency=4, base_delay=0.01), behaviour)
+    assert model._generate("slow") == "answer 20"
+    assert model.governor.stats["throttled"] == 1
+    assert model.governor.limit == 2
+    assert model.governor._active == 0
+
+
+def test_governor_backoff_is_not_timed_and_retries_do_not_trip_the_breaker():
+    def behaviour(i, prompt):
+        if i < 2:
+            raise Throttled(retry_after="0.3")
+        return "answer"
+
+    model = FakeModel(behaviour)
+    model.governor = RequestGovernor("openai", max_concurrency=2, base_delay=0.01, max_retries=5)
+    model.latency_guard = LatencyGuard(breaker=CircuitBreaker("openai", failure_threshold=2))
+
+    start = time.perf_counter()
+    assert model._generate("p") == "answer"
+    assert time.perf_counter() - start >= 0.6
+
+    # Only the successful network attempt is sampled, not the two 0.3 s Retry-After waits
+    assert model.latency_guard.histogram.summary()["max_ms"] < 100
+    assert model.latency_guard.breaker.state == "closed"
+    assert model.governor.stats["retries"] == 2
+
+
+def test_attach_latency_guards_never_hedges_ollama():
+    ollama = type("Local", (), {"provider": "ollama"})()
+    remote = type("Remote", (), {"provider": "openai"})()
+    attach_latency_guards({"mistral": ollama, "gpt": remote}, {"latency": {"hedge_percentile": 95}})
+
+    assert ollama.latency_guard.hedge_percentile is None
+    assert remote.latency_guard.hedge_percentile == 95
@@ -0,0 +1,114 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from pipeline.ingest import records_from_texts
+from pipeline.near_duplicates import NearDuplicateIndex, NearDuplicateStage, lsh_params, shingles, text_key
+
+LABELS = ["training", "trust"]
+MODELS = ["gpt", "claude"]
+
+BASE = "After the training I taught my whole village about malaria prevention and clean water."
+NEAR = "After the training, I taught my whole village about malaria prevention and clean water!"
+OTHER = "People in the market now ask me for advice about their children's health every week."
+
+
+def classify(records, fail=()):
+    """Stand-in for the engine: every model 'answers' with the record's text, except models in `fail`."""
+    for i, record in enumerate(records):
+        yield i, record, {model: None if model in fail else {"labels": {"trust": 1.0}, "explanation": record["text"]}
+                          for model in MODELS}
+
+
+def run(path, texts, fail=(), **index_options):
+    stage = NearDuplicateStage(NearDuplicateIndex(str(path), **index_options), LABELS, MODELS)
+    sent = []
+
+    def track(records):
+        for record in records:
+            sent.append(record["text"])
+            yield record
+
+    rows = list(stage.merge(classify(track(stage.filter(records_from_texts(texts))), fail)))
+    stage.close()
+    return sent, rows, stage.links
+
+
+def test_shingles_ignore_case_and_punctuation():
+    assert shingles("Hello,   World!", 5) == shingles("hello world", 5)
+    assert shingles("hi", 5) == {"hi"}
+
+
+def test_lsh_params_fit_num_perm():
+    bands, rows = lsh_params(0.85, 128)
+    assert bands * rows <= 128 and bands > 1 and rows > 1
+
+
+def test_similar_signatures(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "index.sqlite"))
+    base, near, other = (index.signature(text) for text in (BASE, NEAR, OTHER))
+    assert np.mean(base == near) >= 0.85
+    assert np.mean(base == other) < 0.2
+    index.close()
+
+
+def test_near_duplicates_reuse_results_in_input_order(tmp_path):
+    sent, rows, links = run(tmp_path / "index.sqlite", [BASE, OTHER, NEAR, BASE])
+    assert sent == [BASE, OTHER]
+    assert [index for index, _, _ in rows] == [0, 1, 2, 3]
+    assert [record["id"] for _, record, _ in rows] == [1, 2, 3, 4]
+    # Held copies carry the representative's results
+    assert rows[2][2]["gpt"]["explanation"] == BASE and rows[3][2]["claude"]["explanation"] == BASE
+    assert [(link["id"], link["representative_id"]) for link in links] == [(3, "1"), (4, "1")]
+
+
+def test_exact_copies_from_an_earlier_run_are_not_reclassified(tmp_path):
+    path = tmp_path / "index.sqlite"
+    run(path, [BASE, OTHER])
+
+    sent, rows, links = run(path, [OTHER, "Something new about community meetings and trust.", BASE])
+    assert sent == ["Something new about community meetings and trust."]
+    assert [record["text"] for _, record, _ in rows] == [OTHER, "Something new about community meetings and trust.", BASE]
+    assert rows[0][2]["gpt"]["explanation"] == OTHER
+    assert {link["similarity"] for link in links} == {1.0}
+
+
+def test_incomplete_results_are_classified_again(tmp_path):
+    path = tmp_path / "index.sqlite"
+    run(path, [BASE], fail=("claude",))
+
+    sent, rows, _ = run(path, [BASE, NEAR])
+    # The earlier BASE had a failed model, so it is sent again; NEAR then matches it within this run
+    assert sent == [BASE]
+    assert rows[1][2]["claude"]["explanation"] == BASE
+
+
+def test_other_labels_or_models_do_not_reuse_results(tmp_path):
+    path = tmp_path / "index.sqlite"
+    run(path, [BASE])
+    stage = NearDuplicateStage(NearDuplicateIndex(str(path)), LABELS + ["confidence"], MODELS)
+    assert [record["text"] for record in stage.filter(records_from_texts([BASE]))] == [BASE]
+    stage.close()
+
+
+@pytest.mark.parametrize("commit_every", [3, 1000])
+def test_writes_are_committed_in_batches(tmp_path, commit_every):
+    path = str(tmp_path / "index.sqlite")
+    index = NearDuplicateIndex(path, commit_every=commit_every)
+    reader = sqlite3.connect(path)
+
+    def committed():
+        return reader.execute("SELECT COUNT(*) FROM representatives").fetchone()[0]
+
+    texts = [f"testimonial number {i} about training and trust in the village" for i in range(5)]
+    for i, text in enumerate(texts):
+        index.add_representative(text_key(text), i, index.signature(text))
+    assert committed() == (3 if commit_every == 3 else 0)
+    # Uncommitted writes are still visible to the index itself
+    assert index.query(index.signature(texts[4]), lambda key: True)[1] == "4"
+
+    index.flush()
+    assert committed() == 5
+    reader.close()
+    index.close()
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from mock_llm.server import start_mock_llm_server
+from models.ollama_model import OllamaModel, _JsonEndTracker
+from utils.prompt_template import generate_batch_prompt, generate_prompt
+
+LABELS = ["training", "trust"]
+NORMALIZED_LABELS = {label: label for label in LABELS}
+
+
+def feed_in_chunks(tracker, text, size=3):
+    """Feed `text` a few characters at a time, like streamed tokens; the text up to the end, or None."""
+    consumed = []
+    for start in range(0, len(text), size):
+        chunk = text[start:start + size]
+        end = tracker.feed(chunk)
+        if end != -1:
+            consumed.append(chunk[:end])
+            return "".join(consumed)
+        consumed.append(chunk)
+    return None
+
+
+@pytest.mark.parametrize("size", [1, 3, 64])
+def test_stops_after_first_object(size):
+    answer = '{"labels": {"trust": 0.9}, "explanation": "A {brace} and ] in a \\"string\\"."}'
+    assert feed_in_chunks(_JsonEndTracker(), answer + "\nHope this helps!", size) == answer
+
+
+def test_preamble_brackets_do_not_end_single_answers():
+    answer = '{"labels": {"trust": 0.9}, "explanation": "x"}'
+    assert feed_in_chunks(_JsonEndTracker(), f"scores [0-1]: {answer} done") == f"scores [0-1]: {answer}"
+
+
+def test_batch_answers_close_on_the_array():
+    answer = '[{"id": "1", "labels": {"trust": 0.9}}, {"id": "2", "labels": {"trust": 0.1}}]'
+    assert feed_in_chunks(_JsonEndTracker("{["), f"Here you go: {answer} Thanks.") == f"Here you go: {answer}"
+
+
+def test_unfinished_answer_keeps_streaming():
+    assert feed_in_chunks(_JsonEndTracker(), '{"labels": {"trust": 0.9}') is None
+
+
+@pytest.fixture
+def ollama_url():
+    servers = []
+
+    def start(**options):
+        server = start_mock_llm_server(**options)
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def test_stream_stops_after_json(ollama_url):
+    # Fenced answers come wrapped in prose; the stream should end at the closing brace
+    url = ollama_url(behaviour={"ollama": {"malformed_rate": 1.0, "malformed_kinds": ["fenced"]}})
+    model = OllamaModel("mistral", api_url=url)
+    raw_output = model._call_api(generate_prompt("The training built trust.", LABELS))
+
+    assert raw_output.startswith("Here is my classification:")
+    assert raw_output.endswith("}")
+    json.loads(raw_output[raw_output.index("{"):])
+    # No stats chunk arrives when the stream is cut short; the streamed chunks are counted instead
+    assert model.usage_summary()["completion_tokens"] == len(raw_output.split())
+
+
+def test_stream_without_early_stop_reads_everything(ollama_url):
+    url = ollama_url(behaviour={"ollama": {"malformed_rate": 1.0, "malformed_kinds": ["fenced"]}})
+    model = OllamaModel("mistral", api_url=url, stop_after_json=False)
+    raw_output = model._call_api(generate_prompt("The training built trust.", LABELS))
+    assert raw_output.endswith("Let me know if you need more detail.")
+
+
+def test_batch_prompt_streams_the_whole_array(ollama_url):
+    model = OllamaModel("mistral", api_url=ollama_url())
+    items = [("a", "The training built trust."), ("b", "Nothing to report.")]
+    raw_output = model._call_api(generate_batch_prompt(items, LABELS))
+    assert [element["id"] for element in json.loads(raw_output)] == ["a", "b"]
+
+    model.batch_size = 2
+    results = model.classify_batch(items, LABELS, NORMALIZED_LABELS)
+    assert set(results) == {"a", "b"} and all(results.values())
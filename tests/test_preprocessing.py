@@ -0,0 +1,50 @@
+import json
+
+from benchmarks.bench_docx_parse import synthetic_transcript
+from pipeline.preprocessing import DEFAULT_PARSER, IngestManifest, ingest_folder
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_switching_parser_re_extracts_unchanged_files(tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    synthetic_transcript(str(raw / "a.docx"), 30, seed=1)
+    synthetic_transcript(str(raw / "b.docx"), 30, seed=2)
+    out = str(tmp_path / "processed" / "testimonials.jsonl")
+
+    first = ingest_folder(str(raw), out, workers=1)
+    assert first["extracted"] == 2
+    stream_entries = read_jsonl(out)
+
+    again = ingest_folder(str(raw), out, workers=1, parser=DEFAULT_PARSER)
+    assert again["unchanged"] == 2 and again["extracted"] == 0
+
+    switched = ingest_folder(str(raw), out, workers=1, parser="docx")
+    assert switched["extracted"] == 2 and switched["unchanged"] == 0
+    manifest = IngestManifest(str(tmp_path / "processed" / "ingest_manifest.json")).load()
+    assert {record["parser"] for record in manifest.files.values()} == {"docx"}
+
+    # Back to the streaming parser: same entries as the first run, with the same ids
+    back = ingest_folder(str(raw), out, workers=1)
+    assert back["extracted"] == 2
+    assert sorted(read_jsonl(out), key=lambda e: e["id"]) == sorted(stream_entries, key=lambda e: e["id"])
+
+
+def test_manifest_without_parser_is_treated_as_docx(tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    synthetic_transcript(str(raw / "a.docx"), 10, seed=3)
+    out = str(tmp_path / "testimonials.jsonl")
+
+    ingest_folder(str(raw), out, workers=1, parser="docx")
+    manifest = IngestManifest(str(tmp_path / "ingest_manifest.json")).load()
+    for record in manifest.files.values():
+        del record["parser"]
+    manifest.save()
+
+    assert ingest_folder(str(raw), out, workers=1, parser="docx")["unchanged"] == 1
+    assert ingest_folder(str(raw), out, workers=1, parser="stream")["extracted"] == 1
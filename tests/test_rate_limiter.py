@@ -0,0 +1,95 @@
+import time
+
+import openai
+import pytest
+
+from mock_llm.server import start_mock_llm_server
+from models.gpt_model import GPTModel
+from utils.prompt_template import generate_prompt
+from utils.rate_limiter import RequestGovernor, attach_governor
+
+PROMPT = generate_prompt("The training built trust in my community.", ["training", "trust"])
+
+
+@pytest.fixture
+def mock_server():
+    servers = []
+
+    def start(**options):
+        server = start_mock_llm_server(**options)
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def governed_gpt(base_url: str, **governor_options) -> GPTModel:
+    model = GPTModel(api_key="sk-fake", temperature=0.0, base_url=base_url)
+    governor_options = {"base_delay": 0.01, "max_delay": 0.05, **governor_options}
+    attach_governor(model, RequestGovernor("openai", **governor_options))
+    return model
+
+
+def test_retry_after_is_honored(mock_server):
+    # Two requests per 1 s window: the third is answered 429 with Retry-After ≈ the rest of the window
+    server, base_url = mock_server(throttle_rpm=120, throttle_window=1.0)
+    model = governed_gpt(base_url)
+
+    start = time.perf_counter()
+    for _ in range(3):
+        assert '"labels"' in model._generate(PROMPT)
+    elapsed = time.perf_counter() - start
+
+    # base_delay alone would retry within 0.05 s; waiting out the window means Retry-After was used
+    assert elapsed >= 0.9
+    assert model.governor.stats["throttled"] >= 1
+    assert server.RequestHandlerClass.state.stats["openai"]["throttled"] == model.governor.stats["throttled"]
+
+
+def test_concurrency_halves_on_429_and_recovers(mock_server):
+    server, base_url = mock_server(throttle_rpm=240, throttle_window=0.5)
+    model = governed_gpt(base_url, max_concurrency=8, increase_after=3)
+
+    for _ in range(3):
+        model._generate(PROMPT)
+    assert model.governor.stats["throttled"] == 1
+    assert model.governor.limit == 4
+    assert model.governor.stats["min_limit"] == 4
+
+    # Provider stops pushing back: +1 after every `increase_after` successes, up to max_concurrency
+    server.RequestHandlerClass.state.throttle_rpm = 0
+    for _ in range(6):
+        model._generate(PROMPT)
+    assert model.governor.limit == 6
+    for _ in range(6):
+        model._generate(PROMPT)
+    assert model.governor.limit == 8
+    for _ in range(3):
+        model._generate(PROMPT)
+    assert model.governor.limit == 8
+
+
+def test_gives_up_after_max_retries(mock_server):
+    server, base_url = mock_server(behaviour={"openai": {"throttle_rate": 1.0, "retry_after": 0.01}})
+    model = governed_gpt(base_url, max_retries=3)
+
+    start = time.perf_counter()
+    with pytest.raises(openai.RateLimitError):
+        model._generate(PROMPT)
+    assert time.perf_counter() - start < 5
+
+    assert model.governor.stats["retries"] == 3
+    assert model.governor.stats["failures"] == 1
+    assert server.RequestHandlerClass.state.stats["openai"]["requests"] == 4
+
+    # A failed call releases its slot: the governor is not left blocked
+    assert model.governor._active == 0
+
+
+def test_classify_records_missing_result_when_retries_run_out(mock_server):
+    _, base_url = mock_server(behaviour={"openai": {"throttle_rate": 1.0, "retry_after": 0.01}})
+    model = governed_gpt(base_url, max_retries=1)
+
+    assert model.classify("The training built trust.", ["training", "trust"], {"training": "training", "trust": "trust"}) is None
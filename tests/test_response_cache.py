@@ -0,0 +1,106 @@
+import time
+
+import pytest
+
+from mock_llm.server import start_mock_llm_server
+from models.gpt_model import GPTModel
+from utils.prompt_template import generate_prompt
+from utils.response_cache import ResponseCache
+
+LABELS = ["training", "trust"]
+NORMALIZED_LABELS = {label: label for label in LABELS}
+TEXT = "The training built trust in my community."
+PROMPT = generate_prompt(TEXT, LABELS)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def mock_server():
+    servers = []
+
+    def start(**options):
+        server = start_mock_llm_server(**options)
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def test_hit_and_miss(cache):
+    assert cache.get("openai", "gpt-4", 0.0, "prompt") is None
+    cache.put("openai", "gpt-4", 0.0, "prompt", "answer")
+    assert cache.get("openai", "gpt-4", 0.0, "prompt") == "answer"
+    # Provider, model, temperature and prompt all key the entry
+    assert cache.get("openai", "gpt-4", 0.7, "prompt") is None
+    assert cache.get("anthropic", "gpt-4", 0.0, "prompt") is None
+    assert cache.get("openai", "gpt-4", 0.0, "prompt ") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 4
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), max_entries=2)
+    cache.put("openai", "gpt-4", 0.0, "a", "A")
+    time.sleep(0.01)
+    cache.put("openai", "gpt-4", 0.0, "b", "B")
+    time.sleep(0.01)
+    cache.get("openai", "gpt-4", 0.0, "a")
+    time.sleep(0.01)
+    cache.put("openai", "gpt-4", 0.0, "c", "C")
+
+    assert cache.evict() == 1
+    assert cache.get("openai", "gpt-4", 0.0, "b") is None
+    assert cache.get("openai", "gpt-4", 0.0, "a") == "A"
+    assert cache.get("openai", "gpt-4", 0.0, "c") == "C"
+    cache.close()
+
+
+def test_age_eviction(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    cache = ResponseCache(path, max_age_days=1)
+    cache.put("openai", "gpt-4", 0.0, "old", "OLD")
+    cache.put("openai", "gpt-4", 0.0, "new", "NEW")
+    cache._conn.execute("UPDATE responses SET created_at = ? WHERE response = 'OLD'", (time.time() - 2 * 86400,))
+    cache._conn.commit()
+
+    # Expired entries are misses straight away, and dropped the next time the cache is opened
+    assert cache.get("openai", "gpt-4", 0.0, "old") is None
+    cache.close()
+    cache = ResponseCache(path, max_age_days=1)
+    assert cache.evictions == 1 and cache.stats()["entries"] == 1
+    assert cache.get("openai", "gpt-4", 0.0, "new") == "NEW"
+    cache.close()
+
+
+def test_bypass_reads_nothing_but_still_writes(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    cache = ResponseCache(path, bypass=True)
+    cache.put("openai", "gpt-4", 0.0, "prompt", "answer")
+    assert cache.get("openai", "gpt-4", 0.0, "prompt") is None
+    assert cache.stats()["misses"] == 1 and cache.stats()["entries"] == 1
+    cache.close()
+
+
+def test_unparseable_response_is_not_replayed(cache, mock_server):
+    broken = GPTModel(api_key="sk-fake", temperature=0.0, cache=cache,
+                      base_url=mock_server(behaviour={"default": {"malformed_rate": 1.0, "malformed_kinds": ["prose"]}}))
+    result = broken.classify(TEXT, LABELS, NORMALIZED_LABELS)
+    assert result["explanation"].startswith("Parsing failed")
+    assert cache.stats()["entries"] == 0
+
+    healthy = GPTModel(api_key="sk-fake", temperature=0.0, cache=cache, base_url=mock_server())
+    result = healthy.classify(TEXT, LABELS, NORMALIZED_LABELS)
+    assert not result["explanation"].startswith("Parsing failed")
+    assert cache.get("openai", healthy.model_name, 0.0, PROMPT) is not None
+
+    # A rerun is served from the cache
+    hits = cache.hits
+    assert healthy.classify(TEXT, LABELS, NORMALIZED_LABELS) == result
+    assert cache.hits == hits + 1
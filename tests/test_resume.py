@@ -0,0 +1,108 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+import yaml
+
+from mock_llm.server import start_mock_llm_server
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LABELS = ["training", "trust", "community impact"]
+TEXTS = [
+    "The training helped me teach my village about malaria prevention.",
+    "People trust me now and ask me for advice.",
+    "UNREACHABLE: nobody could classify this one.",
+    "I share what I learned about clean water with my neighbours.",
+    "The community meets every week to talk about health.",
+    "UNREACHABLE: this one fails for every model too.",
+    "I felt confident after the training sessions.",
+    "Our health committee now organises its own campaigns.",
+]
+
+
+@pytest.fixture
+def mock_url():
+    # Prompts for the UNREACHABLE testimonials always fail, whichever run sends them
+    server = start_mock_llm_server(behaviour={"default": {"latency": "fixed:150", "error_pattern": "UNREACHABLE"}})
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def make_run_dir(path, mock_url):
+    os.makedirs(path / "data" / "processed")
+    with open(path / "data" / "processed" / "testimonials.jsonl", "w", encoding="utf-8") as f:
+        for i, text in enumerate(TEXTS, 1):
+            f.write(json.dumps({"id": i, "topic": "t", "speaker": f"s{i}", "date": "2024-01-01", "content": [text]}) + "\n")
+    config = {
+        "use_generated_labels": False,
+        "labels": LABELS,
+        "models": ["mistral", "llama3"],
+        "model_settings": {name: {"temperature": 0.0, "base_url": mock_url} for name in ("mistral", "llama3")},
+        "output_csv": "results.csv",
+        "startup": {"parallel": False, "health_check": False},
+        "concurrency": {"max_workers": 2, "max_pending": 2, "per_provider": {"ollama": 1}},
+        "local_scheduling": {"enabled": False},
+        "rate_limits": {"enabled": True, "max_retries": 0},
+        "latency": {"call_timeout": 10, "circuit_breaker": {"enabled": False}},
+        "outputs": {"format": "csv"},
+        "response_cache": {"enabled": False},
+        "near_duplicates": {"enabled": False},
+        "input_jsonl": "data/processed/testimonials.jsonl",
+        "checkpoint_path": "data/outputs/checkpoint.json",
+        "resume": True,
+    }
+    with open(path / "config.yaml", "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f)
+    return path
+
+
+def start_main(run_dir):
+    env = dict(os.environ, PYTHONPATH=REPO, MPLBACKEND="Agg")
+    log = open(run_dir / "run.log", "a", encoding="utf-8")
+    return subprocess.Popen([sys.executable, os.path.join(REPO, "main.py")], cwd=run_dir, env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+
+
+def run_main(run_dir):
+    assert start_main(run_dir).wait(timeout=120) == 0, (run_dir / "run.log").read_text(encoding="utf-8")
+
+
+def outputs(run_dir):
+    """Every CSV / JSON output of a run, by path relative to the run directory."""
+    paths = [run_dir / "results.csv", *(run_dir / "data" / "outputs").rglob("*")]
+    return {str(path.relative_to(run_dir)): path.read_text(encoding="utf-8")
+            for path in paths if path.suffix in (".csv", ".json")}
+
+
+def test_interrupted_run_resumes_to_the_same_outputs(tmp_path, mock_url):
+    uninterrupted = make_run_dir(tmp_path / "uninterrupted", mock_url)
+    run_main(uninterrupted)
+
+    resumed = make_run_dir(tmp_path / "resumed", mock_url)
+    checkpoint_path = resumed / "data" / "outputs" / "checkpoint.json"
+    process = start_main(resumed)
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline and process.poll() is None:
+        if checkpoint_path.exists() and json.loads(checkpoint_path.read_text())["completed"] >= 4:
+            break
+        time.sleep(0.02)
+    process.kill()
+    process.wait()
+
+    # Killed mid-run, after the first unreachable testimonial
+    checkpoint = json.loads(checkpoint_path.read_text())
+    assert 4 <= checkpoint["completed"] < len(TEXTS)
+    assert [entry["id"] for entry in checkpoint["unrated"]] == [3]
+
+    run_main(resumed)
+    assert "Resuming after testimonial id" in (resumed / "run.log").read_text(encoding="utf-8")
+    assert not checkpoint_path.exists()
+
+    expected, actual = outputs(uninterrupted), outputs(resumed)
+    assert "data/outputs/irr_scores.json" in expected
+    assert actual.keys() == expected.keys()
+    for name in expected:
+        assert actual[name] == expected[name], name
@@ -0,0 +1,86 @@
+import pytest
+
+from utils.stemming import StemmingService
+
+LABELS = {"trust": "Trust", "community support": "Community Support"}
+
+
+class CountingTokenizer:
+    """Whitespace tokenizer that records how often each text is tokenized (no nltk data needed)."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text):
+        self.calls.append(text)
+        return text.replace(".", " ").replace(",", " ").split()
+
+
+@pytest.fixture
+def tokenizer():
+    return CountingTokenizer()
+
+
+@pytest.fixture
+def service(monkeypatch, tokenizer):
+    service = StemmingService()
+    monkeypatch.setattr(service, "tokenize", tokenizer)
+    return service
+
+
+def test_explanation_is_tokenized_once(service, tokenizer):
+    explanation = "They trusted the community and its supportive members."
+    assert service.stemmed_words(explanation) == service.stemmed_words(explanation)
+    assert service.contains_label("trust", explanation)
+    assert service.contains_label("community support", explanation)
+    assert len(tokenizer.calls) == 1
+
+
+def test_label_words_are_stemmed_once(service):
+    stems = service.label_stems("Community Support")
+    assert stems == frozenset({"commun", "support"})
+    assert service.label_stems("Community Support") is stems
+
+
+def test_inline_check_prints_warnings(service, capsys):
+    service.check_low_scores({"Trust": 0.0, "Community Support": 0.9}, "I trusted them.", LABELS, source="gpt")
+    out = capsys.readouterr().out
+    assert "'Trust' mentioned in explanation" in out
+    assert "Community Support" not in out
+
+
+def test_deferred_checks_run_as_one_pass(service, tokenizer, capsys):
+    service.defer = True
+    service.check_low_scores({"Trust": 0.0}, "I trusted them.", LABELS, source="gpt")
+    service.check_low_scores({"Trust": 0.0}, "Nothing relevant here.", LABELS, source="claude")
+    assert capsys.readouterr().out == ""
+    assert tokenizer.calls == []
+
+    assert service.run_deferred_checks() == 1
+    assert "[gpt] ⚠️ Warning: 'Trust'" in capsys.readouterr().out
+    assert service.run_deferred_checks() == 0
+
+
+@pytest.mark.parametrize("defer", [False, True])
+def test_tokenizer_failure_is_logged_and_skipped(service, monkeypatch, capsys, defer):
+    def missing_data(text):
+        if "broken" in text:
+            raise LookupError("\n****\n  Resource 'punkt_tab' not found.\n****")
+        return text.split()
+
+    monkeypatch.setattr(service, "tokenize", missing_data)
+    service.defer = defer
+    service.check_low_scores({"Trust": 0.0}, "broken explanation about trust", LABELS, source="gpt")
+    service.check_low_scores({"Trust": 0.0}, "i trust them", LABELS, source="gpt")
+    count = service.run_deferred_checks() if defer else None
+
+    out = capsys.readouterr().out
+    assert "[gpt] Skipped low-score check: LookupError: Resource 'punkt_tab' not found." in out
+    assert "'Trust' mentioned in explanation" in out
+    if defer:
+        assert count == 1
+
+
+def test_no_candidates_skips_tokenizing(service, tokenizer):
+    assert service.low_score_warnings({"Trust": 0.9}, "I trusted them.", {"trust": "Trust"}) == []
+    assert tokenizer.calls == []
@@ -0,0 +1,36 @@
+import pytest
+
+from pipeline.topic_modeling import TopicModel, generate_labels_from_topic_model
+
+SMALL_CORPUS = [
+    "The water training helped our health workers talk to families about prevention.",
+    "People in the village felt the training changed how they ask about symptoms.",
+    "Talking with the community health worker, I learned to recognize the warning signs early.",
+]
+
+
+@pytest.mark.parametrize("method", ["nmf", "lda"])
+def test_corpus_smaller_than_n_labels(tmp_path, method):
+    cache_path = str(tmp_path / "topic_model.joblib")
+    labels = generate_labels_from_topic_model(SMALL_CORPUS, method, {"cache_path": cache_path})
+    assert labels
+
+    topic_model = TopicModel.load(cache_path, method, {"cache_path": cache_path})
+    assert topic_model is not None
+    assert topic_model.n_components == (len(SMALL_CORPUS) if method == "nmf" else 8)
+
+
+def test_capped_cache_is_refitted_when_new_testimonials_arrive(tmp_path):
+    settings = {"cache_path": str(tmp_path / "topic_model.joblib"), "n_labels": 4, "min_df": 1, "max_df": 1.0}
+    generate_labels_from_topic_model(SMALL_CORPUS, "nmf", settings)
+    assert TopicModel.load(settings["cache_path"], "nmf", settings).n_components == 3
+
+    more = SMALL_CORPUS + ["Crop insurance and soil health were new topics for our farmer group."]
+    generate_labels_from_topic_model(more, "nmf", settings)
+    topic_model = TopicModel.load(settings["cache_path"], "nmf", settings)
+    assert topic_model.n_components == 4 and topic_model.n_docs == 4
+
+
+def test_empty_corpus_raises():
+    with pytest.raises(ValueError, match="No testimonials"):
+        generate_labels_from_topic_model([], "nmf", {"cache_path": None})
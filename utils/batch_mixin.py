@@ -0,0 +1,88 @@
+import re
+import json
+from typing import Dict, List, Tuple
+from utils.prompt_template import generate_batch_prompt
+
+
+class BatchClassifyMixin:
+    """
+    Classify several testimonials per request with a batched prompt.
+    Relies on the adapter's `_generate(prompt)`, `_parse_output(...)` and `classify(...)`.
+    """
+    batch_size: int = 1
+    max_batch_retries: int = 2
+
+    def classify_batch(self, items: List[Tuple[str, str]], labels: List[str],
+                       normalized_labels: Dict[str, str]) -> Dict[str, Dict]:
+        """
+        Return {id: result} for a list of (id, text) pairs.
+        Items missing from a partial response are re-sent as a smaller batch, and
+        anything still missing after `max_batch_retries` is classified on its own.
+        """
+        results = {}
+        remaining = list(items)
+
+        for attempt in range(self.max_batch_retries + 1):
+            if len(remaining) <= 1:
+                break
+
+            prompt = generate_batch_prompt(remaining, labels)
+            try:
+                raw_output = self._generate(prompt)
+                print(f"\n[DEBUG] {self.model_name} batch output ({len(remaining)} testimonials):\n{raw_output}")
+                parsed = self._parse_batch_output(raw_output, [item_id for item_id, _ in remaining],
+                                                  labels, normalized_labels)
+            except Exception as e:
+                print(f"⚠️ {self.model_name} batch request failed: {e}")
+                parsed = {}
+
+            if not parsed:
+                # Don't let a useless response be replayed from the cache on retry
+                self._evict_response(prompt)
+
+            results.update(parsed)
+            remaining = [(item_id, text) for item_id, text in remaining if item_id not in results]
+            if remaining:
+                print(f"🔁 {len(remaining)} testimonial(s) missing from {self.model_name} batch response "
+                      f"(attempt {attempt + 1})")
+
+        for item_id, text in remaining:
+            results[item_id] = self.classify(text, labels, normalized_labels)
+
+        return results
+
+    def _parse_batch_output(self, text: str, ids: List[str], labels: List[str],
+                            normalized_labels: Dict[str, str]) -> Dict[str, Dict]:
+        """
+        Split a JSON array response into per-testimonial results via the adapter's own parser.
+        An item the parser rejects is left out, like one the model skipped, so it is retried
+        and eventually classified on its own rather than recorded as zeros.
+        """
+        data = json.loads(self._extract_json_array(text))
+        if isinstance(data, dict):
+            data = data.get("results", [data])
+
+        wanted = set(ids)
+        parsed = {}
+        for element in data:
+            if not isinstance(element, dict) or not isinstance(element.get("labels"), dict):
+                continue
+            item_id = str(element.get("id", "")).strip()
+            if item_id not in wanted or item_id in parsed:
+                continue
+            try:
+                parsed[item_id] = self._parse_output(json.dumps(element), labels, normalized_labels)
+            except Exception as e:
+                print(f"⚠️ Could not parse batch item {item_id} from {self.model_name}: {e}")
+
+        return parsed
+
+    def _extract_json_array(self, text: str) -> str:
+        """Extract the outermost JSON array from potentially noisy text output."""
+        text = text.strip("` \n")
+        text = re.sub(r'//.*', '', text)
+        start = text.find('[')
+        end = text.rfind(']') + 1
+        if start != -1 and end > start:
+            return text[start:end]
+        return self._extract_json(text)
@@ -0,0 +1,104 @@
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+RE_CAMEL = re.compile(r'([a-z])([A-Z])')
+RE_SEPARATORS = re.compile(r'[_\-]')
+
+
+def normalize_label(label: str) -> str:
+    """Standardize label for matching (lowercase, camelCase → spaced, dashes/underscores → space)."""
+    label = RE_CAMEL.sub(r'\1 \2', label)
+    label = RE_SEPARATORS.sub(" ", label)
+    return label.strip().lower()
+
+
+class LabelIndex:
+    """
+    Maps whatever label keys a model returns onto the run's canonical labels.
+    Built once per label set: a hash lookup from every normalized form and alias,
+    a precompiled regex for keys wrapped in stray punctuation (e.g. "**Trust**:"),
+    and a memo of raw keys already seen, so matching is constant time per key.
+    """
+    _lock = threading.Lock()
+    _by_key: Dict[Tuple, "LabelIndex"] = {}
+    _last: Tuple[Optional[Dict], Optional["LabelIndex"]] = (None, None)
+    aliases: Dict[str, str] = {}
+
+    def __init__(self, labels: List[str], normalized_labels: Dict[str, str], aliases: Dict[str, str] = None):
+        self.labels = list(labels)
+        self.canonical_labels = list(normalized_labels.values())
+
+        self._lookup = {}
+        for label in self.labels:
+            self._lookup[normalize_label(label)] = label
+        for norm_label, canonical_label in normalized_labels.items():
+            self._lookup.setdefault(normalize_label(norm_label), canonical_label)
+        for alias, canonical_label in (aliases or {}).items():
+            if canonical_label in self.canonical_labels:
+                self._lookup.setdefault(normalize_label(alias), canonical_label)
+
+        # Longest forms first so "knowledge sharing" wins over "knowledge"
+        forms = sorted(self._lookup, key=len, reverse=True)
+        self._pattern = re.compile(r'^\W*(' + "|".join(re.escape(form) for form in forms) + r')\W*$') if forms else None
+        self._memo: Dict[str, Tuple[str, Optional[str]]] = {}
+
+    @classmethod
+    def for_run(cls, labels: List[str], normalized_labels: Dict[str, str]) -> "LabelIndex":
+        """Return the shared index for this label set, building it on first use."""
+        last_map, last_index = cls._last
+        if normalized_labels is last_map:
+            return last_index
+
+        key = (tuple(labels), tuple(normalized_labels.items()))
+        with cls._lock:
+            index = cls._by_key.get(key)
+            if index is None:
+                index = cls(labels, normalized_labels, cls.aliases)
+                cls._by_key[key] = index
+            cls._last = (normalized_labels, index)
+        return index
+
+    @classmethod
+    def set_aliases(cls, aliases: Dict[str, str]):
+        """Register alias → canonical label pairs (config `label_aliases`) for indexes built afterwards."""
+        with cls._lock:
+            cls.aliases = dict(aliases or {})
+            cls._by_key.clear()
+            cls._last = (None, None)
+
+    def _resolve(self, key: str) -> Tuple[str, Optional[str]]:
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+
+        norm_key = normalize_label(key)
+        canonical = self._lookup.get(norm_key)
+        if canonical is None and self._pattern is not None:
+            found = self._pattern.match(norm_key)
+            canonical = self._lookup[found.group(1)] if found else None
+
+        if len(self._memo) > 10000:
+            self._memo.clear()
+        self._memo[key] = (norm_key, canonical)
+        return norm_key, canonical
+
+    def normalized(self, key: str) -> str:
+        return self._resolve(key)[0]
+
+    def match(self, key: str) -> Optional[str]:
+        """Canonical label for a returned key, or None if it matches nothing."""
+        return self._resolve(key)[1]
+
+    def parse_scores(self, score_block: Dict, source: str = "model") -> Dict[str, float]:
+        """Canonical label → float score for every run label (0.0 when the model omitted it)."""
+        matched = {}
+        for key, value in score_block.items():
+            norm_key, canonical = self._resolve(key)
+            if canonical is None:
+                print(f"⚠️ Unexpected label from {source}: '{key}' → normalized as '{norm_key}'")
+            else:
+                matched[canonical] = value
+
+        return {label: float(matched.get(label, 0.0)) for label in self.canonical_labels}
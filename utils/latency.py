@@ -0,0 +1,243 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+class RunDeadlineExceeded(TimeoutError):
+    """Raised for uncached calls once the run-level deadline has passed."""
+
+
+class LatencyHistogram:
+    """Per-model call latencies: recent samples for percentiles plus log-spaced buckets for reporting."""
+    BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, float("inf")]
+
+    def __init__(self, window: int = 10000):
+        self.samples = deque(maxlen=window)
+        self.counts = [0] * len(self.BUCKETS_MS)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        ms = seconds * 1000
+        with self._lock:
+            self.samples.append(ms)
+            self.counts[next(i for i, edge in enumerate(self.BUCKETS_MS) if ms <= edge)] += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """q-th percentile in milliseconds, or None with no samples."""
+        with self._lock:
+            if not self.samples:
+                return None
+            return float(np.percentile(list(self.samples), q))
+
+    def summary(self) -> Dict:
+        with self._lock:
+            samples = list(self.samples)
+        if not samples:
+            return {"count": 0}
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        return {"count": len(samples), "p50_ms": round(p50, 1), "p95_ms": round(p95, 1),
+                "p99_ms": round(p99, 1), "max_ms": round(max(samples), 1)}
+
+    def format(self) -> str:
+        """One text row per non-empty bucket, e.g. '  ≤500ms   42 ████'."""
+        total = sum(self.counts) or 1
+        rows = []
+        for edge, count in zip(self.BUCKETS_MS, self.counts):
+            if count:
+                label = f"≤{edge:g}ms" if edge != float("inf") else ">60000ms"
+                rows.append(f"  {label:>9} {count:>6} {'█' * max(1, round(30 * count / total))}")
+        return "\n".join(rows)
+
+
+class CircuitBreaker:
+    """
+    Per-provider breaker: after `failure_threshold` consecutive failed calls the circuit opens
+    and calls fail fast for `reset_after` seconds, then one trial call decides whether it closes.
+    """
+
+    def __init__(self, provider: str, failure_threshold: int = 5, reset_after: float = 60.0):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_after:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                if self.state == "closed":
+                    print(f"🔌 Circuit opened for {self.provider} after {self.failures} consecutive failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+
+
+class LatencyGuard:
+    """
+    Wraps one model's API calls with the provider's circuit breaker and a run-level deadline
+    (`call`, once per call, outside the RequestGovernor's retries), and times each network attempt
+    (`attempt`, inside the governor, so quota waits and backoff sleeps are not counted). Hedging:
+    when an attempt is slower than the model's `hedge_percentile` latency so far, a duplicate is
+    sent and whichever answer arrives first is used (within a `hedge_budget` share of attempts).
+    A hedge takes its own slot and quota from the provider's RequestGovernor, and is skipped
+    when the governor has none free, so hedging never pushes a provider past its rate limits.
+    """
+
+    def __init__(self, histogram: LatencyHistogram = None, breaker: CircuitBreaker = None,
+                 run_deadline: float = None, hedge_percentile: float = None, hedge_min_samples: int = 20,
+                 hedge_budget: float = 0.05, max_workers: int = 32):
+        self.histogram = histogram or LatencyHistogram()
+        self.breaker = breaker
+        self.run_deadline = run_deadline
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_budget = hedge_budget
+        self.stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "hedges_skipped": 0, "rejected": 0}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge") if hedge_percentile else None
+
+    def _hedge_delay(self) -> Optional[float]:
+        if self._pool is None or len(self.histogram.samples) < self.hedge_min_samples:
+            return None
+        return self.histogram.percentile(self.hedge_percentile) / 1000
+
+    def _take_hedge(self, prompt: str, governor=None) -> bool:
+        with self._lock:
+            if self.stats["hedged"] + 1 > self.hedge_budget * max(1, self.stats["calls"]):
+                return False
+            self.stats["hedged"] += 1
+        if governor is not None and not governor.try_acquire(prompt):
+            with self._lock:
+                self.stats["hedged"] -= 1
+                self.stats["hedges_skipped"] += 1
+            return False
+        return True
+
+    @staticmethod
+    def _hedge_call(fn: Callable[[str], str], prompt: str, governor=None) -> str:
+        """The duplicate request, holding the governor slot taken for it until it finishes."""
+        try:
+            result = fn(prompt)
+        except Exception as e:
+            if governor is not None:
+                governor.release(e)
+            raise
+        if governor is not None:
+            governor.release()
+        return result
+
+    def _hedged(self, fn: Callable[[str], str], prompt: str, governor=None) -> str:
+        delay = self._hedge_delay()
+        if delay is None:
+            return fn(prompt)
+
+        primary = self._pool.submit(fn, prompt)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._take_hedge(prompt, governor):
+            return primary.result()
+
+        hedge = self._pool.submit(self._hedge_call, fn, prompt, governor)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.stats["hedge_wins"] += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def attempt(self, fn: Callable[[str], str], prompt: str, governor=None) -> str:
+        """
+        One network attempt: hedged if it runs long; only successful attempts are timed.
+        `governor` is the RequestGovernor the attempt runs under; a hedge needs a free slot from it.
+        """
+        with self._lock:
+            self.stats["calls"] += 1
+        start = time.perf_counter()
+        result = self._hedged(fn, prompt, governor)
+        self.histogram.record(time.perf_counter() - start)
+        return result
+
+    def call(self, fn: Callable[[str], str], prompt: str) -> str:
+        """A whole call, retries included: rejected past the deadline or while the circuit is open."""
+        if self.run_deadline is not None and time.monotonic() > self.run_deadline:
+            with self._lock:
+                self.stats["rejected"] += 1
+            raise RunDeadlineExceeded("run deadline passed")
+        if self.breaker is not None and not self.breaker.allow():
+            with self._lock:
+                self.stats["rejected"] += 1
+            raise CircuitOpenError(f"circuit open for {self.breaker.provider}")
+
+        try:
+            result = fn(prompt)
+        except Exception:
+            if self.breaker is not None:
+                self.breaker.record_failure()
+            raise
+        if self.breaker is not None:
+            self.breaker.record_success()
+        return result
+
+
+def attach_latency_guards(models: Dict, config: Dict):
+    """
+    Give every model a LatencyGuard from config `latency`; models of one provider share a breaker.
+    Local Ollama models are never hedged: a duplicate would compete for the same CPU or GPU.
+    """
+    settings = config.get("latency", {}) or {}
+    breaker_settings = settings.get("circuit_breaker", {}) or {}
+    deadline_minutes = settings.get("run_deadline_minutes")
+    run_deadline = time.monotonic() + deadline_minutes * 60 if deadline_minutes else None
+
+    breakers = {}
+    for model in models.values():
+        provider = getattr(model, "provider", None)
+        if breaker_settings.get("enabled", True) and provider not in breakers:
+            breakers[provider] = CircuitBreaker(
+                provider,
+                failure_threshold=breaker_settings.get("failure_threshold", 5),
+                reset_after=breaker_settings.get("reset_after", 60),
+            )
+        model.latency_guard = LatencyGuard(
+            breaker=breakers.get(provider),
+            run_deadline=run_deadline,
+            hedge_percentile=settings.get("hedge_percentile") if provider != "ollama" else None,
+            hedge_min_samples=settings.get("hedge_min_samples", 20),
+            hedge_budget=settings.get("hedge_budget", 0.05),
+        )
@@ -0,0 +1,181 @@
+import os
+import re
+import csv
+import math
+from abc import ABC, abstractmethod
+from numbers import Number
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def _table_filename(name: str) -> str:
+    """'Model Summary' -> 'model_summary'; used for per-table files."""
+    return re.sub(r"[^0-9a-z]+", "_", name.lower()).strip("_") or "table"
+
+
+def _plain(value):
+    """Cell value a writer can store: None for NaN, str() for dicts / lists (as pandas' Excel writer does)."""
+    if value is None or isinstance(value, (str, bool)):
+        return value
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, Number):
+        return None if isinstance(value, float) and math.isnan(value) else value
+    if isinstance(value, (dict, list, tuple, set)):
+        return str(value)
+    return value
+
+
+class OutputSink(ABC):
+    """
+    One multi-table output (what used to be one workbook). `write_table` takes a DataFrame,
+    `write_rows` streams rows so large tables never need to be materialized.
+    """
+    name = ""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @property
+    def location(self) -> str:
+        return self.path
+
+    def write_table(self, name: str, df: pd.DataFrame):
+        self.write_rows(name, [str(col) for col in df.columns], df.itertuples(index=False, name=None))
+
+    @abstractmethod
+    def write_rows(self, name: str, columns: Sequence[str], rows: Iterable[Sequence]):
+        """Write one table; `rows` may be a generator and is consumed once."""
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class XlsxSink(OutputSink):
+    """openpyxl write-only workbook: rows are streamed to disk, so memory stays flat."""
+    name = "xlsx"
+
+    def __init__(self, path: str):
+        super().__init__(path + ".xlsx")
+        from openpyxl import Workbook
+        self.workbook = Workbook(write_only=True)
+
+    def write_rows(self, name: str, columns: Sequence[str], rows: Iterable[Sequence]):
+        sheet = self.workbook.create_sheet(title=name[:31])
+        sheet.append(list(columns))
+        for row in rows:
+            sheet.append([_plain(value) for value in row])
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+class PandasXlsxSink(OutputSink):
+    """The former pd.ExcelWriter output (formatted headers, whole workbook held in memory)."""
+    name = "xlsx_pandas"
+
+    def __init__(self, path: str):
+        super().__init__(path + ".xlsx")
+        self.writer = pd.ExcelWriter(self.path, engine="openpyxl")
+
+    def write_table(self, name: str, df: pd.DataFrame):
+        df.to_excel(self.writer, sheet_name=name[:31], index=False)
+
+    def write_rows(self, name: str, columns: Sequence[str], rows: Iterable[Sequence]):
+        self.write_table(name, pd.DataFrame(list(rows), columns=list(columns)))
+
+    def close(self):
+        self.writer.close()
+
+
+class CsvSink(OutputSink):
+    """A directory with one CSV per table, written row by row."""
+    name = "csv"
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        os.makedirs(path, exist_ok=True)
+
+    def write_table(self, name: str, df: pd.DataFrame):
+        df.to_csv(os.path.join(self.path, _table_filename(name) + ".csv"), index=False)
+
+    def write_rows(self, name: str, columns: Sequence[str], rows: Iterable[Sequence]):
+        with open(os.path.join(self.path, _table_filename(name) + ".csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(rows)
+
+
+class ParquetSink(OutputSink):
+    """A directory with one Parquet file per table (needs pyarrow); streamed tables go in row groups."""
+    name = "parquet"
+    BATCH_ROWS = 50000
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("outputs.format 'parquet' requires pyarrow (pip install pyarrow)") from e
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, _table_filename(name) + ".parquet")
+
+    def write_table(self, name: str, df: pd.DataFrame):
+        df = df.copy()
+        df.columns = [str(col) for col in df.columns]
+        for col in df.columns:
+            if df[col].dtype == object:
+                df[col] = df[col].map(_plain)
+        self.pq.write_table(self.pa.Table.from_pandas(df, preserve_index=False), self._file(name))
+
+    def write_rows(self, name: str, columns: Sequence[str], rows: Iterable[Sequence]):
+        writer = None
+        batch: List[Sequence] = []
+
+        def flush():
+            nonlocal writer
+            table = self.pa.Table.from_pylist([dict(zip(columns, map(_plain, row))) for row in batch])
+            if writer is None:
+                writer = self.pq.ParquetWriter(self._file(name), table.schema)
+            writer.write_table(table.cast(writer.schema))
+            batch.clear()
+
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.BATCH_ROWS:
+                flush()
+        if batch:
+            flush()
+        if writer is None:
+            self.write_table(name, pd.DataFrame(columns=list(columns)))
+        else:
+            writer.close()
+
+
+SINKS: Dict[str, type] = {sink.name: sink for sink in (XlsxSink, PandasXlsxSink, CsvSink, ParquetSink)}
+
+
+def open_sink(path: str, output_format: str = "xlsx") -> OutputSink:
+    """
+    Sink for `path` (its extension is replaced): `<stem>.xlsx` for the Excel formats,
+    a `<stem>/` directory of per-table files for csv and parquet.
+    """
+    if output_format not in SINKS:
+        raise ValueError(f"Unknown output format: {output_format} (choose from {', '.join(SINKS)})")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return SINKS[output_format](os.path.splitext(path)[0])
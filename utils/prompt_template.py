@@ -1,6 +1,33 @@
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple
 
-def generate_prompt(text: str, labels: list[str]) -> str:
+
+class Prompt(str):
+    """
+    Prompt text that remembers its static prefix (instructions + categories) and its
+    per-testimonial suffix, so adapters can mark the prefix for provider prompt caching.
+    `batch` is set on prompts that ask for a JSON array rather than a single object.
+    It is still a plain string for hashing, caching and logging.
+    """
+    prefix: str
+    suffix: str
+    batch: bool = False
+
+    def __new__(cls, prefix: str, suffix: str):
+        prompt = super().__new__(cls, f"{prefix}\n\n{suffix}")
+        prompt.prefix = prefix
+        prompt.suffix = suffix
+        return prompt
+
+
+def split_prompt(prompt: str) -> Tuple[str, str]:
+    """Return (prefix, suffix); plain strings have no cacheable prefix."""
+    return getattr(prompt, "prefix", ""), getattr(prompt, "suffix", prompt)
+
+
+@lru_cache(maxsize=32)
+def prompt_prefix(labels: Tuple[str, ...]) -> str:
+    """Static instruction block, identical for every testimonial in a run."""
     return f"""
 You are a helpful assistant. Your task is to classify the testimonial into relevant categories.
 
@@ -14,8 +41,41 @@ Return only a JSON object in this format:
   "explanation": "A short explanation of how the labels were assigned"
 }}
 
-Testimonial:
-\"\"\"{text}\"\"\"
+Available categories: {', '.join(labels)}
+""".strip()
+
+
+@lru_cache(maxsize=32)
+def batch_prompt_prefix(labels: Tuple[str, ...]) -> str:
+    """Static instruction block for batched prompts."""
+    return f"""
+You are a helpful assistant. Your task is to classify each testimonial below into relevant categories.
+
+Return only a JSON array with exactly one object per testimonial, using the testimonial's id, in this format:
+[
+  {{
+    "id": "testimonial id",
+    "labels": {{
+      "label1": score (float between 0 and 1),
+      "label2": score,
+      ...
+    }},
+    "explanation": "A short explanation of how the labels were assigned"
+  }},
+  ...
+]
 
 Available categories: {', '.join(labels)}
 """.strip()
+
+
+def generate_prompt(text: str, labels: list[str]) -> Prompt:
+    return Prompt(prompt_prefix(tuple(labels)), f"Testimonial:\n\"\"\"{text}\"\"\"")
+
+
+def generate_batch_prompt(items: List[Tuple[str, str]], labels: list[str]) -> Prompt:
+    """Pack several (id, text) testimonials into one prompt that asks for a JSON array back."""
+    testimonials = "\n\n".join(f"[id: {item_id}]\n\"\"\"{text}\"\"\"" for item_id, text in items)
+    prompt = Prompt(batch_prompt_prefix(tuple(labels)), f"Testimonials:\n{testimonials}")
+    prompt.batch = True
+    return prompt
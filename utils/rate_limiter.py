@@ -0,0 +1,296 @@
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, Tuple
+
+
+class TokenBucket:
+    """Refills at `per_minute / 60` units per second and holds at most `burst_seconds` worth."""
+
+    def __init__(self, per_minute: float, burst_seconds: float = 10.0):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Block until `amount` units are available; returns the seconds spent waiting."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        """Take `amount` units only if they are available right now."""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            if self.tokens < amount:
+                return False
+            self.tokens -= amount
+            return True
+
+    def refund(self, amount: float = 1.0):
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + min(amount, self.capacity))
+
+    def drain(self):
+        """Empty the bucket after the provider pushed back, so sends resume at the refill rate."""
+        with self._lock:
+            self.tokens = 0.0
+            self.updated = time.monotonic()
+
+
+def _parse_retry_after(headers) -> Optional[float]:
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+THROTTLE_ERRORS = {"RateLimitError", "ResourceExhausted", "TooManyRequests"}
+TRANSIENT_ERRORS = {
+    "APIConnectionError", "APITimeoutError", "InternalServerError", "OverloadedError",
+    "ServiceUnavailable", "DeadlineExceeded", "BadGateway", "GatewayTimeout",
+    "ConnectionError", "ConnectTimeout", "ReadTimeout", "Timeout", "ChunkedEncodingError",
+}
+
+
+def retry_hint(error: Exception) -> Tuple[bool, bool, Optional[float]]:
+    """
+    Classify an adapter exception as (retryable, throttled, retry_after_seconds).
+    Works across the OpenAI / Anthropic SDKs (status_code), google.api_core (code)
+    and requests.HTTPError (response.status_code) without importing any of them.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None)
+    if not isinstance(status, int):
+        status = getattr(error, "code", None)
+    if not isinstance(status, int) and response is not None:
+        status = getattr(response, "status_code", None)
+    retry_after = _parse_retry_after(getattr(response, "headers", None))
+    name = type(error).__name__
+
+    if status == 429 or name in THROTTLE_ERRORS:
+        return True, True, retry_after
+    if isinstance(status, int) and (status in (408, 409) or status >= 500):
+        # 503 / 529 are how providers say "overloaded": treat them as throttling too
+        return True, status in (503, 529), retry_after
+    if name in TRANSIENT_ERRORS:
+        return True, False, retry_after
+    return False, False, None
+
+
+class RequestGovernor:
+    """
+    Shared per-provider gate in front of every API call: request and token buckets for the
+    per-minute quotas, exponential backoff with full jitter (or the server's Retry-After), and
+    an AIMD concurrency limit that halves on throttling and creeps back up after successes.
+    Extra requests that must not wait, such as hedges (utils/latency.py), take capacity with
+    `try_acquire` and give it back with `release`.
+    """
+
+    def __init__(self, provider: str, requests_per_minute: float = None, tokens_per_minute: float = None,
+                 max_concurrency: int = 8, min_concurrency: int = 1, max_retries: int = 5,
+                 base_delay: float = 1.0, max_delay: float = 60.0, burst_seconds: float = 10.0,
+                 increase_after: int = 20, expected_completion_tokens: int = 300):
+        self.provider = provider
+        self.requests = TokenBucket(requests_per_minute, burst_seconds) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, burst_seconds) if tokens_per_minute else None
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.increase_after = increase_after
+        self.expected_completion_tokens = expected_completion_tokens
+
+        self.limit = float(self.max_concurrency)
+        self._active = 0
+        self._successes = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self.stats = {"calls": 0, "retries": 0, "throttled": 0, "failures": 0, "min_limit": self.max_concurrency,
+                      "extra_calls": 0, "extra_refused": 0}
+
+    def _acquire_slot(self):
+        with self._cond:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause <= 0 and self._active < int(self.limit):
+                    self._active += 1
+                    self.stats["calls"] += 1
+                    return
+                self._cond.wait(timeout=pause if pause > 0 else None)
+
+    def _release_slot(self, success: bool, throttled: bool = False):
+        with self._cond:
+            self._active -= 1
+            # Several in-flight calls usually hit the same throttle window: halve once per window
+            if throttled and time.monotonic() - self._last_decrease >= self.base_delay:
+                self.limit = max(float(self.min_concurrency), self.limit / 2)
+                self._successes = 0
+                self._last_decrease = time.monotonic()
+                self.stats["min_limit"] = min(self.stats["min_limit"], int(self.limit))
+            elif success:
+                self._successes += 1
+                if self._successes >= self.increase_after and self.limit < self.max_concurrency:
+                    self.limit = min(float(self.max_concurrency), self.limit + 1)
+                    self._successes = 0
+            self._cond.notify_all()
+
+    def _count(self, key: str):
+        with self._cond:
+            self.stats[key] += 1
+
+    def _pause(self, seconds: float):
+        """Hold every caller for this provider, not just the one that was throttled."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _estimate_tokens(self, prompt: str) -> int:
+        return len(prompt) // 4 + self.expected_completion_tokens
+
+    def try_acquire(self, prompt: str) -> bool:
+        """
+        Take a concurrency slot and the quota for one request without waiting: False when the
+        provider is paused, at its concurrency limit, or out of request / token quota.
+        """
+        with self._cond:
+            if self._paused_until > time.monotonic() or self._active >= int(self.limit):
+                self.stats["extra_refused"] += 1
+                return False
+            taken = []
+            for bucket, amount in ((self.requests, 1), (self.tokens, self._estimate_tokens(prompt))):
+                if bucket is None:
+                    continue
+                if not bucket.try_acquire(amount):
+                    for taken_bucket, taken_amount in taken:
+                        taken_bucket.refund(taken_amount)
+                    self.stats["extra_refused"] += 1
+                    return False
+                taken.append((bucket, amount))
+            self._active += 1
+            self.stats["calls"] += 1
+            self.stats["extra_calls"] += 1
+            return True
+
+    def release(self, error: Optional[Exception] = None):
+        """Give back a slot taken with `try_acquire`; a throttled request slows the provider down as in `call`."""
+        if error is None:
+            self._release_slot(success=True)
+            return
+        _, throttled, retry_after = retry_hint(error)
+        self._release_slot(success=False, throttled=throttled)
+        if throttled:
+            self._count("throttled")
+            for bucket in (self.requests, self.tokens):
+                if bucket:
+                    bucket.drain()
+            self._pause(self.backoff(0, retry_after))
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after + random.uniform(0, self.base_delay / 4))
+        return delay
+
+    def call(self, fn: Callable[[str], str], prompt: str) -> str:
+        """Run `fn(prompt)` within quota, retrying throttled and transient failures."""
+        estimated_tokens = self._estimate_tokens(prompt)
+        attempt = 0
+        while True:
+            self._acquire_slot()
+            try:
+                if self.requests:
+                    self.requests.acquire(1)
+                if self.tokens:
+                    self.tokens.acquire(estimated_tokens)
+                result = fn(prompt)
+            except Exception as e:
+                retryable, throttled, retry_after = retry_hint(e)
+                self._release_slot(success=False, throttled=throttled)
+                if not retryable or attempt >= self.max_retries:
+                    self._count("failures")
+                    raise
+
+                delay = self.backoff(attempt, retry_after)
+                if throttled:
+                    self._count("throttled")
+                    for bucket in (self.requests, self.tokens):
+                        if bucket:
+                            bucket.drain()
+                    self._pause(delay)
+                attempt += 1
+                self._count("retries")
+                print(f"⏳ {self.provider} {'throttled' if throttled else type(e).__name__}; "
+                      f"retry {attempt}/{self.max_retries} in {delay:.1f}s (concurrency {int(self.limit)})")
+                time.sleep(delay)
+                continue
+
+            self._release_slot(success=True)
+            return result
+
+
+def build_governors(config: Dict) -> Dict[str, RequestGovernor]:
+    """One RequestGovernor per provider from config `rate_limits`; empty when disabled."""
+    settings = config.get("rate_limits", {}) or {}
+    if not settings.get("enabled", False):
+        return {}
+
+    from pipeline.engine import DEFAULT_PROVIDER_LIMITS
+    concurrency = dict(DEFAULT_PROVIDER_LIMITS)
+    concurrency.update((config.get("concurrency", {}) or {}).get("per_provider", {}) or {})
+
+    governors = {}
+    for provider in set(concurrency) | set(settings.get("providers", {}) or {}):
+        limits = (settings.get("providers", {}) or {}).get(provider, {}) or {}
+        governors[provider] = RequestGovernor(
+            provider,
+            requests_per_minute=limits.get("requests_per_minute"),
+            tokens_per_minute=limits.get("tokens_per_minute"),
+            max_concurrency=concurrency.get(provider, 1),
+            min_concurrency=limits.get("min_concurrency", 1),
+            max_retries=settings.get("max_retries", 5),
+            base_delay=settings.get("base_delay", 1.0),
+            max_delay=settings.get("max_delay", 60.0),
+            expected_completion_tokens=limits.get("expected_completion_tokens", 300),
+        )
+    return governors
+
+
+def attach_governor(model, governor: Optional[RequestGovernor]):
+    """Route a model's API calls through `governor`; SDK-level retries are turned off so they don't stack."""
+    model.governor = governor
+    client = getattr(model, "client", None)
+    if governor is not None and hasattr(client, "with_options"):
+        model.client = client.with_options(max_retries=0)
@@ -0,0 +1,200 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Optional
+
+
+class ResponseCache:
+    """
+    Content-addressed, single-file SQLite store of raw model responses.
+    Entries are keyed on provider, model name, temperature and the exact prompt,
+    so reruns that only change analytics or thresholds are served from disk.
+    """
+
+    def __init__(self, path: str = "data/cache/responses.sqlite", max_entries: Optional[int] = None,
+                 max_age_days: Optional[float] = None, bypass: bool = False):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 86400 if max_age_days else None
+        self.bypass = bypass
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                provider TEXT,
+                model TEXT,
+                temperature REAL,
+                response TEXT,
+                created_at REAL,
+                last_access REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+        self._conn.commit()
+        self.evict()
+
+    @staticmethod
+    def make_key(provider: str, model: str, temperature: float, prompt: str) -> str:
+        blob = "\x1f".join([provider, model, repr(float(temperature)), prompt])
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, provider: str, model: str, temperature: float, prompt: str) -> Optional[str]:
+        if self.bypass:
+            self.misses += 1
+            return None
+
+        key = self.make_key(provider, model, temperature, prompt)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or (self.max_age_seconds and now - row[1] > self.max_age_seconds):
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, provider: str, model: str, temperature: float, prompt: str, response: str):
+        key = self.make_key(provider, model, temperature, prompt)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, model, float(temperature), response, now, now)
+            )
+            self._conn.commit()
+            self.writes += 1
+
+        if self.max_entries and self.writes % 100 == 0:
+            self.evict()
+
+    def delete(self, provider: str, model: str, temperature: float, prompt: str):
+        key = self.make_key(provider, model, temperature, prompt)
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def evict(self) -> int:
+        """Drop entries past max_age_days, then the least recently used ones beyond max_entries."""
+        removed = 0
+        with self._lock:
+            if self.max_age_seconds:
+                cur = self._conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?", (time.time() - self.max_age_seconds,)
+                )
+                removed += cur.rowcount
+
+            if self.max_entries:
+                cur = self._conn.execute("""
+                    DELETE FROM responses WHERE key IN (
+                        SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                    )
+                """, (self.max_entries,))
+                removed += cur.rowcount
+
+            self._conn.commit()
+
+        self.evictions += removed
+        return removed
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "entries": entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedResponseMixin:
+    """
+    Puts a ResponseCache in front of an adapter's `_call_api(prompt)`.
+    Adapters expose `provider`, `model_name`, `temperature` and an optional `cache`.
+    Cache misses go through the model's LatencyGuard (utils/latency.py) and the provider's
+    RequestGovernor (utils/rate_limiter.py) when those are attached: the guard's deadline and
+    circuit breaker outside the governor, its timing and hedging inside, around each attempt.
+    A response that fails to parse is evicted with `_evict_response(prompt)`, so reruns ask again
+    instead of replaying it.
+    """
+    cache: Optional[ResponseCache] = None
+    governor = None
+    latency_guard = None
+
+    def _attempt(self, prompt: str) -> str:
+        if self.latency_guard is None:
+            return self._call_api(prompt)
+        return self.latency_guard.attempt(self._call_api, prompt, governor=self.governor)
+
+    def _governed_call(self, prompt: str) -> str:
+        if self.governor is None:
+            return self._attempt(prompt)
+        return self.governor.call(self._attempt, prompt)
+
+    def _send(self, prompt: str) -> str:
+        if self.latency_guard is None:
+            return self._governed_call(prompt)
+        return self.latency_guard.call(self._governed_call, prompt)
+
+    def _generate(self, prompt: str) -> str:
+        if self.cache is None:
+            return self._send(prompt)
+
+        cached = self.cache.get(self.provider, self.model_name, self.temperature, prompt)
+        if cached is not None:
+            return cached
+
+        raw_output = self._send(prompt)
+        if raw_output:
+            self.cache.put(self.provider, self.model_name, self.temperature, prompt, raw_output)
+        return raw_output
+
+    def _evict_response(self, prompt: str):
+        if self.cache is not None:
+            self.cache.delete(self.provider, self.model_name, self.temperature, prompt)
+
+
+def build_response_cache(settings: Optional[Dict]) -> Optional[ResponseCache]:
+    settings = settings or {}
+    if not settings.get("enabled", False):
+        return None
+    return ResponseCache(
+        path=settings.get("path", "data/cache/responses.sqlite"),
+        max_entries=settings.get("max_entries"),
+        max_age_days=settings.get("max_age_days"),
+        bypass=settings.get("bypass", False),
+    )
+
+
+def shared_cache(models: Dict) -> Optional[ResponseCache]:
+    """Return the cache attached to the loaded models, if any."""
+    for model in models.values():
+        if getattr(model, "cache", None) is not None:
+            return model.cache
+    return None
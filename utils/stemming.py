@@ -0,0 +1,103 @@
+import threading
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Tuple
+from utils.label_index import normalize_label
+
+
+class StemmingService:
+    """
+    Shared stemming for the "label mentioned but scored low" warnings.
+    Label words are stemmed once per run, each explanation is tokenized and stemmed
+    once (LRU cache of explanation stems), and token stems are kept in an LRU cache.
+    With `defer` set, checks are queued and run as one post-pass instead of on the
+    request path. A check that fails (e.g. missing nltk tokenizer data) is logged and
+    skipped; it never fails the parse or the run.
+    nltk is imported on first use so it stays off the startup path.
+    """
+
+    def __init__(self, cache_size: int = 50000, low_score: float = 0.1, explanation_cache_size: int = 4096):
+        self.cache_size = cache_size
+        self._stem = None
+        self._explanation_stems = lru_cache(maxsize=explanation_cache_size)(self._stem_text)
+        self.low_score = low_score
+        self.defer = False
+        self._label_stems: Dict[str, FrozenSet[str]] = {}
+        self._pending: List[Tuple[str, Dict[str, float], str, Dict[str, str]]] = []
+        self._lock = threading.Lock()
+
+    def stem(self, token: str) -> str:
+        if self._stem is None:
+            from nltk.stem import PorterStemmer
+            self._stem = lru_cache(maxsize=self.cache_size)(PorterStemmer().stem)
+        return self._stem(token)
+
+    def label_stems(self, label: str) -> FrozenSet[str]:
+        stems = self._label_stems.get(label)
+        if stems is None:
+            stems = frozenset(self.stem(word) for word in normalize_label(label).split())
+            self._label_stems[label] = stems
+        return stems
+
+    def tokenize(self, text: str) -> List[str]:
+        from nltk.tokenize import word_tokenize
+        return word_tokenize(text)
+
+    def _stem_text(self, text: str) -> FrozenSet[str]:
+        return frozenset(self.stem(token) for token in self.tokenize(text.lower()) if token.isalpha())
+
+    def stemmed_words(self, text: str) -> FrozenSet[str]:
+        return self._explanation_stems(text)
+
+    def contains_label(self, label: str, explanation: str) -> bool:
+        return self.label_stems(label).issubset(self.stemmed_words(explanation))
+
+    def low_score_warnings(self, parsed_scores: Dict[str, float], explanation: str,
+                           normalized_labels: Dict[str, str]) -> List[str]:
+        """Labels whose stems all appear in the explanation but scored below `low_score`."""
+        candidates = [
+            (norm_label, canonical_label) for norm_label, canonical_label in normalized_labels.items()
+            if parsed_scores.get(canonical_label, 0.0) < self.low_score
+        ]
+        if not candidates:
+            return []
+
+        expl_stems = self.stemmed_words(explanation)
+        return [
+            f"⚠️ Warning: '{canonical_label}' mentioned in explanation (stem match) but has very low score ({parsed_scores[canonical_label]})"
+            for norm_label, canonical_label in candidates
+            if self.label_stems(norm_label).issubset(expl_stems)
+        ]
+
+    def check_low_scores(self, parsed_scores: Dict[str, float], explanation: str,
+                         normalized_labels: Dict[str, str], source: str = "model"):
+        if self.defer:
+            with self._lock:
+                self._pending.append((source, dict(parsed_scores), explanation, normalized_labels))
+            return
+        for warning in self._safe_warnings(source, parsed_scores, explanation, normalized_labels):
+            print(warning)
+
+    def _safe_warnings(self, source: str, parsed_scores: Dict[str, float], explanation: str,
+                       normalized_labels: Dict[str, str]) -> List[str]:
+        try:
+            return self.low_score_warnings(parsed_scores, explanation, normalized_labels)
+        except Exception as e:
+            # nltk's LookupError message is a boxed multi-line banner; keep its first real line
+            reason = next((line.strip(" *") for line in str(e).splitlines() if line.strip(" *")), "")
+            print(f"⚠️ [{source}] Skipped low-score check: {type(e).__name__}: {reason}")
+            return []
+
+    def run_deferred_checks(self) -> int:
+        """Run every queued check as one pass; returns the number of warnings printed."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        count = 0
+        for source, parsed_scores, explanation, normalized_labels in pending:
+            for warning in self._safe_warnings(source, parsed_scores, explanation, normalized_labels):
+                print(f"[{source}] {warning}")
+                count += 1
+        return count
+
+
+stemming = StemmingService()
@@ -0,0 +1,25 @@
+import threading
+from typing import Dict
+
+
+class TokenUsageMixin:
+    """Per-adapter running totals of prompt tokens and how many were served from a provider prompt cache."""
+    _usage_lock = threading.Lock()
+
+    def _record_usage(self, prompt_tokens: int = 0, cached_tokens: int = 0, completion_tokens: int = 0):
+        with self._usage_lock:
+            usage = self.__dict__.setdefault("_usage", {
+                "calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0
+            })
+            usage["calls"] += 1
+            usage["prompt_tokens"] += prompt_tokens or 0
+            usage["cached_tokens"] += cached_tokens or 0
+            usage["completion_tokens"] += completion_tokens or 0
+
+    def usage_summary(self) -> Dict:
+        with self._usage_lock:
+            usage = dict(self.__dict__.get("_usage", {
+                "calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0
+            }))
+        usage["cached_pct"] = round(usage["cached_tokens"] / usage["prompt_tokens"], 3) if usage["prompt_tokens"] else 0.0
+        return usage
@@ -1,12 +1,7 @@
-import os
-import re
 from pathlib import Path
 from docx import Document
 
-RE_TOPIC = re.compile(r"^Topic Title:\s*(.+)$", re.IGNORECASE)
-RE_SPEAKER = re.compile(r"^Speaker:\s*(.+)$", re.IGNORECASE)
-RE_DATE = re.compile(r"^Date:\s*(.+)$", re.IGNORECASE)
-SEPARATOR = "---"
+from pipeline.docx_stream import RE_TOPIC, RE_SPEAKER, RE_DATE, SEPARATOR, split_entries
 
 RAW_DIR = Path("data/raw")
 VALIDATED_DIR = Path("data/validated")
@@ -19,43 +14,10 @@ def load_paragraphs(path):
 def validate_structure(paragraphs):
     entries = []
     warnings = []
-
-    current = {"topic": None, "speaker": None, "date": None, "body": []}
-
-    for line in paragraphs + [SEPARATOR]:  # Final flush
-        if line == SEPARATOR:
-            if current["topic"] and current["body"]:
-                entry = {
-                    "topic": current["topic"],
-                    "speaker": current["speaker"] or "unknown",
-                    "date": current["date"] or "unknown",
-                    "body": current["body"]
-                }
-
-                if not current["speaker"]:
-                    warnings.append(f"⚠️ Missing speaker in topic: '{current['topic']}' → replaced with 'unknown'")
-                if not current["date"]:
-                    warnings.append(f"⚠️ Missing date in topic: '{current['topic']}' → replaced with 'unknown'")
-
-                entries.append(entry)
-            else:
-                if not current["topic"]:
-                    warnings.append("⚠️ Missing Topic Title in an entry → entry skipped.")
-                elif not current["body"]:
-                    warnings.append(f"⚠️ Missing body text for topic: '{current['topic']}' → entry skipped.")
-
-            current = {"topic": None, "speaker": None, "date": None, "body": []}
-            continue
-
-        if match := RE_TOPIC.match(line):
-            current["topic"] = match.group(1)
-        elif match := RE_SPEAKER.match(line):
-            current["speaker"] = match.group(1)
-        elif match := RE_DATE.match(line):
-            current["date"] = match.group(1)
-        else:
-            current["body"].append(line)
-
+    for entry, entry_warnings in split_entries(paragraphs):
+        warnings.extend(entry_warnings)
+        if entry:
+            entries.append(entry)
     return entries, warnings
 
 def save_cleaned_doc(entries, output_path):